@@ -0,0 +1,442 @@
+"""
+Streaming reader for A2A records in OAI-PMH ListRecords responses.
+
+Records are parsed one at a time with lxml's iterparse and every finished
+<record> element is cleared, so that memory is bounded by a single record
+instead of a full page.
+"""
+
+import datetime
+
+from dataclasses import dataclass, field
+
+from lxml import etree
+
+from pagestore import openPage
+
+OAI = "{http://www.openarchives.org/OAI/2.0/}"
+A2A = "{http://Mindbus.nl/A2A}"
+
+# Remarks whose value consists of 'key: value' pairs itself, as pya2a parsed
+# them. Other values are kept as text, even if they contain ': ' and '; '.
+NESTEDREMARKS = {"Positie op scan"}
+
+
+class Remarks(dict):
+    """
+    Dictionary of remarks that returns None for missing keys.
+
+    The raw text of the remark is kept in the `text` attribute.
+    """
+
+    def __init__(self, *args, text="", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.text = text
+
+    def __missing__(self, key):
+        return None
+
+
+@dataclass
+class Date:
+    Year: int = None
+    Month: int = None
+    Day: int = None
+
+    @property
+    def date(self):
+        """
+        A `datetime.date` for complete dates, otherwise a string in the form
+        'YYYY-MM' or 'YYYY'.
+        """
+
+        if self.Year and self.Month and self.Day:
+            try:
+                return datetime.date(self.Year, self.Month, self.Day)
+            except ValueError:
+                pass
+
+        if self.Year and self.Month:
+            return f"{self.Year:04d}-{self.Month:02d}"
+        elif self.Year:
+            return f"{self.Year:04d}"
+        else:
+            return None
+
+
+@dataclass
+class Place:
+    Place: str = None
+
+
+@dataclass
+class PersonName:
+    PersonNameFirstName: str = None
+    PersonNamePatronym: str = None
+    PersonNamePrefixLastName: str = None
+    PersonNameLastName: str = None
+
+
+@dataclass
+class Person:
+    id: str
+    PersonName: PersonName
+    Gender: str = None
+    BirthDate: Date = None
+    Remarks: Remarks = field(default_factory=Remarks)
+
+    relations: list = field(default_factory=list)
+
+
+@dataclass
+class Event:
+    id: str
+    EventType: str = None
+    EventDate: Date = None
+    EventPlace: Place = None
+    EventReligion: str = None
+
+
+@dataclass
+class Relation:
+    RelationType: str = None
+    ExtendedRelationType: str = None
+
+    person: Person = None
+    event: Event = None
+
+
+@dataclass
+class Scan:
+    Uri: str = None
+    UriViewer: str = None
+    UriPreview: str = None
+    OrderSequenceNumber: int = None
+
+
+@dataclass
+class SourceReference:
+    Place: str = None
+    InstitutionName: str = None
+    Archive: str = None
+    Collection: str = None
+    Book: str = None
+    Folio: str = None
+    RegistryNumber: str = None
+    DocumentNumber: str = None
+
+
+@dataclass
+class Source:
+    guid: str
+    SourceType: str = None
+    SourcePlace: Place = None
+    SourceDate: Date = None
+    SourceReference: SourceReference = field(default_factory=SourceReference)
+    SourceDigitalOriginal: str = None
+    Remarks: Remarks = field(default_factory=Remarks)
+
+    scans: list = field(default_factory=list)
+
+
+@dataclass
+class Document:
+    identifier: str
+    datestamp: str
+    deleted: bool
+
+    source: Source = None
+    persons: list = field(default_factory=list)
+    events: list = field(default_factory=list)
+    relations: list = field(default_factory=list)
+
+
+def iterA2A(xmlfile, deleted=False):
+    """
+    Iterate over the records in an OAI-PMH ListRecords response.
+
+    Args:
+        xmlfile (str or file): Path to the XML file, a page in an archive
+            (see pagestore.py) or a file object.
+        deleted (bool, optional): Also yield records that are marked as
+            deleted (without metadata). Defaults to False.
+
+    Yields:
+        Document: One A2A document per record.
+    """
+
+    for identifier, element in iterRecords(xmlfile, deleted=deleted):
+        yield parseRecord(element)
+
+
+def iterRecords(xmlfile, deleted=False):
+    """
+    Iterate over the record elements in an OAI-PMH ListRecords response,
+    without parsing them (see parseRecord).
+
+    An element is only valid until the next one is requested.
+
+    Args:
+        xmlfile (str or file): Path to the XML file, a page in an archive
+            (see pagestore.py) or a file object.
+        deleted (bool, optional): Also yield records that are marked as
+            deleted. Defaults to False.
+
+    Yields:
+        tuple: The OAI identifier and the lxml element of every record.
+    """
+
+    if isinstance(xmlfile, str):
+        with openPage(xmlfile) as infile:
+            yield from iterRecords(infile, deleted=deleted)
+        return
+
+    for _, element in etree.iterparse(xmlfile, events=("end",), tag=f"{OAI}record"):
+
+        header = element.find(f"{OAI}header")
+
+        if deleted or header.get("status") != "deleted":
+            yield header.findtext(f"{OAI}identifier"), element
+
+        # Free the finished record and everything before it
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+
+
+def parseRecord(record):
+
+    header = record.find(f"{OAI}header")
+
+    document = Document(
+        identifier=header.findtext(f"{OAI}identifier"),
+        datestamp=header.findtext(f"{OAI}datestamp"),
+        deleted=header.get("status") == "deleted",
+    )
+
+    a2aElement = record.find(f"{OAI}metadata/{A2A}A2A")
+    if a2aElement is None:
+        return document
+
+    persons = {}
+    events = {}
+
+    for element in a2aElement:
+
+        if element.tag == f"{A2A}Person":
+            person = parsePerson(element)
+            persons[person.id] = person
+        elif element.tag == f"{A2A}Event":
+            event = parseEvent(element)
+            events[event.id] = event
+        elif element.tag == f"{A2A}Source":
+            document.source = parseSource(element)
+
+    for element in a2aElement:
+
+        if not element.tag.startswith(f"{A2A}Relation"):
+            continue
+
+        relation = Relation(
+            RelationType=element.findtext(f"{A2A}RelationType"),
+            ExtendedRelationType=element.findtext(f"{A2A}ExtendedRelationType"),
+            event=events.get(element.findtext(f"{A2A}EventKeyRef")),
+        )
+
+        for personKeyRef in element.iterfind(f"{A2A}PersonKeyRef"):
+            if person := persons.get(personKeyRef.text):
+                relation.person = relation.person or person
+                person.relations.append(relation)
+
+        document.relations.append(relation)
+
+    document.persons = list(persons.values())
+    document.events = list(events.values())
+
+    return document
+
+
+def parsePerson(element):
+
+    personName = PersonName()
+    nameElement = element.find(f"{A2A}PersonName")
+    if nameElement is not None:
+        for child in nameElement:
+            setattr(personName, localName(child), child.text)
+
+    return Person(
+        id=element.get("pid"),
+        PersonName=personName,
+        Gender=element.findtext(f"{A2A}Gender"),
+        BirthDate=parseDate(element.find(f"{A2A}BirthDate")),
+        Remarks=parseRemarks(element.iterfind(f"{A2A}PersonRemark")),
+    )
+
+
+def parseEvent(element):
+
+    return Event(
+        id=element.get("eid"),
+        EventType=element.findtext(f"{A2A}EventType"),
+        EventDate=parseDate(element.find(f"{A2A}EventDate")),
+        EventPlace=parsePlace(element.find(f"{A2A}EventPlace")),
+        EventReligion=element.findtext(f"{A2A}EventReligion/{A2A}ReligionLiteral"),
+    )
+
+
+def parseSource(element):
+
+    guid = element.findtext(f"{A2A}RecordGUID", "").strip("{}")
+
+    sourceReference = SourceReference()
+    referenceElement = element.find(f"{A2A}SourceReference")
+    if referenceElement is not None:
+        for child in referenceElement:
+            setattr(sourceReference, localName(child), child.text)
+
+    scans = []
+    for scanElement in element.iterfind(f"{A2A}SourceAvailableScans/{A2A}Scan"):
+        scan = Scan()
+        for child in scanElement:
+            setattr(scan, localName(child), child.text)
+        scans.append(scan)
+
+    return Source(
+        guid=guid,
+        SourceType=element.findtext(f"{A2A}SourceType"),
+        SourcePlace=parsePlace(element.find(f"{A2A}SourcePlace")),
+        SourceDate=parseDate(element.find(f"{A2A}SourceDate")),
+        SourceReference=sourceReference,
+        SourceDigitalOriginal=element.findtext(f"{A2A}SourceDigitalOriginal"),
+        Remarks=parseRemarks(element.iterfind(f"{A2A}SourceRemark")),
+        scans=scans,
+    )
+
+
+def parsePlace(element):
+
+    if element is None:
+        return None
+
+    return Place(Place=element.findtext(f"{A2A}Place"))
+
+
+def parseDate(element):
+
+    if element is None:
+        return None
+
+    date = Date()
+    for part in ("Year", "Month", "Day"):
+        try:
+            setattr(date, part, int(element.findtext(f"{A2A}{part}")))
+        except (TypeError, ValueError):
+            pass
+
+    return date
+
+
+def parseRemarks(elements):
+    """
+    Parse (Source|Person)Remark elements into a Remarks dictionary.
+
+    Remarks that consist of 'Key: value' lines are parsed into a (nested)
+    Remarks dictionary. Other remarks are collected in a list of values,
+    since the same key can be given more than once (e.g. 'filename').
+    """
+
+    remarks = Remarks()
+
+    for element in elements:
+        key = element.get("Key")
+        text = "\n".join(v.text or "" for v in element.iterfind(f"{A2A}Value"))
+
+        value = parseRemarkText(text)
+
+        if value:
+            if isinstance(remarks[key], Remarks):
+                remarks[key].update(value)
+            else:
+                remarks[key] = value
+        elif isinstance(remarks[key], list):
+            remarks[key].append(text.strip())
+        elif remarks[key] is None:
+            remarks[key] = [text.strip()]
+
+    return remarks
+
+
+def parseRemarkText(text):
+    """
+    Parse 'Key: value' lines, e.g.:
+
+        Positie op scan: scan: NOTD00964000145; positie: 1178, 1924, 139, 35
+
+    The values of the keys in NESTEDREMARKS, which consist of 'key: value'
+    pairs themselves (separated by '; '), become a nested Remarks
+    dictionary. Keys that occur more than once get a list of values.
+    """
+
+    remarks = Remarks(text=text)
+
+    for line in text.strip().splitlines():
+
+        key, sep, value = line.partition(": ")
+        if not sep:
+            continue
+
+        key = key.strip()
+        value = value.strip()
+
+        if key in NESTEDREMARKS:
+            parts = value.split("; ")
+
+            if all(": " in part for part in parts):
+                value = Remarks(
+                    (k.strip(), v.strip())
+                    for k, v in (part.split(": ", 1) for part in parts)
+                )
+                value.text = line
+
+        if key not in remarks:
+            remarks[key] = value
+        elif isinstance(remarks[key], list):
+            remarks[key].append(value)
+        else:
+            remarks[key] = [remarks[key], value]
+
+    return remarks
+
+
+def localName(element):
+
+    return etree.QName(element).localname
+
+
+def iterHeaders(xmlfile):
+    """
+    Iterate over the OAI headers of the records in a file, without parsing
+    the A2A metadata.
+
+    Args:
+        xmlfile (str or file): Path to the XML file, a page in an archive
+            (see pagestore.py) or a file object.
+
+    Yields:
+        tuple: (identifier, datestamp, deleted) per record.
+    """
+
+    if isinstance(xmlfile, str):
+        with openPage(xmlfile) as infile:
+            yield from iterHeaders(infile)
+        return
+
+    for _, element in etree.iterparse(xmlfile, events=("end",), tag=f"{OAI}header"):
+
+        yield (
+            element.findtext(f"{OAI}identifier"),
+            element.findtext(f"{OAI}datestamp"),
+            element.get("status") == "deleted",
+        )
+
+        element.clear()
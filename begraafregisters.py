@@ -1,4 +1,3 @@
-import gzip
 import os
 import json
 
@@ -6,9 +5,10 @@ import unidecode
 
 import multiprocessing
 
-from rdflib import Graph
-from main import skolemize, bindNS, parsePersonName, getEventPlace
+from main import ga, skolemIRI, parsePersonName, getEventPlace, getSharedTriples
 from model import *
+from emitter import TripleEmitter, Memberships, membership
+from writer import GraphWriter
 
 from lxml import etree as ET
 
@@ -44,6 +44,9 @@ def parse_xml(xml_file, gz=True):
     Parse the old style XML data of the Amsterdam City Archives' Burial
     Registries in the new ROAR++ format. Writes every file to a TriG file.
 
+    The triples of every record are written to the file as soon as the record
+    is converted.
+
     Args:
         xml_file (str): Path to the XML file to parse.
         gz (bool): Whether the TriG file should be gzipped.
@@ -51,13 +54,25 @@ def parse_xml(xml_file, gz=True):
 
     print(f"Parsing {xml_file}")
 
-    g = rdfSubject.db = Graph(identifier=gaIndexUri)
+    filename = os.path.split(xml_file)[1]
+    filename = filename.replace(".xml", ".trig")
+    path = f"trig/{filename}"
+
+    writer = GraphWriter(path, gaIndexUri, gz=gz, authority=ga)
+
+    # Churches and graveyards are written once, see getChurchIndex
+    shared = set()
+
+    # Idem for the members of the scan collections
+    members = Memberships()
 
     tree = ET.parse(xml_file)
     records = tree.findall(".//indexRecord")
 
     for record in records:
 
+        emit = TripleEmitter(genid=skolemIRI)
+
         persons = []
         roles = []
         events = []
@@ -105,22 +120,24 @@ def parse_xml(xml_file, gz=True):
         )
 
         indexCollectionURI = gaIndexUri.term("index")
-        indexCollection = IndexCollection(indexCollectionURI)
+        indexCollection = emit(IndexCollection, indexCollectionURI)
 
         scanCollectionURI = partOfUri + "/scans/"
-        scanCollection = ScanCollection(scanCollectionURI)
-        g.add((partOfUri, rpp.hasDigitalRepresentation, scanCollectionURI))
+        scanCollection = emit(ScanCollection, scanCollectionURI)
+        emit.add((partOfUri, rpp.hasDigitalRepresentation, scanCollectionURI))
 
         # Physical deed
         physicalUri = partOfUri + "#" + identifier
-        physicalDocument = DTBBegraven(
+        physicalDocument = emit(
+            DTBBegraven,
             physicalUri,
             label=[Literal(f"Akte: DTB Begraven", lang="nl")],
             partOf=partOfUri,
         )
 
         # Index document
-        sourceIndex = IndexDocument(
+        sourceIndex = emit(
+            IndexDocument,
             gaIndexUri.term(identifier),
             label=[Literal(f"Index: DTB Begraven", lang="nl")],
             indexOf=physicalDocument,
@@ -128,9 +145,9 @@ def parse_xml(xml_file, gz=True):
         )
 
         if begraafplaats:
-            eventPlace = getEventPlace(begraafplaats)
+            eventPlace = getEventPlace(begraafplaats, shared=shared)
         else:
-            eventPlace = None
+            eventPlace = []
 
         eUri = gaIndexUri.term(identifier + "?event=" + "Event1")
 
@@ -145,7 +162,8 @@ def parse_xml(xml_file, gz=True):
         else:
             registrationDateLiteral = None
 
-        registrationEvent = Begraven(
+        registrationEvent = emit(
+            Begraven,
             eUri,
             # hasPlace=registrationPlace,
             hasTimeStamp=registrationDateLiteral,
@@ -171,7 +189,8 @@ def parse_xml(xml_file, gz=True):
         eventUri = gaIndexUri.term(
             identifier + "#" + "event"
         )  # Use our own NS for event that is registered?
-        event = Event(
+        event = emit(
+            Event,
             None,
             hasTimeStamp=eventDateLiteral,
             hasPlace=eventPlace,
@@ -184,24 +203,34 @@ def parse_xml(xml_file, gz=True):
 
         for n, i in enumerate(ingeschrevenen, 1):
             pns, labels = parsePersonName(
-                givenName=i.find("voornaam").text
-                if i.find("voornaam") is not None
-                else None,
-                surnamePrefix=i.find("tussenvoegsel").text
-                if i.find("tussenvoegsel") is not None
-                else None,
-                baseSurname=i.find("achternaam").text
-                if i.find("achternaam") is not None
-                else None,
+                givenName=(
+                    i.find("voornaam").text if i.find("voornaam") is not None else None
+                ),
+                surnamePrefix=(
+                    i.find("tussenvoegsel").text
+                    if i.find("tussenvoegsel") is not None
+                    else None
+                ),
+                baseSurname=(
+                    i.find("achternaam").text
+                    if i.find("achternaam") is not None
+                    else None
+                ),
+                emit=emit,
             )
 
             pUri = gaIndexUri.term(identifier + "?person=" + str(n))
-            p = Person(
-                pUri, hasName=pns, label=labels, participatesIn=[registrationEvent]
+            p = emit(
+                Person,
+                pUri,
+                hasName=pns,
+                label=labels,
+                participatesIn=[registrationEvent],
             )
             persons.append(p)
 
-            role = Geregistreerde(
+            role = emit(
+                Geregistreerde,
                 None,
                 carriedIn=eUri,
                 carriedBy=[p],
@@ -220,10 +249,10 @@ def parse_xml(xml_file, gz=True):
 
             scanUri = partOfUri + "/scans/" + scanName
 
-            s = Scan(scanUri, label=[scanName], memberOf=scanCollection)
+            s = emit(Scan, scanUri, label=[scanName], memberOf=scanCollection)
             scans.append(s)
 
-        scanCollection.hasMember = scans
+        members.update(membership(scanCollection, "hasMember", scans))
         physicalDocument.hasScan = scans
 
         sourceIndex.onScan = scans
@@ -242,7 +271,7 @@ def parse_xml(xml_file, gz=True):
                 r1, r2 = roles
 
             uri = gaIndexUri.term(identifier + "?relation=" + "Relation1")
-            relation = Relation(uri, label=[relatieinformatie])
+            relation = emit(Relation, uri, label=[relatieinformatie])
 
             # Relation in SAA is from p1 to p2 (p1 is husband of p2)
             # We do it the other way round: p2 has husband p1
@@ -253,7 +282,8 @@ def parse_xml(xml_file, gz=True):
             else:
                 pLabel = "Onbekend"
 
-            relationRole = RelationRole(
+            relationRole = emit(
+                RelationRole,
                 None,
                 carriedIn=registrationEvent,
                 carriedBy=[relation],
@@ -271,21 +301,13 @@ def parse_xml(xml_file, gz=True):
         sourceIndex.mentionsLocation = locations  # empty for this dataset
         sourceIndex.mentionsRelation = relations
 
-    g = skolemize(g)
-    g = bindNS(g)
-
-    print("Serializing...")
+        writer.write(emit.triples)
 
-    filename = os.path.split(xml_file)[1]
-    filename = filename.replace(".xml", ".trig")
-    path = f"trig/{filename}"
+    writer.write(getSharedTriples(shared))
+    writer.write(members.triples())
+    writer.close()
 
-    # gzip
-    if gz:
-        with gzip.open(path + ".gz", "wb") as outfile:
-            outfile.write(g.serialize(format="trig").encode())
-    else:
-        g.serialize(path, format="trig")
+    print(f"Written {writer.count} triples to {writer.path}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,221 @@
+"""
+Concordance tables between the EAD and the A2A data, stored in SQLite.
+
+The tables are filled during the EAD conversion and written to a database
+file, collection by collection as the EAD files are converted. The EAD files
+finish in any order, so every row keeps the rank of the file it came from:
+when two files give a URI for the same key, the file that comes last in the
+list of EAD files wins, as if they had been converted one by one. The A2A
+workers open that file by path, read-only, instead of relying on a forked
+copy of the dictionaries in main.py. This keeps memory constant with more
+workers and also works with the 'spawn' start method.
+"""
+
+import os
+import sqlite3
+
+from rdflib import URIRef
+
+
+def writeConcordance(
+    path,
+    identifier2book,
+    identifier2physicalBook,
+    collection2physicalCollection,
+    rank=0,
+):
+    """
+    Write the concordance dictionaries to a new SQLite database.
+
+    The database is written to a temporary file first and then renamed, so
+    that readers never see a half-written database.
+
+    Args:
+        path (str): Path of the database.
+        identifier2book (dict): Collection -> inventory number -> book (index) URI.
+        identifier2physicalBook (dict): Collection -> inventory number ->
+            physical book URI.
+        collection2physicalCollection (dict): Collection -> physical collection URI.
+        rank (int, optional): Position of the EAD file that the dictionaries
+            come from in the list of EAD files. Defaults to 0.
+    """
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    tmpPath = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmpPath):
+        os.remove(tmpPath)
+
+    connection = sqlite3.connect(tmpPath)
+
+    with connection:
+        connection.execute(
+            "CREATE TABLE book (collection TEXT, identifier TEXT, uri TEXT, "
+            "rank INTEGER, PRIMARY KEY (collection, identifier)) WITHOUT ROWID"
+        )
+        connection.execute(
+            "CREATE TABLE physicalBook (collection TEXT, identifier TEXT, uri TEXT, "
+            "rank INTEGER, PRIMARY KEY (collection, identifier)) WITHOUT ROWID"
+        )
+        connection.execute(
+            "CREATE TABLE physicalCollection (collection TEXT PRIMARY KEY, uri TEXT, "
+            "rank INTEGER)"
+        )
+
+        insertConcordance(
+            connection,
+            identifier2book,
+            identifier2physicalBook,
+            collection2physicalCollection,
+            rank,
+        )
+
+    connection.close()
+
+    os.replace(tmpPath, path)
+
+
+def addConcordance(
+    path,
+    identifier2book,
+    identifier2physicalBook,
+    collection2physicalCollection,
+    rank=0,
+):
+    """
+    Add the concordance of one or more collections to an existing database
+    (see writeConcordance), in one transaction.
+
+    Readers that open the database afterwards see the new collections, so
+    the A2A chunks of a collection can start as soon as its EAD is
+    converted. Existing rows are only replaced by rows of the same or a
+    higher rank, so the result does not depend on the order in which the
+    EAD files are added. The arguments are the same as for writeConcordance.
+    """
+
+    connection = sqlite3.connect(path, timeout=60)
+
+    with connection:
+        insertConcordance(
+            connection,
+            identifier2book,
+            identifier2physicalBook,
+            collection2physicalCollection,
+            rank,
+        )
+
+    connection.close()
+
+
+def insertConcordance(
+    connection,
+    identifier2book,
+    identifier2physicalBook,
+    collection2physicalCollection,
+    rank=0,
+):
+
+    for table, books in (
+        ("book", identifier2book),
+        ("physicalBook", identifier2physicalBook),
+    ):
+        connection.executemany(
+            f"INSERT INTO {table} VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (collection, identifier) DO UPDATE "
+            "SET uri = excluded.uri, rank = excluded.rank "
+            f"WHERE excluded.rank >= {table}.rank",
+            (
+                (collection, identifier, str(uri), rank)
+                for collection, uris in books.items()
+                for identifier, uri in uris.items()
+            ),
+        )
+
+    connection.executemany(
+        "INSERT INTO physicalCollection VALUES (?, ?, ?) "
+        "ON CONFLICT (collection) DO UPDATE "
+        "SET uri = excluded.uri, rank = excluded.rank "
+        "WHERE excluded.rank >= physicalCollection.rank",
+        (
+            (collection, str(uri) if uri else None, rank)
+            for collection, uri in collection2physicalCollection.items()
+        ),
+    )
+
+
+class Concordance:
+    """
+    Read-only access to a concordance database, see writeConcordance.
+
+    Lookups are memoized, since every record of a book asks for the same
+    URIs.
+
+    Usage:
+        concordance = Concordance("data/cache/concordance.sqlite")
+        partOfUri = concordance.getPhysicalBook(collection, inventory, default)
+    """
+
+    def __init__(self, path):
+
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No concordance database at {path}")
+
+        self.connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        self.cache = dict()
+
+    def lookup(self, table, collection, identifier=None):
+
+        key = (table, collection, identifier)
+
+        if key not in self.cache:
+            if identifier is None:
+                row = self.connection.execute(
+                    f"SELECT uri FROM {table} WHERE collection = ?", (collection,)
+                ).fetchone()
+            else:
+                row = self.connection.execute(
+                    f"SELECT uri FROM {table} WHERE collection = ? AND identifier = ?",
+                    (collection, identifier),
+                ).fetchone()
+
+            if row is None:
+                self.cache[key] = KeyError
+            else:
+                self.cache[key] = URIRef(row[0]) if row[0] else None
+
+        return self.cache[key]
+
+    def getBook(self, collection, identifier, default=None):
+        """
+        URI of the book (index) with this inventory number, or the default.
+        """
+
+        uri = self.lookup("book", collection, identifier)
+
+        return default if uri is KeyError else uri
+
+    def getPhysicalBook(self, collection, identifier, default=None):
+        """
+        URI of the physical book with this inventory number, or the default.
+        """
+
+        uri = self.lookup("physicalBook", collection, identifier)
+
+        return default if uri is KeyError else uri
+
+    def getPhysicalCollection(self, collection):
+        """
+        URI of the physical collection. Raises a KeyError if the collection is
+        not in the concordance.
+        """
+
+        uri = self.lookup("physicalCollection", collection)
+
+        if uri is KeyError:
+            raise KeyError(collection)
+
+        return uri
+
+    def close(self):
+
+        self.connection.close()
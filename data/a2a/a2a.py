@@ -1,52 +1,236 @@
+"""
+Harvest the A2A indices of the Amsterdam City Archives over OAI-PMH.
+
+Every set is harvested into its own folder, one numbered XML file per
+response page. The sets are harvested concurrently, each in its own thread.
+The pages of a set can later be packed into one compressed archive with
+pagestore.py in the repository root; the conversion reads both.
+
+After every page the resumptionToken is stored in a small state file
+(harvest.json) in the folder of the set, so an interrupted harvest resumes
+with the next page. Pages and state are written to a temporary file and then
+renamed, so a crash never leaves a half-written page behind.
+
+A completed harvest remembers the responseDate of its first page. With
+incremental=True, a later run only asks for the records that changed since
+then (OAI-PMH 'from') and appends them as new pages, see incremental.py in
+the repository root.
+
+The url is a parameter, so the harvester can be run against a local stub
+OAI-PMH server as well.
+"""
+
 import os
+import json
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 from sickle import Sickle
 from sickle.iterator import OAIResponseIterator
+from sickle.oaiexceptions import NoRecordsMatch
+
+SETS = [
+    ("08953f2f-309c-baf9-e5b1-0cefe3891b37",
+     "SAA-ID-001_SAA_Index_op_notarieel_archief"),
+    ("f6e5401f-c486-5f3d-6a5c-6e277e12628e",
+     "SAA-ID-002_SAA_Index_op_doopregisters"),
+    ("2f352e18-256e-b4d1-e74f-3ffaf5e633f1",
+     "SAA-ID-003_SAA_Index_op_ondertrouwregisters"),
+    ("47828428-360d-afdd-1f07-2c13e34635e1",
+     "SAA-ID-004_SAA_Index_op_kwijtscheldingen"),
+    ("23d6fddb-4839-f080-2b0a-05a21c6162e8",
+     "SAA-ID-005_SAA_Index_op_poorterboeken"),
+    ("c53f836b-d7f0-fcd0-fc99-09192ccb17ad",
+     "SAA-ID-006_SAA_Index_op_confessieboeken"),
+    ("d46628d6-2ed4-95a0-cafc-4cdbb4174263",
+     "SAA-ID-007_SAA_Index_op_boetes_op_trouwen_en_begraven"),
+    ("9823b7a8-ab79-a098-4ab0-26e799ea5659",
+     "SAA-ID-008_SAA_Index_op_begraafregisters_voor_1811"),
+    ("8137be5e-1977-9c2b-1ead-b031fe39ed1e",
+     "SAA-ID-009_SAA_Index_op_overledenen_gast_pest_werk_spinhuis"),
+    ("760c1b75-122c-8965-170a-9b6701184533",
+     "SAA-ID-010_SAA_Index_op_averijgrossen"),
+    ("d5e8b387-d8f9-8a8b-dd17-00f7b6761553",
+     "SAA-ID-011_SAA_Index_op_boedelpapieren"),
+    ("3349cddf-c176-75e8-005f-705dbca96c4f",
+     "SAA-ID-012_SAA_Index_op_lidmatenregister_doopsgezinde_gemeente")
+]
+
+STATEFILE = "harvest.json"
+
+
+def writeAtomic(path, data):
+    """
+    Write bytes to a temporary file and rename it to path.
+    """
+
+    tmpPath = f"{path}.{os.getpid()}.tmp"
+    with open(tmpPath, 'wb') as outfile:
+        outfile.write(data)
+
+    os.replace(tmpPath, path)
+
+
+def loadState(folder):
+
+    path = os.path.join(folder, STATEFILE)
+
+    if os.path.exists(path):
+        with open(path) as infile:
+            return json.load(infile)
+
+    # Harvested before there was a state file, possibly packed since (see
+    # pagestore.py in the repository root)
+    pages = {f for f in os.listdir(folder) if f.endswith('.xml')}
+    if os.path.exists(os.path.join(folder, 'pages.idx.json')):
+        with open(os.path.join(folder, 'pages.idx.json')) as infile:
+            pages.update(json.load(infile))
+    if pages:
+        return {'page': len(pages), 'responseDate': None, 'complete': True}
+    else:
+        return {}
+
+
+def saveState(folder, state):
+
+    writeAtomic(os.path.join(folder, STATEFILE),
+                json.dumps(state, indent=1).encode('utf8'))
+
+
+def harvestSet(url, setSpec, folder, incremental=False, from_=None,
+               metadataPrefix='oai_a2a', **sickleArgs):
+    """
+    Harvest one set, resuming an interrupted harvest of it.
+
+    Args:
+        url (str): Endpoint of the OAI-PMH server.
+        setSpec (str): The set to harvest.
+        folder (str): Folder for the pages and the state file.
+        incremental (bool, optional): If the set was harvested completely
+            before, only harvest the records that changed since then.
+            Defaults to False.
+        from_ (str, optional): Only harvest records with a datestamp from
+            this one. Overrides incremental. Defaults to None.
+        metadataPrefix (str, optional): Defaults to 'oai_a2a'.
+        **sickleArgs: Passed to Sickle, e.g. max_retries or timeout.
+
+    Returns:
+        int: The number of pages written in this run.
+    """
+
+    os.makedirs(folder, exist_ok=True)
+    state = loadState(folder)
+
+    if state.get('resumptionToken'):
+        # Interrupted, continue after the last page that was written
+        params = {'resumptionToken': state['resumptionToken']}
+        print(f"{folder}: resuming after page {state['page']}")
+    elif state.get('complete') and not (incremental or from_):
+        print(f"{folder}: already harvested")
+        return 0
+    else:
+        params = {'metadataPrefix': metadataPrefix, 'set': setSpec}
+
+        if from_ is None and incremental:
+            from_ = state.get('responseDate')
+        if from_:
+            params['from'] = from_
+
+        state = {
+            'setSpec': setSpec,
+            'from': from_,
+            'page': state.get('page', 0),  # new pages are appended
+            'harvested': state.get('responseDate'),
+            'responseDate': None,
+            'resumptionToken': None,
+            'complete': False,
+        }
+        saveState(folder, state)
+
+    sickle = Sickle(url, iterator=OAIResponseIterator, **sickleArgs)
+
+    try:
+        responses = sickle.ListRecords(**params)
+    except NoRecordsMatch:
+        responses = []
+        print(f"{folder}: no new records")
+
+    nPages = 0
+    for response in responses:
+
+        if state['responseDate'] is None:
+            state['responseDate'] = response.xml.findtext(
+                sickle.oai_namespace + 'responseDate')
+
+        state['page'] += 1
+        nPages += 1
+
+        writeAtomic(os.path.join(folder,
+                                 str(state['page']).zfill(9) + '.xml'),
+                    response.raw.encode('utf8').strip())
+
+        # Only after the page is on disk
+        token = responses.resumption_token
+        state['resumptionToken'] = token.token if token else None
+        saveState(folder, state)
+
+        print(f"{folder}: page {state['page']}")
+
+    state['resumptionToken'] = None
+    state['complete'] = True
+
+    # Keep the date of the previous harvest if nothing was returned
+    if state['responseDate'] is None:
+        state['responseDate'] = state.pop('harvested', None)
+    else:
+        state.pop('harvested', None)
+
+    saveState(folder, state)
+
+    return nPages
+
+
+def main(url: str, sets=SETS, folder='.', threads=4, incremental=False,
+         from_=None, **sickleArgs):
+    """
+    Harvest all sets concurrently.
+
+    Args:
+        url (str): Endpoint of the OAI-PMH server.
+        sets (list, optional): List of (setSpec, name) tuples. Defaults to
+            SETS.
+        folder (str, optional): Folder in which every set gets its own
+            folder. Defaults to '.'.
+        threads (int, optional): Number of sets harvested at the same time.
+            Defaults to 4.
+        incremental (bool, optional): See harvestSet. Defaults to False.
+        from_ (str, optional): See harvestSet. Defaults to None.
+        **sickleArgs: Passed to Sickle. Defaults to the retry settings for
+            the archive's server.
+    """
+
+    sickleArgs = {
+        'max_retries': 200,
+        'timeout': 300,
+        'retry_status_codes': [502, 503],
+        **sickleArgs
+    }
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        futures = {
+            executor.submit(harvestSet,
+                            url,
+                            setSpec,
+                            os.path.join(folder, name),
+                            incremental=incremental,
+                            from_=from_,
+                            **sickleArgs): name
+            for setSpec, name in sets
+        }
 
+        for future in as_completed(futures):
+            print(f"{futures[future]}: {future.result()} pages harvested")
 
-def main(url: str):
-    for (setSpec, name) in [
-        ("08953f2f-309c-baf9-e5b1-0cefe3891b37",
-         "SAA-ID-001_SAA_Index_op_notarieel_archief"),
-        ("f6e5401f-c486-5f3d-6a5c-6e277e12628e",
-         "SAA-ID-002_SAA_Index_op_doopregisters"),
-        ("2f352e18-256e-b4d1-e74f-3ffaf5e633f1",
-         "SAA-ID-003_SAA_Index_op_ondertrouwregisters"),
-        ("47828428-360d-afdd-1f07-2c13e34635e1",
-         "SAA-ID-004_SAA_Index_op_kwijtscheldingen"),
-        ("23d6fddb-4839-f080-2b0a-05a21c6162e8",
-         "SAA-ID-005_SAA_Index_op_poorterboeken"),
-        ("c53f836b-d7f0-fcd0-fc99-09192ccb17ad",
-         "SAA-ID-006_SAA_Index_op_confessieboeken"),
-        ("d46628d6-2ed4-95a0-cafc-4cdbb4174263",
-         "SAA-ID-007_SAA_Index_op_boetes_op_trouwen_en_begraven"),
-        ("9823b7a8-ab79-a098-4ab0-26e799ea5659",
-         "SAA-ID-008_SAA_Index_op_begraafregisters_voor_1811"),
-        ("8137be5e-1977-9c2b-1ead-b031fe39ed1e",
-         "SAA-ID-009_SAA_Index_op_overledenen_gast_pest_werk_spinhuis"),
-        ("760c1b75-122c-8965-170a-9b6701184533",
-         "SAA-ID-010_SAA_Index_op_averijgrossen"),
-        ("d5e8b387-d8f9-8a8b-dd17-00f7b6761553",
-         "SAA-ID-011_SAA_Index_op_boedelpapieren"),
-        ("3349cddf-c176-75e8-005f-705dbca96c4f",
-         "SAA-ID-012_SAA_Index_op_lidmatenregister_doopsgezinde_gemeente")
-    ]:
-
-        if os.path.exists(name):
-            continue
-        os.makedirs(name)
-
-        sickleIt = Sickle(url,
-                          iterator=OAIResponseIterator,
-                          max_retries=200,
-                          timeout=300,
-                          retry_status_codes=[502, 503])
-        responses = sickleIt.ListRecords(metadataPrefix='oai_a2a', set=setSpec)
-
-        for n, i in enumerate(responses, 1):
-            print(n)
-            with open(os.path.join(name,
-                                   str(n).zfill(9) + '.xml'), 'wb') as outfile:
-                outfile.write(i.raw.encode('utf8').strip())
 
 if __name__ == "__main__":
     main(
@@ -0,0 +1,85 @@
+"""
+Date parsing and date literals, cached.
+
+The EAD files give their dates (unitdate/@normal) in a small subset of ISO
+8601: 'YYYY', 'YYYY-MM' or 'YYYY-MM-DD', possibly as a range. These are
+parsed directly, with the missing parts taken from a default in the same way
+as dateutil.parser.parse does. Anything else still goes to dateutil.
+
+Both the parsed dates and the literals for the A2A dates repeat a lot across
+inventories and registers, so they are cached per process. The caches are
+typed, so that a date and a datetime (a subclass of date) never share an
+entry.
+"""
+
+import re
+import calendar
+
+from functools import lru_cache
+
+from dateutil import parser
+from rdflib import Literal, XSD
+
+ISODATE = re.compile(r"(\d{4})(?:-(\d{1,2})(?:-(\d{1,2}))?)?")
+
+
+@lru_cache(maxsize=16384, typed=True)
+def parseISODate(date, default):
+    """
+    Parse a date, taking the missing month and/or day from a default.
+
+    Like dateutil.parser.parse, a default day that does not exist in the
+    month (e.g. the 31st for '1650-02') becomes the last day of the month.
+
+    Args:
+        date (str): The date, e.g. '1650', '1650-02' or '1650-02-13'.
+        default (datetime): Source of the missing parts.
+
+    Returns:
+        datetime: The date.
+    """
+
+    match = ISODATE.fullmatch(date)
+
+    if match:
+        year, month, day = match.groups()
+
+        year = int(year)
+        month = int(month) if month else default.month
+
+        if 1 <= month <= 12:
+            lastDay = calendar.monthrange(year, month)[1]
+            day = int(day) if day else min(default.day, lastDay)
+
+            if 1 <= day <= lastDay:
+                return default.replace(year=year, month=month, day=day)
+
+    # Not in the subset, or not a valid date
+    return parser.parse(date, default=default)
+
+
+@lru_cache(maxsize=16384, typed=True)
+def dateLiteral(date):
+    """
+    Literal for a (partial) date.
+
+    Args:
+        date: A date or datetime, or a string in the form 'YYYY' or
+            'YYYY-MM' for incomplete dates (see a2aParser.Date).
+
+    Returns:
+        Literal: An xsd:gYear, xsd:gYearMonth, xsd:date or xsd:dateTime
+            literal, or None if there is no date.
+    """
+
+    if not date:
+        return None
+
+    if type(date) == str and len(date) == 4:
+        return Literal(date, datatype=XSD.gYear)
+    elif type(date) == str and len(date) == 7:
+        return Literal(date, datatype=XSD.gYearMonth)
+    elif type(date) == str:
+        return Literal(date, datatype=XSD.date)
+    else:
+        return Literal(date)
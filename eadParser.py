@@ -1,11 +1,16 @@
 import os
 import xmltodict
 
+from lxml import etree
+
+from types import MappingProxyType
 from datetime import datetime, timedelta
-from dateutil import parser
+from functools import lru_cache
 
 from dataclasses import dataclass
 
+from dates import parseISODate, dateLiteral
+
 
 @dataclass
 class EAD:
@@ -69,6 +74,111 @@ def parseEAD(xmlfile):
     return ead
 
 
+def iterEAD(xmlfile):
+    """
+    Iterate over the components of an EAD file without loading the whole
+    file, as an alternative to parseEAD.
+
+    A component is yielded as soon as its end tag has been read, so after
+    all of its children (post-order). The archival description itself comes
+    last, as a Collection. Like in parseEAD, the components have no children
+    and the descendants of a 'file' component are skipped.
+
+    Args:
+        xmlfile (str or file): Path to, or file object of, the EAD file.
+
+    Yields:
+        tuple: The component (C or Collection) and the list of its
+            ancestors, outermost first.
+    """
+
+    # Components whose end tag has not been read yet, with their element
+    stack = []
+
+    for event, element in etree.iterparse(
+        xmlfile, events=("end",), tag=("archdesc", "c", "did")
+    ):
+
+        parent = element.getparent()
+
+        if element.tag == "did":
+            # The did of a component comes before its children
+            if parent.tag == "archdesc":
+                component = parseCollection(
+                    {"archdesc": {"did": elementToDict(element), "dsc": {"c": []}}}
+                )
+            elif parent.tag == "c":
+                if getattr(stack[-1][1], "level", None) == "file":
+                    continue
+
+                component = parseDsc(
+                    {"did": elementToDict(element), "@level": parent.get("level")},
+                    parentCollection=stack[0][1],
+                )
+            else:
+                continue
+
+            stack.append((parent, component))
+
+        elif stack and stack[-1][0] is element:
+            _, component = stack.pop()
+
+            yield component, [ancestor for _, ancestor in stack]
+
+            # Free the finished component and everything before it
+            element.clear()
+            while element.getprevious() is not None:
+                del parent[0]
+
+
+def getEADIdentifier(xmlfile):
+    """
+    Identifier (inventory number) of the archive described in an EAD file,
+    e.g. '5001', without parsing the rest of the file.
+    """
+
+    for event, element in etree.iterparse(xmlfile, events=("end",), tag="unitid"):
+        did = element.getparent()
+
+        if did.tag == "did" and did.getparent().tag == "archdesc":
+            return element.text.strip()
+
+
+def elementToDict(element, forceList=("note", "c")):
+    """
+    Convert a (small) element to the nested dicts that xmltodict.parse makes
+    of it, so that the dict based parse functions can be reused.
+    """
+
+    item = {f"@{key}": value for key, value in element.attrib.items()}
+    data = [element.text]
+
+    for child in element:
+        data.append(child.tail)
+
+        if not isinstance(child.tag, str):  # comments
+            continue
+
+        value = elementToDict(child, forceList)
+
+        if child.tag not in item:
+            item[child.tag] = [value] if child.tag in forceList else value
+        elif isinstance(item[child.tag], list):
+            item[child.tag].append(value)
+        else:
+            item[child.tag] = [item[child.tag], value]
+
+    data = "".join(i for i in data if i).strip() or None
+
+    if not item:
+        return data
+
+    if data:
+        item["#text"] = data
+
+    return item
+
+
 def parseDsc(serie, parentCollection=None):
 
     did = serie["did"]
@@ -164,6 +274,7 @@ def parseCollection(ead):
     return collection
 
 
+@lru_cache(maxsize=16384)
 def parseDate(
     date,
     circa=None,
@@ -171,9 +282,26 @@ def parseDate(
     defaultBegin=datetime(2100, 1, 1),
     defaultEnd=datetime(2100, 12, 31),
 ):
+    """
+    Parse a unitdate/@normal into sem: timestamps, see dates.parseISODate.
+
+    The timestamps are ready-made Literals (see dates.dateLiteral), not
+    dates, which the model classes accept as they are. The result is cached,
+    since the same dates come back in every inventory, and is therefore
+    read-only.
+
+    Args:
+        date (str): The unitdate/@normal, e.g. '1650', '1650-02-13' or
+            '1650/1660'.
+
+    Returns:
+        MappingProxyType: 'temporal' -> a 'begin/end' string and sem:
+            property (e.g. 'hasBeginTimeStamp') -> xsd:date Literal or None.
+            If a default is given, the (begin, end) datetimes instead.
+    """
 
     if date is None or date == "s.d.":
-        return {}
+        return MappingProxyType({})
 
     date = date.strip()
 
@@ -196,14 +324,14 @@ def parseDate(
     else:  # exact date ?
 
         if circa:
-            begin = parser.parse(date, default=defaultBegin) - timedelta(circa)
-            end = parser.parse(date, default=defaultEnd) + timedelta(circa)
+            begin = parseISODate(date, defaultBegin) - timedelta(circa)
+            end = parseISODate(date, defaultEnd) + timedelta(circa)
         elif len(date) == 4:  # year only
             begin = (datetime(int(date), 1, 1), None)
             end = (None, datetime(int(date), 12, 31))
         else:
-            begin = parser.parse(date, default=defaultBegin)
-            end = parser.parse(date, default=defaultEnd)
+            begin = parseISODate(date, defaultBegin)
+            end = parseISODate(date, defaultEnd)
 
     # And now some sem magic
 
@@ -242,16 +370,16 @@ def parseDate(
 
     dt = {
         "temporal": temporal,
-        "hasTimeStamp": timeStamp,
-        "hasBeginTimeStamp": beginTimeStamp,
-        "hasEarliestBeginTimeStamp": earliestBeginTimeStamp,
-        "hasLatestBeginTimeStamp": latestBeginTimeStamp,
-        "hasEndTimeStamp": endTimeStamp,
-        "hasEarliestEndTimeStamp": earliestEndTimeStamp,
-        "hasLatestEndTimeStamp": latestEndTimeStamp,
+        "hasTimeStamp": dateLiteral(timeStamp),
+        "hasBeginTimeStamp": dateLiteral(beginTimeStamp),
+        "hasEarliestBeginTimeStamp": dateLiteral(earliestBeginTimeStamp),
+        "hasLatestBeginTimeStamp": dateLiteral(latestBeginTimeStamp),
+        "hasEndTimeStamp": dateLiteral(endTimeStamp),
+        "hasEarliestEndTimeStamp": dateLiteral(earliestEndTimeStamp),
+        "hasLatestEndTimeStamp": dateLiteral(latestEndTimeStamp),
     }
 
-    return dt
+    return MappingProxyType(dt)
 
 
 if __name__ == "__main__":
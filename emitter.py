@@ -0,0 +1,259 @@
+"""
+Direct triple emitter for the classes in model.py.
+
+Constructing rdfalchemy `rdfSubject` instances is expensive: every keyword
+goes through a descriptor that reads from and writes to an rdflib Graph. The
+`TripleEmitter` uses the same model classes, but only looks up the predicates
+of their descriptors and appends plain (s, p, o) tuples to a list. The result
+can be added to a Graph or written to a file directly.
+
+rdfalchemy remains the way to work with the model interactively. Functions
+that should work with both take an `emit` argument that defaults to
+`construct`, which simply instantiates the rdfalchemy class.
+"""
+
+from functools import lru_cache
+from collections import defaultdict
+
+from rdflib import RDF, BNode, Literal, URIRef
+from rdfalchemy import rdfSingle, rdfMultiple
+from rdfalchemy.rdfSubject import rdfSubject
+
+
+@lru_cache(maxsize=1024)
+def getPredicates(cls):
+    """
+    Mapping of the properties of a model class to their predicates.
+
+    Args:
+        cls (type): An rdfSubject (sub)class from model.py.
+
+    Returns:
+        dict: Property name -> (predicate, isMultiple)
+    """
+
+    predicates = dict()
+
+    # Walk from the base classes to the class itself, so that a redefined
+    # property (e.g. PersonName.label) overrides the inherited one.
+    for klass in reversed(cls.__mro__):
+        for name, descriptor in vars(klass).items():
+            if isinstance(descriptor, rdfMultiple):
+                predicates[name] = (descriptor.pred, True)
+            elif isinstance(descriptor, rdfSingle):
+                predicates[name] = (descriptor.pred, False)
+
+    return predicates
+
+
+@lru_cache(maxsize=1024)
+def getTypes(cls):
+    """
+    The rdf:type(s) of a model class as a tuple.
+    """
+
+    rdfType = getattr(cls, "rdf_type", None)
+
+    if not rdfType:
+        return ()
+    elif isinstance(rdfType, (tuple, list)):
+        return tuple(rdfType)
+    else:
+        return (rdfType,)
+
+
+def toObject(value):
+    """
+    Convert a property value to an rdflib term, like rdfalchemy does.
+    """
+
+    if isinstance(value, (Resource, rdfSubject)):
+        return value.resUri
+    elif isinstance(value, (URIRef, BNode, Literal)):
+        return value
+    else:
+        return Literal(value)
+
+
+def construct(cls, resUri=None, **kwargs):
+    """
+    Create an rdfalchemy instance. Counterpart of `TripleEmitter.__call__`.
+    """
+
+    return cls(resUri, **kwargs)
+
+
+class Resource:
+    """
+    Lightweight stand-in for an rdfSubject instance.
+
+    It remembers the values it was given, so that code can keep reading them
+    back (e.g. `role.carriedBy[0].hasName[0].literalName`). Assigning a
+    property emits its triples.
+    """
+
+    __slots__ = ("resUri", "_cls", "_emitter", "_values")
+
+    def __init__(self, resUri, cls, emitter):
+        object.__setattr__(self, "resUri", resUri)
+        object.__setattr__(self, "_cls", cls)
+        object.__setattr__(self, "_emitter", emitter)
+        object.__setattr__(self, "_values", dict())
+
+    def __getattr__(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            pass
+
+        try:
+            _, multiple = getPredicates(self._cls)[name]
+        except KeyError:
+            raise AttributeError(f"{self._cls.__name__} has no property {name}")
+
+        return [] if multiple else None
+
+    def __setattr__(self, name, value):
+        self._emitter.set(self, name, value)
+
+    def __repr__(self):
+        return f"{self._cls.__name__}({self.resUri!r})"
+
+
+class TripleEmitter:
+    """
+    Collects the triples of model instances in a list.
+
+    Usage:
+        emit = TripleEmitter()
+        person = emit(Person, uri, hasName=[...], label=[...])
+        person.participatesIn = [event]
+
+        graph += emit.triples
+
+    Multiple-valued properties are emitted append-only. Like rdfalchemy,
+    empty values in a list are skipped. A single-valued property that is
+    None is not emitted.
+
+    Args:
+        triples (list, optional): List to append the triples to.
+        genid (callable, optional): Creates the node of a resource without
+            URI, e.g. a skolem IRI. Defaults to BNode.
+    """
+
+    def __init__(self, triples=None, genid=BNode):
+        self.triples = [] if triples is None else triples
+        self.genid = genid
+
+    def __call__(self, cls, resUri=None, **kwargs):
+
+        if not resUri:
+            resUri = self.genid()
+
+        resource = Resource(resUri, cls, self)
+
+        for rdfType in getTypes(cls):
+            self.triples.append((resUri, RDF.type, rdfType))
+
+        for name, value in kwargs.items():
+            self.set(resource, name, value)
+
+        return resource
+
+    def reference(self, cls, resUri, **values):
+        """
+        A resource whose triples were emitted elsewhere, e.g. taken from a
+        cache. Its values can be read back, but nothing is emitted.
+        """
+
+        resource = Resource(resUri, cls, self)
+        resource._values.update(values)
+
+        return resource
+
+    def add(self, triple):
+        """
+        Add a single (s, p, o) triple.
+        """
+
+        self.triples.append(triple)
+
+    def set(self, resource, name, value):
+
+        try:
+            predicate, multiple = getPredicates(resource._cls)[name]
+        except KeyError:
+            raise AttributeError(
+                f"{resource._cls.__name__} has no property {name}"
+            ) from None
+
+        resource._values[name] = value
+
+        if multiple:
+            if not isinstance(value, (list, tuple)):
+                raise AttributeError(
+                    f"{name} is multiple-valued, pass in a list (it can be a list of one)"
+                )
+
+            for v in value:
+                if v:
+                    self.triples.append((resource.resUri, predicate, toObject(v)))
+
+        elif value is not None:
+            self.triples.append((resource.resUri, predicate, toObject(value)))
+
+
+def membership(resource, name, values):
+    """
+    The triples that add values to a multiple-valued property of a resource,
+    without emitting them. See Memberships.
+
+    Args:
+        resource (Resource): E.g. a collection, from a TripleEmitter.
+        name (str): Name of the property, e.g. 'hasMember'.
+        values (list): The values to add.
+
+    Returns:
+        list: The (s, p, o) triples.
+    """
+
+    predicate, multiple = getPredicates(resource._cls)[name]
+
+    if not multiple:
+        raise AttributeError(f"{name} is not multiple-valued")
+
+    return [(resource.resUri, predicate, toObject(v)) for v in values if v]
+
+
+class Memberships:
+    """
+    Append-only accumulator for the members of collections that are shared
+    by many records, e.g. the scans of an inventory.
+
+    Assigning such a property for every record repeats the collection in
+    every record, and with rdfalchemy every assignment first removes all
+    earlier values. Instead, the members are collected per collection and
+    property while a chunk is converted, and written once at the end.
+
+    Usage:
+        members = Memberships()
+        members.update(membership(scanCollection, "hasMember", scans))
+        ...
+        writer.write(members.triples())
+
+    Every member is kept once, in the order in which it was first added.
+    """
+
+    def __init__(self):
+        self.members = defaultdict(dict)
+
+    def update(self, triples):
+
+        for s, p, o in triples:
+            self.members[s, p][o] = None
+
+    def triples(self):
+
+        for (s, p), objects in self.members.items():
+            for o in objects:
+                yield s, p, o
@@ -0,0 +1,234 @@
+"""
+Incremental A2A conversion based on the OAI-PMH datestamps of the records.
+
+A harvest only appends pages: a record that changed, or was deleted, after an
+earlier harvest shows up again on a later page with a newer datestamp. By
+scanning only the record headers, every record is assigned to the page that
+holds its latest version. Older versions are skipped when their shard is
+converted, so the fingerprint of a shard (see manifest.py) changes only when
+one of its records was superseded, deleted or added, and only those shards
+are rewritten.
+
+Which shards are converted again is decided by their fingerprints in the
+manifest alone. The record -> datestamp -> shard state of every index is kept
+in SQLite only to report what changed since the previous run (RecordState).
+Deleted records get a tombstone in a separate file per index.
+"""
+
+import os
+import sqlite3
+
+from collections import Counter
+
+from rdflib import Literal, RDF, XSD
+
+from a2aParser import iterHeaders
+from model import AS, deed
+from writer import GraphWriter
+
+
+def scanRecords(filenames):
+    """
+    Find the latest version of every record in a harvest.
+
+    Args:
+        filenames (list): Paths to the harvested pages, in harvest order.
+
+    Returns:
+        dict: Identifier -> (datestamp, filename, deleted) of its latest
+            version. With equal datestamps the later page wins.
+    """
+
+    latest = dict()
+
+    for filename in filenames:
+        for identifier, datestamp, deleted in iterHeaders(filename):
+
+            if identifier in latest and latest[identifier][0] > datestamp:
+                continue
+
+            latest[identifier] = (datestamp, filename, deleted)
+
+    return latest
+
+
+def getSkips(chunks, latest):
+    """
+    Records in every chunk that should not be converted, because a newer
+    version is on another page or because the record was deleted.
+
+    Args:
+        chunks (list): Lists of filenames, one per chunk.
+        latest (dict): See scanRecords.
+
+    Returns:
+        list: A sorted tuple of identifiers per chunk.
+    """
+
+    skips = []
+
+    for filenames in chunks:
+        skip = set()
+
+        for filename in filenames:
+            for identifier, datestamp, deleted in iterHeaders(filename):
+                _, latestFilename, latestDeleted = latest[identifier]
+
+                if latestDeleted or latestFilename != filename:
+                    skip.add(identifier)
+
+        skips.append(tuple(sorted(skip)))
+
+    return skips
+
+
+def compareRecords(previous, current):
+    """
+    Count the new, changed, deleted and unchanged records between two runs.
+
+    Args:
+        previous (dict): Identifier -> (datestamp, shard, deleted), see
+            RecordState.get.
+        current (dict): Idem, for this run.
+
+    Returns:
+        Counter: Number of records per status.
+    """
+
+    counts = Counter()
+
+    for identifier, (datestamp, shard, deleted) in current.items():
+
+        if identifier not in previous:
+            counts["deleted" if deleted else "new"] += 1
+        elif deleted and not previous[identifier][2]:
+            counts["deleted"] += 1
+        elif previous[identifier][0] != datestamp:
+            counts["changed"] += 1
+        else:
+            counts["unchanged"] += 1
+
+    return counts
+
+
+def getTombstoneTriples(deleted):
+    """
+    Tombstones for deleted records, on the URI of their index document.
+
+    The OAI identifier of a record is its RecordGUID, so the URI can be made
+    from the header alone.
+
+    Args:
+        deleted (dict): Identifier -> datestamp of the deletion.
+
+    Returns:
+        list: The triples.
+    """
+
+    triples = []
+
+    for identifier, datestamp in sorted(deleted.items()):
+        uri = deed.term(identifier)
+
+        triples.append((uri, RDF.type, AS.Tombstone))
+        triples.append(
+            (
+                uri,
+                AS.deleted,
+                Literal(datestamp, datatype=XSD.dateTime, normalize=False),
+            )
+        )
+
+    return triples
+
+
+def writeTombstones(path, deleted, identifier, gz=True):
+    """
+    Write the tombstones of the deleted records of an index to a TriG file.
+    Without deleted records, the file of an earlier run is removed instead,
+    e.g. after a deleted record was harvested again.
+
+    Args:
+        path (str): Path of the TriG file. '.gz' is appended if gz is True.
+        deleted (dict): Identifier -> datestamp of the deletion.
+        identifier (URIRef): Name of the graph, e.g. the a2a Namespace.
+        gz (bool, optional): Whether the file should be gzipped. Defaults to
+            True.
+
+    Returns:
+        str: The path of the written file, or None if nothing was deleted.
+    """
+
+    if not deleted:
+        for stale in (path, path + ".gz"):
+            if os.path.exists(stale):
+                os.remove(stale)
+
+        return None
+
+    with GraphWriter(path, identifier, gz=gz) as writer:
+        writer.write(getTombstoneTriples(deleted))
+
+    return writer.path
+
+
+class RecordState:
+    """
+    Datestamp, shard and status of every record of every index, as of the
+    previous run. Only for reporting, see compareRecords: the shards to
+    convert follow from getSkips and the manifest.
+
+    Usage:
+        state = RecordState("data/cache/records.sqlite")
+        previous = state.get(collection)
+        ...
+        state.update(collection, current)
+    """
+
+    def __init__(self, path):
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self.connection = sqlite3.connect(path)
+
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS record (collection TEXT, "
+                "identifier TEXT, datestamp TEXT, shard TEXT, deleted INTEGER, "
+                "PRIMARY KEY (collection, identifier)) WITHOUT ROWID"
+            )
+
+    def get(self, collection):
+        """
+        Identifier -> (datestamp, shard, deleted) of all records of an index.
+        """
+
+        return {
+            identifier: (datestamp, shard, bool(deleted))
+            for identifier, datestamp, shard, deleted in self.connection.execute(
+                "SELECT identifier, datestamp, shard, deleted FROM record "
+                "WHERE collection = ?",
+                (collection,),
+            )
+        }
+
+    def update(self, collection, records):
+        """
+        Replace the state of an index in one transaction.
+        """
+
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM record WHERE collection = ?", (collection,)
+            )
+            self.connection.executemany(
+                "INSERT INTO record VALUES (?, ?, ?, ?, ?)",
+                (
+                    (collection, identifier, datestamp, shard, int(deleted))
+                    for identifier, (datestamp, shard, deleted) in records.items()
+                ),
+            )
+
+    def close(self):
+
+        self.connection.close()
@@ -1,8 +1,9 @@
 import json
-import gzip
 
-from main import thesaurus, skolemize, bindNS, unique, getReligion
+from main import ga, thesaurus, unique, getReligion
 from model import *
+from writer import GraphWriter
+from sharedshard import spillPath, writeSpill, mergeShared
 
 jiw = Namespace("https://data.goldenagents.org/datasets/jaikwil/")
 nsHisco = Namespace("https://iisg.amsterdam/resource/hisco/code/hisco/")
@@ -18,7 +19,7 @@ with open("data/jiw/id2ecartico_places_groom.json") as infile:
     id2ecartico_places_groom = json.load(infile)
 
 
-def main(datafile, path, splitSize=0, gz=True):
+def main(datafile, path, splitSize=0, gz=True, shared=False):
 
     with open(datafile) as infile:
         data = json.load(infile)
@@ -40,28 +41,56 @@ def main(datafile, path, splitSize=0, gz=True):
                 chunk = []
 
         for filepath, chunk in chunks:
-            toRDF(chunk, filepath, gz)
+            toRDF(chunk, filepath, gz, shared)
+
+        if shared:
+            # The reconstructions once, see sharedshard.py
+            mergeShared(
+                [spillPath(filepath) for filepath, chunk in chunks],
+                path.replace(".trig", "_shared.trig"),
+                jiw,
+                gz=gz,
+            )
 
 
-def toRDF(data, path, gz):
+def toRDF(data, path, gz, shared=False):
+    """
+    Convert a chunk of records to a (gzipped) TriG file.
 
-    indexCollection = IndexCollection(
-        URIRef("https://data.goldenagents.org/datasets/jaikwil/records/")
-    )
+    Every record is built in its own small graph, that is written to the file
+    and discarded as soon as the record is converted.
+
+    Args:
+        data (list): The records in this chunk.
+        path (str): Path of the TriG file to write.
+        gz (bool): Whether the TriG file should be gzipped.
+        shared (bool, optional): Write the places, occupations, religions and
+            their reconstructions to a spill file for the shared shard (see
+            sharedshard.py) instead. Only the link to the observation they
+            were derived from stays with the record. Defaults to False.
+    """
+
+    print(f"Serializing to {path}")
+
+    writer = GraphWriter(path, jiw, gz=gz, authority=ga)
 
-    ontologyGraph = Graph(identifier=rpp)
     thesaurusGraph = Graph(identifier=thes)
-    graph = Graph(identifier=jiw)
 
     allIndexDocuments = []
 
+    sharedTriples = set()
+
     for n, d in enumerate(data, 1):
 
         if n % 100 == 0:
             print(f"{n}/{len(data)}", end="\r")
 
-        # Switch to A2A graph
-        g = rdfSubject.db = graph
+        # Every record gets its own graph
+        graph = rdfSubject.db = Graph(identifier=jiw)
+
+        indexCollection = IndexCollection(
+            URIRef("https://data.goldenagents.org/datasets/jaikwil/records/")
+        )
 
         mentionedPersons = []
         mentionedLocations = []
@@ -72,6 +101,9 @@ def toRDF(data, path, gz):
         mentionedReligions = []
         mentionedStatuses = []
 
+        # Nodes that are the same in every record that mentions them
+        sharedNodes = set()
+
         # Physical deed
         physicalDocument = Ondertrouwregister(
             URIRef(d["indexOf"]),
@@ -162,12 +194,14 @@ def toRDF(data, path, gz):
                 )
 
                 reconstruction = LocationReconstruction(
-                    unique(ecarticoPlace["@id"]),
+                    unique(ecarticoPlace["@id"], skolem=True),
                     wasDerivedFrom=[location],
                     sameAs=[place],
                     prefLabel=[ecarticoPlace["label"]],
                 )
 
+                sharedNodes.update([place.resUri, reconstruction.resUri])
+
         if d["groom"]["homeLocation"]:
             locName = d["groom"]["homeLocation"]
             location = LocationObservation(
@@ -208,6 +242,7 @@ def toRDF(data, path, gz):
                         d["groom"]["occupation_modern"],
                         d["groom"]["occupation_hisco"],
                         "schema",
+                        skolem=True,
                     ),
                     label=[d["groom"]["occupation_modern"] or d["groom"]["occupation"]],
                 )
@@ -217,7 +252,9 @@ def toRDF(data, path, gz):
 
                 reconstruction = OccupationReconstruction(
                     unique(
-                        d["groom"]["occupation_modern"], d["groom"]["occupation_hisco"]
+                        d["groom"]["occupation_modern"],
+                        d["groom"]["occupation_hisco"],
+                        skolem=True,
                     ),
                     wasDerivedFrom=[occupation],
                     sameAs=[sdoOcc],
@@ -226,6 +263,8 @@ def toRDF(data, path, gz):
                     ],
                 )
 
+                sharedNodes.update([sdoOcc.resUri, reconstruction.resUri])
+
         if d["groom"]["religion"]:
             religionName = d["groom"]["religion"]
             religion = ReligionObservation(
@@ -251,12 +290,14 @@ def toRDF(data, path, gz):
 
             if religionConcept:
                 reconstruction = ReligionReconstruction(
-                    unique("religion", religionName),
+                    unique("religion", religionName, skolem=True),
                     wasDerivedFrom=[religion],
                     sameAs=[religionConcept],
                     label=[religionConcept.label[0]],
                 )
 
+                sharedNodes.update([religionConcept.resUri, reconstruction.resUri])
+
         mentionedPersons.append(groom)
 
         if d["groom"]["exWife"]:
@@ -288,6 +329,7 @@ def toRDF(data, path, gz):
 
             mentionedPersons.append(exWife)
 
+        groomRelations = []
         for w in d["groom"]["witnesses"]:
 
             pnWitness = PersonName(
@@ -326,12 +368,16 @@ def toRDF(data, path, gz):
                     label=[Literal(f"{w['relation']} ({pnWitness.label})", lang="nl")],
                 )
 
-                groomRole.hasRelation = [relationRole]
+                groomRelations.append(relationRole)
 
                 mentionedRelations.append(relation)
 
             mentionedPersons.append(witness)
 
+        # Once, an assignment replaces the earlier relations
+        if groomRelations:
+            groomRole.hasRelation = groomRelations
+
         brideLocations = []
 
         pnBride = PersonName(
@@ -433,6 +479,7 @@ def toRDF(data, path, gz):
                         d["bride"]["occupation_modern"],
                         d["bride"]["occupation_hisco"],
                         "schema",
+                        skolem=True,
                     ),
                     label=[d["bride"]["occupation_modern"] or d["bride"]["occupation"]],
                 )
@@ -442,7 +489,9 @@ def toRDF(data, path, gz):
 
                 reconstruction = OccupationReconstruction(
                     unique(
-                        d["bride"]["occupation_modern"], d["bride"]["occupation_hisco"]
+                        d["bride"]["occupation_modern"],
+                        d["bride"]["occupation_hisco"],
+                        skolem=True,
                     ),
                     wasDerivedFrom=[occupation],
                     sameAs=[sdoOcc],
@@ -451,6 +500,8 @@ def toRDF(data, path, gz):
                     ],
                 )
 
+                sharedNodes.update([sdoOcc.resUri, reconstruction.resUri])
+
         if d["bride"]["religion"]:
             religionName = d["bride"]["religion"]
             religion = Religion(
@@ -476,12 +527,14 @@ def toRDF(data, path, gz):
 
             if religionConcept:
                 reconstruction = ReligionReconstruction(
-                    unique("religion", religionName),
+                    unique("religion", religionName, skolem=True),
                     wasDerivedFrom=[religion],
                     sameAs=[religionConcept],
                     label=[religionConcept.label[0]],
                 )
 
+                sharedNodes.update([religionConcept.resUri, reconstruction.resUri])
+
         if d["bride"]["exHusband"]:
 
             pnExHusband = PersonName(
@@ -511,6 +564,7 @@ def toRDF(data, path, gz):
 
             mentionedPersons.append(exHusband)
 
+        brideRelations = []
         for w in d["bride"]["witnesses"]:
 
             pnWitness = PersonName(
@@ -549,12 +603,15 @@ def toRDF(data, path, gz):
                     label=[Literal(f"{w['relation']} ({pnWitness.label})", lang="nl")],
                 )
 
-                brideRole.hasRelation = [relationRole]
+                brideRelations.append(relationRole)
 
                 mentionedRelations.append(relation)
 
             mentionedPersons.append(witness)
 
+        if brideRelations:
+            brideRole.hasRelation = brideRelations
+
         groomRole.hasLocation = groomLocations
         brideRole.hasLocation = brideLocations
 
@@ -567,23 +624,32 @@ def toRDF(data, path, gz):
         sourceIndex.mentionsReligion = mentionedReligions
         sourceIndex.mentionsStatus = mentionedStatuses
 
-    indexCollection.hasMember = allIndexDocuments
+        if shared:
+            recordTriples = []
+            for triple in graph:
+                s, p, o = triple
+                if s in sharedNodes and p != PROV.wasDerivedFrom:
+                    sharedTriples.add(triple)
+                else:
+                    recordTriples.append(triple)
 
-    graph = skolemize(graph)
-    graph = bindNS(graph)
-    graph.bind(
-        "jiwRec", URIRef("https://data.goldenagents.org/datasets/jaikwil/records/")
+            writer.write(recordTriples)
+        else:
+            writer.write(graph)
+
+    graph = rdfSubject.db = Graph(identifier=jiw)
+
+    indexCollection = IndexCollection(
+        URIRef("https://data.goldenagents.org/datasets/jaikwil/records/")
     )
-    graph.bind("hisco", nsHisco)
+    indexCollection.hasMember = allIndexDocuments
 
-    print(f"Serializing to {path}")
+    writer.write(graph)
+
+    if shared:
+        writeSpill(spillPath(path), writer.serialize(sharedTriples))
 
-    # gzip
-    if gz:
-        with gzip.open(path + ".gz", "wb") as outfile:
-            outfile.write(graph.serialize(format="trig").encode())
-    else:
-        graph.serialize(path, format="trig")
+    writer.close()
 
 
 if __name__ == "__main__":
@@ -3,7 +3,7 @@
 Additional packages needed:
 
 - RDFAlchemy: 
-- pya2a: pip install git+https://github.com/LvanWissen/pya2a.git
+- lxml
 
 """
 
@@ -11,13 +11,17 @@ import multiprocessing
 
 import os
 import json
-import gzip
+import time
 import uuid
 import unidecode
-from collections import defaultdict
+from collections import defaultdict, Counter
+from functools import lru_cache
+from itertools import chain
+from types import MappingProxyType
 
-from eadParser import parseEAD
-from pya2a import DocumentCollection as A2ADocumentCollection
+from eadParser import iterEAD, getEADIdentifier
+from a2aParser import iterRecords, parseRecord, Remarks
+from lxml import etree
 
 from rdflib import Dataset, Namespace, Literal, BNode, XSD, RDF, RDFS, URIRef
 from rdfalchemy import rdfSubject
@@ -25,12 +29,79 @@ from rdfalchemy import rdfSubject
 import rdflib.graph
 from rdflib.term import skolem_genid
 from model import *
+from emitter import TripleEmitter, Memberships, construct, membership
+from dates import dateLiteral
+from concordance import Concordance, writeConcordance, addConcordance
+from manifest import RunManifest, fingerprint, toNTriples, fromNTriples
+from pagestore import listPages
+from scheduling import (
+    Chunk,
+    getTemporalWindows,
+    getWindowPaths,
+    planChunks,
+    chunkFingerprint,
+    chunkOutputs,
+    getRequires,
+    runTasks,
+)
+from incremental import (
+    RecordState,
+    scanRecords,
+    getSkips,
+    compareRecords,
+    writeTombstones,
+)
+from tables import (
+    getUri2notary,
+    getBgGuid2index,
+    getLabelChurch2location,
+    getLabelReligion2religion,
+    getChurches,
+    getReligions,
+)
+from writer import GraphWriter
+from recordcache import RecordCache
+from sharedshard import spillPath, writeSpill, mergeShared
 
 ga = Namespace("https://data.goldenagents.org/datasets/")
 rdflib.graph.DATASET_DEFAULT_GRAPH_ID = ga
 
 gaPersonName = Namespace("https://data.goldenagents.org/datasets/personname/")
 
+# Terms that were already emitted for the current chunk, as (URI, label),
+# see thesaurusTerm. Cleared by convertA2A for every chunk.
+termRegistry = dict()
+
+# Keys of the registered terms that were asked for, so that convertA2A can
+# store the terms of a record in the record cache
+usedTerms = set()
+
+# Model classes that were created for thesaurus terms, see getTermClass
+termClasses = dict()
+
+# Hits and misses of the caches in this (worker) process, see reportCacheStats
+cacheStats = Counter()
+
+# Files that the conversion depends on besides its input, see the version
+# stamp in main
+DEPENDENCIES = [
+    "main.py",
+    "model.py",
+    "emitter.py",
+    "a2aParser.py",
+    "eadParser.py",
+    "dates.py",
+    "writer.py",
+    "incremental.py",
+    "sharedshard.py",
+    "data/uri2notary.json",
+    "data/concordance/bg_mapping_index_guid.json",
+    "data/churches/label2location.json",
+    "data/churches/label2religion.json",
+    "data/churches/churches.json",
+    "data/churches/religions.json",
+]
+
 index2name = {
     "08953f2f-309c-baf9-e5b1-0cefe3891b37": "SAA-ID-001_SAA_Index_op_notarieel_archief",
     "f6e5401f-c486-5f3d-6a5c-6e277e12628e": "SAA-ID-002_SAA_Index_op_doopregisters",
@@ -91,18 +162,14 @@ language2iso = {
     "overig": "other",
 }
 
-# Global dictionaries
+# Global dictionaries, filled during the EAD conversion. The A2A workers read
+# them from a database, see concordance.py
 identifier2book = defaultdict(dict)
 identifier2physicalBook = defaultdict(dict)
 collection2physicalCollection = dict()
 
-with open("data/uri2notary.json") as infile:
-    uri2notary = json.load(infile)
-
-    uri2notary = {URIRef(k): [URIRef(i) for i in v] for k, v in uri2notary.items()}
-
-with open("data/concordance/bg_mapping_index_guid.json") as infile:
-    bg_guid2index = json.load(infile)
+# The lookup tables (uri2notary, bg_mapping_index_guid, churches and
+# religions) are loaded lazily, see tables.py
 
 # with open('data/scanid2name_5075.json') as infile:
 #     scanid2name = json.load(infile)
@@ -113,48 +180,177 @@ with open("data/concordance/bg_mapping_index_guid.json") as infile:
 # with open('data/scanids/collection2scansname.json') as infile:
 #     collection2scansname = json.load(infile)
 
-# Locations (Churches and Graveyards for Baptism and Burial)
-with open("data/churches/label2location.json") as infile:
-    labelChurch2location = json.load(infile)
-
-with open("data/churches/label2religion.json") as infile:
-    labelReligion2religion = json.load(infile)
-
-with open("data/churches/churches.json") as infile:
-    churchesDict = json.load(infile)
-    churchesDict = {i["@id"]: i for i in churchesDict["@graph"]}
-
-with open("data/churches/religions.json") as infile:
-    religionsDict = json.load(infile)
-    religionsDict = {i["@id"]: i for i in religionsDict["@graph"]}
 
 # Functions
-def unique(*args, sep="", ns=None):
+def unique(*args, sep="", ns=None, skolem=False):
     """Function to generate a unique BNode based on a series of arguments.
 
     Uses the uuid5 function to generate a uuid from one or multiple ordered
     arguments. This way, the BNode function of rdflib can be used, without the
     need to filter strange characters or spaces that will break the serialization.
 
+    With skolem=True, the skolem IRI of that BNode is returned instead, so that
+    the graph does not have to be skolemized afterwards.
+
     Returns:
         BNode: Blank node with identifier that is based on the function's input.
     """
 
     identifier = "".join(str(i) for i in args)  # order matters
 
+    return uniqueTerm(identifier, ns=ns, skolem=skolem)
+
+
+@lru_cache(maxsize=65536)
+def uniqueTerm(identifier, ns=None, skolem=False):
+    """
+    The node of `unique` for an identifier. Memoized, since the same names
+    and places come back in many records.
+    """
+
     unique_id = uuid.uuid5(uuid.NAMESPACE_X500, identifier)
 
     if ns:
         return ns.term(str(unique_id))
+    elif skolem:
+        return skolemIRI(unique_id)
     else:
         return BNode(unique_id)
 
 
+def skolemIRI(identifier=None):
+    """
+    Skolem IRI for a node that would otherwise be a BNode.
+
+    The IRI is the same as the one `Graph.skolemize` gives to `BNode(identifier)`,
+    under the ga authority and rdflib's skolem_genid basepath.
+
+    Args:
+        identifier (str, optional): Identifier of the BNode. A new one is
+            generated if None. Defaults to None.
+
+    Returns:
+        URIRef: The skolem IRI.
+    """
+
+    return BNode(identifier).skolemize(authority=ga, basepath=skolem_genid)
+
+
 def thesaurus(name, ClassType, defaultGraph, thesaurusGraph, subClassOf=None):
 
+    g = rdfSubject.db = thesaurusGraph
+
+    classType, name = thesaurusTerm(name, ClassType, subClassOf=subClassOf)
+
+    g = rdfSubject.db = defaultGraph  # restore graph
+
+    return classType, name
+
+
+def thesaurusTerm(name, ClassType, subClassOf=None, emit=construct, registry=None):
+    """
+    Create a thesaurus (or ontology) term for a name from the source.
+
+    If a registry is given, every term is only emitted the first time it is
+    asked for. After that, a reference to the registered term is returned,
+    see TripleEmitter.reference. The registry only keeps the URI and the
+    label, so it does not hold on to the emitter of an earlier chunk.
+
+    Args:
+        name (str): The name as given in the source.
+        ClassType (type): Model class of the term.
+        subClassOf (URIRef, optional): Superclass of the term. Defaults to None.
+        emit (callable, optional): Constructor for the term, see emitter.py.
+            Defaults to construct.
+        registry (dict, optional): Terms that were already emitted, e.g.
+            termRegistry. Requires a TripleEmitter as emit. Defaults to None.
+
+    Returns:
+        tuple: The term and the cleaned name, or (None, "").
+    """
+
     if not name:
         return None, ""
 
+    if registry is not None:
+        key = (name, ClassType, subClassOf)
+        usedTerms.add(key)
+
+        if key in registry:
+            cacheStats["thesaurus term hits"] += 1
+            uri, name = registry[key]
+
+            if uri is None:
+                return None, ""
+
+            values = {"subClassOf": subClassOf} if subClassOf else {}
+            return emit.reference(ClassType, uri, label=[name], **values), name
+
+        cacheStats["thesaurus term misses"] += 1
+
+    name, namenorm = normalizeTerm(name)
+
+    if not namenorm:  # if no characters are left
+        classType, name = None, ""
+    else:
+        classType = emit(ClassType, thes.term(namenorm), label=[name])
+
+        if subClassOf:
+            classType.subClassOf = subClassOf
+
+    if registry is not None:
+        registry[key] = (classType.resUri if classType else None, name)
+
+    return classType, name
+
+
+def getTermClass(name, base, rdfType):
+    """
+    Get the model class for a thesaurus term, e.g. a Document subclass with
+    the DocumentType of a record as rdf:type.
+
+    Every class is created once per process, keyed by the URI of the term, and
+    reused afterwards. The time spent creating classes is kept in cacheStats,
+    to estimate the time the reuse saves.
+
+    Args:
+        name (str): Name of the class, e.g. the SourceType from the source.
+        base (type): Model class to subclass, e.g. Document.
+        rdfType (URIRef): URI of the thesaurus term.
+
+    Returns:
+        type: The model class.
+    """
+
+    key = (base, rdfType)
+
+    if key in termClasses:
+        cacheStats["term class hits"] += 1
+        return termClasses[key]
+
+    cacheStats["term class misses"] += 1
+
+    start = time.perf_counter()
+    termClass = type(name, (base,), {"rdf_type": rdfType})
+    cacheStats["term class seconds"] += time.perf_counter() - start
+
+    termClasses[key] = termClass
+
+    return termClass
+
+
+@lru_cache(maxsize=4096)
+def normalizeTerm(name):
+    """
+    Clean a name from the source and normalize it for use in a thesaurus URI.
+
+    Args:
+        name (str): The name as given in the source.
+
+    Returns:
+        tuple: The cleaned name and the normalized name (only ASCII letters).
+    """
+
     name = name.replace("other:", "").replace("Other:", "").strip()
     namenorm = unidecode.unidecode(name)
     namenorm = namenorm.title()
@@ -162,27 +358,104 @@ def thesaurus(name, ClassType, defaultGraph, thesaurusGraph, subClassOf=None):
         [i for i in namenorm if i.lower() in "abcdefghijklmnopqrstuvwxyz"]
     )
 
-    if not namenorm:  # if no characters are left
-        return None, ""
+    return name, namenorm
 
-    g = rdfSubject.db = thesaurusGraph
 
-    classType = ClassType(thes.term(namenorm), label=[name])
+def reportCacheStats(stats):
+    """
+    Print the hit rate of every cache.
 
-    if subClassOf:
-        classType.subClassOf = subClassOf
+    If the time spent on the misses is given ('<cache> seconds'), the time
+    saved by the hits is estimated from it.
 
-    g = rdfSubject.db = defaultGraph  # restore graph
+    Args:
+        stats (Counter): Counts with '<cache> hits' and '<cache> misses' keys,
+            e.g. cacheStats.
+    """
 
-    return classType, name
+    caches = sorted({key.rsplit(" ", 1)[0] for key in stats})
+
+    for cache in caches:
+        hits = stats[f"{cache} hits"]
+        misses = stats[f"{cache} misses"]
+
+        if hits + misses:
+            rate = hits / (hits + misses)
+            print(f"{cache}: {hits} hits, {misses} misses ({rate:.1%})")
+
+        if misses and (seconds := stats[f"{cache} seconds"]):
+            saved = hits * seconds / misses
+            print(f"{cache}: {seconds:.3f}s spent, ~{saved:.3f}s saved")
+
+
+@lru_cache(maxsize=None)
+def getChurchIndex():
+    """
+    Frozen index with the ready-made triples of every church and religion.
+
+    The church and religion data is static, so the Location and Concept
+    triples are built only once per process. The triples of a church include
+    those of its religions.
+
+    Returns:
+        MappingProxyType: URIRef of a church or religion -> tuple of triples.
+    """
+
+    index = dict()
+
+    for religionUri, religionData in getReligions().items():
+        emit = TripleEmitter()
+        emit(Concept, URIRef(religionUri), label=[religionData["label"]])
+
+        index[URIRef(religionUri)] = tuple(emit.triples)
+
+    for churchUri, churchData in getChurches().items():
+        religionUris = [
+            URIRef(i) for i in churchData["religions"] if URIRef(i) in index
+        ]
+
+        sameAs = [
+            URIRef(i) for i in [churchData["adamlink"], churchData["wikidata"]] if i
+        ]
+
+        emit = TripleEmitter()
+        emit(
+            Location,
+            URIRef(churchUri),
+            label=[churchData["label"]],
+            hasReligion=religionUris,
+            sameAs=sameAs,
+        )
+
+        for religionUri in religionUris:
+            emit.triples += index[religionUri]
+
+        index[URIRef(churchUri)] = tuple(emit.triples)
 
+    return MappingProxyType(index)
 
-def getEventPlace(placeName: str) -> Location:
+
+def getSharedTriples(shared):
+    """
+    The triples of the churches and religions in `shared`, see
+    getEventPlace and getReligion.
+    """
+
+    churchIndex = getChurchIndex()
+
+    return chain.from_iterable(churchIndex[uri] for uri in sorted(shared))
+
+
+def getEventPlace(placeName: str, emit=construct, shared=None) -> Location:
     """
     Gives back an RDFAlchemy Location object based on the name of a church or graveyard.
 
     A mapping is used to map the right label (in source) to the right URI.
 
+    If a `shared` set is given, only the URIs of the churches are returned and
+    added to the set. Their triples can be taken from the church index once
+    per output graph, see getSharedTriples.
+
     Example Church data:
         ```json
         {
@@ -197,6 +470,8 @@ def getEventPlace(placeName: str) -> Location:
 
     Args:
         placeName (str): The name of the church or graveyard, as indicated by the City Archives of Amsterdam.
+        emit (callable, optional): Constructor for the instances, see emitter.py. Defaults to construct.
+        shared (set, optional): URIs of the churches and religions to emit once per output graph. Defaults to None.
 
     Returns:
         Location: ROAR Location instance
@@ -204,26 +479,41 @@ def getEventPlace(placeName: str) -> Location:
     """
 
     locations = []
-    churchesUris = labelChurch2location.get(placeName, [])
+    churchesUris = getLabelChurch2location().get(placeName, [])
+
+    if shared is not None:
+        churchIndex = getChurchIndex()
+
+        for churchUri in churchesUris:
+            if URIRef(churchUri) in churchIndex:
+                locations.append(URIRef(churchUri))
+
+        shared.update(locations)
+
+        return locations
 
     for churchUri in churchesUris:
 
-        churchData = churchesDict.get(churchUri, {})
+        churchData = getChurches().get(churchUri, {})
         label = churchData["label"]
         religionUris = churchData["religions"]
 
         religions = []
         for religionUri in religionUris:
 
-            religion = getReligion(religionUri=religionUri)
+            religion = getReligion(religionUri=religionUri, emit=emit)
             religions.append(religion)
 
         sameAs = [
             URIRef(i) for i in [churchData["adamlink"], churchData["wikidata"]] if i
         ]
 
-        eventPlace = Location(
-            URIRef(churchUri), label=[label], hasReligion=religions, sameAs=sameAs
+        eventPlace = emit(
+            Location,
+            URIRef(churchUri),
+            label=[label],
+            hasReligion=religions,
+            sameAs=sameAs,
         )
 
         locations.append(eventPlace)
@@ -231,12 +521,17 @@ def getEventPlace(placeName: str) -> Location:
     return locations
 
 
-def getReligion(religionName="", religionUri="") -> Concept:
+def getReligion(
+    religionName="", religionUri="", emit=construct, shared=None
+) -> Concept:
     """
     Gives back an RDFAlchemy Concept object based on the name of a religion.
 
     A mapping is used in case a relgionName is supplied.
 
+    If a `shared` set is given, only the URI of the religion is returned and
+    added to the set, see getEventPlace.
+
     Example Religion data:
         ```json
         {
@@ -249,35 +544,55 @@ def getReligion(religionName="", religionUri="") -> Concept:
     Args:
         religionName (str, optional): Name of the religion as given in the source (SAA). Defaults to "".
         religionUri (str, optional): URI of the religion. Defaults to "".
+        emit (callable, optional): Constructor for the instance, see emitter.py. Defaults to construct.
+        shared (set, optional): URIs of the churches and religions to emit once per output graph. Defaults to None.
 
     Returns:
         Concept: SKOS Concept instance
     """
 
     if religionName:
-        religionUri = labelReligion2religion.get(religionName)
+        religionUri = getLabelReligion2religion().get(religionName)
     elif not religionUri:
         return None
 
-    religionData = religionsDict.get(religionUri)
+    religionData = getReligions().get(religionUri)
 
     if not religionData:
         print(religionName, religionUri)
         return None
 
+    if shared is not None:
+        shared.add(URIRef(religionUri))
+        return URIRef(religionUri)
+
     religionLabel = religionData["label"]
-    religion = Concept(URIRef(religionUri), label=[religionLabel])
+    religion = emit(Concept, URIRef(religionUri), label=[religionLabel])
 
     return religion
 
 
-def parsePersonName(
+@lru_cache(maxsize=131072)
+def getPersonName(
     nameString=None, givenName=None, surnamePrefix=None, baseSurname=None
 ):
-    """ """
+    """
+    Parse a name into the values and triples of its PersonName.
 
-    pns = []
-    labels = []
+    Memoized: the same first names, patronyms and surnames come back in
+    every register, and the PersonName has a URI based on its parts.
+
+    Args:
+        nameString (str, optional): Full name in the form
+            'baseSurname, givenName [surnamePrefix]'. Only used if none of
+            the parts are given. Defaults to None.
+        givenName (str, optional): Defaults to None.
+        surnamePrefix (str, optional): Defaults to None.
+        baseSurname (str, optional): Defaults to None.
+
+    Returns:
+        tuple: The URI, the property values (read-only) and the triples.
+    """
 
     if (
         nameString
@@ -304,19 +619,79 @@ def parsePersonName(
     literalName = " ".join(i for i in [givenName, surnamePrefix, baseSurname] if i)
 
     # Attempt to limit the number of bNodes. Use our own uri.
-    pn = PersonName(
-        unique(givenName, surnamePrefix, baseSurname, sep="@ga@", ns=gaPersonName),
-        literalName=literalName if literalName else "Unknown",
-        label=literalName if literalName else "Unknown",
-        givenName=givenName,
-        surnamePrefix=surnamePrefix,
-        baseSurname=baseSurname,
+    uri = unique(givenName, surnamePrefix, baseSurname, sep="@ga@", ns=gaPersonName)
+    values = MappingProxyType(
+        dict(
+            literalName=literalName if literalName else "Unknown",
+            label=literalName if literalName else "Unknown",
+            givenName=givenName,
+            surnamePrefix=surnamePrefix,
+            baseSurname=baseSurname,
+        )
     )
 
-    pns.append(pn)
-    labels.append(pn.label)
+    emit = TripleEmitter()
+    emit(PersonName, uri, **values)
 
-    return pns, labels
+    return uri, values, tuple(emit.triples)
+
+
+def parsePersonName(
+    nameString=None,
+    givenName=None,
+    surnamePrefix=None,
+    baseSurname=None,
+    emit=construct,
+    names=None,
+):
+    """
+    PersonName for a full name or its parts, see getPersonName.
+
+    With a TripleEmitter, the memoized triples are emitted. If a `names`
+    dictionary is given, they are not emitted at all, but the name is added to
+    it, so that its triples can be written once per output graph (see
+    getNameTriples).
+
+    Returns:
+        tuple: A list with the PersonName and a list with its label.
+    """
+
+    key = (nameString, givenName, surnamePrefix, baseSurname)
+    uri, values, triples = getPersonName(*key)
+
+    if not isinstance(emit, TripleEmitter):
+        pn = emit(PersonName, uri, **values)
+    else:
+        pn = emit.reference(PersonName, uri, **values)
+
+        if names is None:
+            emit.triples += triples
+        else:
+            names.setdefault(uri, key)
+
+    return [pn], [pn.label]
+
+
+def getNameTriples(names):
+    """
+    The triples of the PersonNames in `names` (URI -> key of getPersonName),
+    see parsePersonName.
+    """
+
+    return chain.from_iterable(getPersonName(*names[uri])[2] for uri in sorted(names))
+
+
+def getCacheInfo():
+    """
+    Statistics of the memoized functions that are reported with cacheStats,
+    see reportCacheStats.
+    """
+
+    return {
+        "date literal": dateLiteral.cache_info(),
+        "person name": getPersonName.cache_info(),
+        "unique node": uniqueTerm.cache_info(),
+    }
 
 
 def bindNS(g):
@@ -339,194 +714,540 @@ def bindNS(g):
     return g
 
 
-def skolemize(g):
-
-    new_g = Graph(identifier=g.identifier)
-    g = g.skolemize(new_graph=new_g, authority=ga, basepath=skolem_genid)
-
-    return g
-
-
 def main(
     eadfolder="data/ead",
     a2afolder="data/a2a",
     outfile="rpp.trig",
     splitFile=True,
     splitSize=100,
+    chunkBy="bytes",
+    recordsPerFile=None,
     temporal=False,
     window=10,
     shift=5,
+    concordance="data/cache/concordance.sqlite",
+    processes=None,
+    maxInFlight=None,
+    manifest="trig/manifest.json",
+    resume=True,
+    incremental=False,
+    state="data/cache/records.sqlite",
+    recordCache="data/cache/recordcache.sqlite",
+    recordCacheSize=2 * 1024**3,
+    sharedNames=False,
+    sharedShard=None,
 ):
 
     ds = Dataset()
 
-    # EAD
-    print("EAD parsing!")
-    g = rdfSubject.db = ds.graph(identifier=ga.term("saa/ead/"))
-    for dirpath, dirname, filenames in os.walk(eadfolder):
-        for n, f in enumerate(sorted(filenames), 1):
-            print(f"{n}/{len(filenames)} {f}")
-            if f.endswith(".xml"):
-                convertEAD(os.path.join(dirpath, f), g)
-            else:
-                continue
+    # Steps that are done with unchanged inputs are skipped, see manifest.py
+    manifest = RunManifest(manifest)
 
-            if splitFile:
-                path = f"trig/{f}.trig"
-                g = skolemize(g)
-                g = bindNS(g)
+    eadFilenames = [
+        os.path.join(dirpath, f)
+        for dirpath, dirname, filenames in os.walk(eadfolder)
+        for f in sorted(filenames)
+        if f.endswith(".xml")
+    ]
 
-                print("Serializing to", path)
-                g.serialize(path, format="trig")  # TEMPORARY
-                ds.remove_graph(g)
-                g = rdfSubject.db = ds.graph(identifier=ga.term("saa/ead/"))
-            else:
-                pass  # nobody wants a single file
+    # Version stamp of the code and the lookup tables. A change to any of them
+    # makes every step run again, also with resume, and invalidates all
+    # cached records. It is part of every fingerprint below.
+    codeVersion = fingerprint([f for f in DEPENDENCIES if os.path.exists(f)])
+    eadFingerprint = fingerprint(eadFilenames, (codeVersion,))
+
+    if processes is None:
+        processes = max(multiprocessing.cpu_count() - 1, 1)
+
+    # Load the lookup tables once, before the workers are forked
+    getUri2notary()
+    getBgGuid2index()
+    getChurchIndex()
+
+    # EAD
+    # The EAD files are converted in the same pool as the A2A chunks (see
+    # below), so that the chunks of a collection can start as soon as its
+    # EAD is done. Without splitFile the EAD triples only end up in the
+    # dataset of this run, so the step is never skipped.
+    if resume and splitFile and manifest.isDone("ead", eadFingerprint):
+        print("EAD unchanged, using", concordance)
+        eadTodo = []
+    else:
+        print("EAD parsing!")
+        eadTodo = eadFilenames
+        eadOutputs = [concordance]
+
+        # Filled per collection, as the EAD files are converted
+        writeConcordance(concordance, {}, {}, {})
 
-    # with open('data/concordance/5001_identifier2physicalBook.json',
-    #           'w') as outfile:
-    #     json.dump(identifier2physicalBook, outfile)
+    # Archive (e.g. '5001') -> EAD files that describe it
+    eadCollections = defaultdict(list)
+    for xmlfile in eadTodo:
+        eadCollections[getEADIdentifier(xmlfile)].append(xmlfile)
 
-    # with open('data/concordance/5001_identifier2book.json', 'w') as outfile:
-    #     json.dump(identifier2book, outfile)
+    # Rows of a later EAD file win in the concordance, see concordance.py
+    eadRanks = {xmlfile: rank for rank, xmlfile in enumerate(eadTodo)}
 
     # A2A
     print("A2A parsing!")
-    g = rdfSubject.db = ds.graph(identifier=ga.term("saa/a2a/"))
-    for dirpath, dirname, filenames in os.walk(a2afolder):
 
-        if dirpath == "data/a2a":  # one level deeper
-            continue
+    if temporal:
+        windows = getTemporalWindows(temporal, window=window, shift=shift)
+    else:
+        windows = False
 
-        # # DTB + NA + Confessie
-        # if 'doop' not in dirpath and 'ondertr' not in dirpath and 'begraaf' not in dirpath:
-        #     continue
+    # Version stamp of the record cache: any change to the code, the lookup
+    # tables or the EAD invalidates all cached records
+    cacheVersion = eadFingerprint if recordCache else None
 
-        # if "nota" not in dirpath:
-        #     continue
+    runStats = Counter()
 
-        # DTB + NA for now
-        # if 'begraafreg' not in dirpath and 'ondertrouwregisters' not in dirpath and 'doopregisters' not in dirpath and 'nota' not in dirpath:
-        #    continue
+    # Term triples returned by the workers, merged as sets
+    ontologyTriples = set()
+    thesaurusTriples = set()
 
-        filenames = [
-            os.path.abspath(os.path.join(dirpath, i))
-            for i in sorted(filenames)
-            if i.endswith(".xml")
-        ]
+    # The chunks of all collections go to one pool
+    chunks = []
+
+    if incremental:
+        # Record -> datestamp -> shard of the previous run, to report what
+        # changed. What is converted again follows from the manifest.
+        recordState = RecordState(state)
+        newStates = dict()
+
+    for dirpath, dirname, filenames in os.walk(a2afolder):
+
+        colName = os.path.basename(dirpath)
+
+        # Only the folders of the index sets, not a2afolder itself or e.g. a
+        # __pycache__ of the harvester
+        if colName not in name2index:
+            continue
+
+        # Loose XML files and/or pages packed into an archive, see pagestore.py
+        filenames = listPages(dirpath)
 
-        colName = dirpath.rsplit("/", 1)[-1]
         indexCollectionURI = a2a.term(name2index[colName])
         indexCollectionName = "Index collection: " + index2nicename[name2index[colName]]
 
-        chunks = []
-        foldername = dirpath.rsplit("/")[-1]
+        foldername = dirpath.rsplit("/")[-1]
+
+        if incremental:
+            # Only the latest version of every record is converted, see
+            # incremental.py. Chunks are planned by file, so that the shard
+            # boundaries do not move when new pages are harvested.
+            plan = planChunks(filenames, splitSize=splitSize, chunkBy="files")
+            latest = scanRecords(filenames)
+            skips = getSkips([fns for fns, weight in plan], latest)
+        else:
+            plan = planChunks(
+                filenames,
+                splitSize=splitSize,
+                chunkBy=chunkBy,
+                recordsPerFile=recordsPerFile,
+            )
+            skips = [()] * len(plan)
+
+        file2shard = dict()
+        for nSplit, ((fns, weight), skip) in enumerate(zip(plan, skips), 1):
+            path = f"trig/{foldername}_{str(nSplit).zfill(4)}.trig"
+            file2shard.update(dict.fromkeys(fns, path))
+
+            chunks.append(
+                (
+                    weight,
+                    Chunk(
+                        fns,
+                        path,
+                        indexCollectionURI,
+                        indexCollectionName,
+                        windows,
+                        True,  # gz
+                        concordance,
+                        skip,
+                        recordCache,
+                        cacheVersion,
+                        recordCacheSize,
+                        sharedNames,
+                        bool(sharedShard),
+                    ),
+                )
+            )
+
+        if incremental:
+            current = {
+                identifier: (datestamp, file2shard[filename], deleted)
+                for identifier, (datestamp, filename, deleted) in latest.items()
+            }
+            counts = compareRecords(recordState.get(foldername), current)
+            print(
+                f"{foldername}: {counts['new']} new, {counts['changed']} changed, "
+                f"{counts['deleted']} deleted, {counts['unchanged']} unchanged records"
+            )
+            newStates[foldername] = current
+
+            deleted = {
+                identifier: datestamp
+                for identifier, (datestamp, filename, isDeleted) in latest.items()
+                if isDeleted
+            }
+            tombstonePath = f"trig/{foldername}_tombstones.trig"
+            tombstoneFingerprint = fingerprint(
+                [], (codeVersion, tuple(sorted(deleted.items())))
+            )
+
+            # Also when nothing is deleted (anymore), to remove the file of an
+            # earlier run
+            if not manifest.isDone(tombstonePath, tombstoneFingerprint):
+                outputPath = writeTombstones(tombstonePath, deleted, a2a)
+                manifest.markDone(
+                    tombstonePath,
+                    tombstoneFingerprint,
+                    [],
+                    [outputPath] if outputPath else [],
+                )
+
+    # Largest chunks first, so that the pool finishes evenly. Weights are
+    # only comparable within one chunkBy mode, which is the same for all.
+    chunks = [chunk for weight, chunk in sorted(chunks, key=lambda c: -c[0])]
+
+    # Skip the chunks that were converted before with the same input. Their
+    # term triples are kept in the manifest.
+    todo = dict()
+    fingerprints = dict()
+    for chunk in chunks:
+        fingerprints[chunk.path] = chunkFingerprint(chunk, eadFingerprint)
+
+        if resume and manifest.isDone(chunk.path, fingerprints[chunk.path]):
+            step = manifest.get(chunk.path)
+            ontologyTriples |= fromNTriples(step["ontology"])
+            thesaurusTriples |= fromNTriples(step["thesaurus"])
+        else:
+            todo[chunk.path] = chunk
+
+    print(f"{len(chunks) - len(todo)} chunks unchanged, {len(todo)} to convert")
+
+    tasks = [
+        (("ead", xmlfile), convertEADFile, (xmlfile, splitFile), ())
+        for xmlfile in eadTodo
+    ]
+
+    for path, chunk in todo.items():
+        tasks.append((path, convertChunk, (chunk,), getRequires(chunk, eadCollections)))
+
+    nEAD = 0
+    nChunks = 0
+    for key, result in runTasks(tasks, processes=processes, maxInFlight=maxInFlight):
+
+        if key in todo:
+            path, seconds, (og, tg, stats, nRecords) = result
+            nChunks += 1
+
+            print(
+                f"{nChunks}/{len(todo)} {path}: {nRecords} records in {seconds:.1f}s "
+                f"({nRecords / seconds if seconds else 0:.0f} records/s)"
+            )
+
+            ontologyTriples |= og
+            thesaurusTriples |= tg
+
+            runStats.update(stats)
+
+            manifest.markDone(
+                path,
+                fingerprints[path],
+                todo[path].filenames,
+                chunkOutputs(todo[path]),
+                records=nRecords,
+                ontology=toNTriples(og),
+                thesaurus=toNTriples(tg),
+            )
+
+        else:
+            xmlfile, seconds, path, triples, slices = result
+            nEAD += 1
+
+            print(
+                f"EAD {nEAD}/{len(eadTodo)} {os.path.basename(xmlfile)} in {seconds:.1f}s"
+            )
+
+            # Before the chunks that need this collection are submitted
+            addConcordance(concordance, *slices, rank=eadRanks[xmlfile])
+
+            if path:
+                eadOutputs.append(path)
+            else:  # nobody wants a single file
+                eadGraph = ds.graph(identifier=ga.term("saa/ead/"))
+                eadGraph += triples
+
+            if nEAD == len(eadTodo) and splitFile:
+                manifest.markDone("ead", eadFingerprint, eadFilenames, eadOutputs)
+
+    # Nodes shared by many records, once, see sharedshard.py
+    if sharedShard:
+        spills = [spillPath(chunk.path) for chunk in chunks]
+        sharedFingerprint = fingerprint(spills, (codeVersion,))
+
+        if resume and manifest.isDone(sharedShard, sharedFingerprint):
+            print(f"Shared nodes unchanged, using {sharedShard}.gz")
+        else:
+            nShared = mergeShared(spills, sharedShard, a2a)
+            print(f"{nShared} shared triples in {sharedShard}.gz")
+
+            manifest.markDone(
+                sharedShard, sharedFingerprint, spills, [sharedShard + ".gz"]
+            )
+
+    # The steps were logged one by one, see manifest.py
+    manifest.save()
+
+    # Only now that all shards are written
+    if incremental:
+        for foldername, current in newStates.items():
+            recordState.update(foldername, current)
+        recordState.close()
+
+    ontologyGraph = ds.graph(identifier=rpp)
+    ontologyGraph += ontologyTriples
+
+    thesaurusGraph = ds.graph(identifier=thes)
+    thesaurusGraph += thesaurusTriples
+
+    ds = bindNS(ds)
+
+    if not splitFile:
+        print(f"Serializing to {outfile}")
+        ds.serialize("trig/rpp.trig", format="trig")
+    else:
+        ds.graph(identifier=rpp).serialize("trig/rpp.trig", format="trig")
+        ds.graph(identifier=thes).serialize("trig/thesaurus.trig", format="trig")
+
+    reportCacheStats(runStats)
+
+
+def convertChunk(chunk):
+    """
+    Convert one chunk with convertA2A and time it.
+
+    Args:
+        chunk (Chunk): The arguments for convertA2A, see scheduling.py.
+
+    Returns:
+        tuple: Path of the chunk, seconds spent and the result of convertA2A.
+    """
+
+    start = time.perf_counter()
+    result = convertA2A(*chunk)
+
+    return chunk.path, time.perf_counter() - start, result
+
+
+def convertEADFile(xmlfile, splitFile=True):
+    """
+    Convert one EAD file in a worker, see runTasks.
+
+    The concordance dictionaries are only filled for this file and returned
+    with plain string URIs, for the parent to add to the concordance
+    database.
+
+    Args:
+        xmlfile (str): Path to the EAD file.
+        splitFile (bool, optional): Write the graph to its own TriG file.
+            Otherwise the triples are returned. Defaults to True.
+
+    Returns:
+        tuple: The path of the EAD file, seconds spent, the path of the
+            TriG file (or None), the triples (or None) and the identifier2book,
+            identifier2physicalBook and collection2physicalCollection slices.
+    """
+
+    start = time.perf_counter()
+
+    identifier2book.clear()
+    identifier2physicalBook.clear()
+    collection2physicalCollection.clear()
+
+    g = rdfSubject.db = Dataset().graph(identifier=ga.term("saa/ead/"))
+    convertEAD(xmlfile, g)
+
+    if splitFile:
+        path = f"trig/{os.path.basename(xmlfile)}.trig"
+        g = bindNS(g)
+
+        g.serialize(path + ".tmp", format="trig")
+        os.replace(path + ".tmp", path)
+
+        triples = None
+    else:
+        path = None
+        triples = set(g)
+
+    slices = (
+        {
+            collection: {identifier: str(uri) for identifier, uri in books.items()}
+            for collection, books in identifier2book.items()
+        },
+        {
+            collection: {identifier: str(uri) for identifier, uri in books.items()}
+            for collection, books in identifier2physicalBook.items()
+        },
+        {
+            collection: str(uri) if uri else None
+            for collection, uri in collection2physicalCollection.items()
+        },
+    )
+
+    return xmlfile, time.perf_counter() - start, path, triples, slices
+
+
+def convertEAD(xmlfile, g):
+    """
+    Convert an EAD file component by component, see eadParser.iterEAD.
+
+    Components come after their children, so the converted children are
+    kept per open component until the component itself is converted. The
+    'file' components are collected in one DescendantIndex on the way: the
+    files below a collection are the ones added since its first child.
+    """
+
+    uris = dict()
+    converted = defaultdict(list)
+    index = DescendantIndex()
+
+    for c, ancestors in iterEAD(xmlfile):
+
+        uri = getComponentUri(c, ancestors, uris)
+        children = converted.pop(id(c), [])
+        del uris[id(c)]
+
+        start = children[0][2] if children else len(index)
+
+        if not ancestors:
+            # top collection, create a physical collection
+            getCollection(
+                c,
+                uri,
+                physicalUri=ead.term(c.id),
+                children=children,
+                descendants=index.since(start),
+            )
+
+            # All files of the EAD file fall under the top collection
+            identifier2book[c.identifier].update(zip(index.identifiers, index.uris))
+            identifier2physicalBook[c.identifier].update(
+                zip(index.identifiers, index.physicalUris)
+            )
+            continue
+
+        chIndex, chPhysical, chtype = cToRdf(
+            c, uri, children=children, descendants=index.since(start)
+        )
+
+        if chtype == "file":
+            index.add(c)
+
+        converted[id(ancestors[-1])].append((chIndex, chtype, start))
+
+
+class DescendantIndex:
+    """
+    The 'file' components of an EAD file, in post-order (see
+    eadParser.iterEAD). The files below any component are one range of it,
+    so the URIs and identifiers are made once per file and every collection
+    reads its range instead of gathering its own list.
+    """
 
-        if temporal:
-            temporals = []
+    def __init__(self):
 
-            years = range(temporal[0], temporal[1] + 1, shift)
-            for year in years:
-                beginRestriction = year
+        self.uris = []
+        self.physicalUris = []
+        self.identifiers = []
 
-                end = year + window
+    def __len__(self):
 
-                if end <= temporal[1]:
-                    endRestriction = end
-                elif temporal[1] - end > shift:
-                    endRestriction = temporal[1]
-                else:
-                    continue
+        return len(self.identifiers)
 
-                temporals.append((beginRestriction, endRestriction))
-        else:
-            temporals = [False]
+    def add(self, c):
 
-        for temp in temporals:
-            nSplit = 0
-            fns = []
+        self.uris.append(file.term(c.id))
+        self.physicalUris.append(ead.term(c.id))
+        self.identifiers.append(c.identifier)
 
-            for n, f in enumerate(filenames, 1):
-                fns.append(f)
+    def since(self, start):
+        """
+        The files from start on, up to the last one added so far.
+        """
 
-                if n % splitSize == 0 or n == len(filenames):
-                    nSplit += 1
-                    path = f"trig/{foldername}_{str(nSplit).zfill(4)}.trig"
-                    chunks.append(
-                        (fns, path, indexCollectionURI, indexCollectionName, temp)
-                    )
-                    fns = []
+        return DescendantRange(self, start, len(self))
 
-                    # # TEMP BREAK
-                    # break
 
-        with multiprocessing.Pool(
-            processes=max(multiprocessing.cpu_count() - 1, 1)
-        ) as pool:
+class DescendantRange:
+    """
+    A range of a DescendantIndex, without a copy of its lists. The URIs are
+    only sliced when a collection asks for them, see getCollection.
+    """
 
-            graphs = pool.starmap(convertA2A, chunks)
+    __slots__ = ("index", "start", "stop")
 
-        for og, tg in graphs:
-            ontologyGraph = ds.graph(identifier=rpp)
-            thesaurusGraph = ds.graph(identifier=thes)
-            ontologyGraph += og
-            thesaurusGraph += tg
+    def __init__(self, index, start, stop):
 
-        # for n, f in enumerate(filenames, 1):
+        self.index = index
+        self.start = start
+        self.stop = stop
 
-        #     path = os.path.abspath(os.path.join(dirpath, f))
-        #     convertA2A(path, ds)
+    def __len__(self):
 
-        #     if splitFile and (n % splitSize == 0 or n == len(filenames)):
-        #         nSplit += 1
+        return self.stop - self.start
 
-        #
-        #         path = f"trig/{foldername}_{str(nSplit).zfill(4)}.trig"
-        #         print("Serializing to", path)
+    @property
+    def uris(self):
 
-        #         g = bindNS(g)
-        #         g.serialize(path, format='trig')
-        #         ds.remove_graph(g)
-        #         g = rdfSubject.db = ds.graph(identifier=ga.term('saa/a2a/'))
+        return self.index.uris[self.start : self.stop]
 
-    # HTR
-    # print("HTR parsing!")
-    # g = rdfSubject.db = ds.graph(identifier=ga.term('saa/htr/'))
-    # TODO
+    @property
+    def physicalUris(self):
 
-    ## Finished!
+        return self.index.physicalUris[self.start : self.stop]
 
-    ds = bindNS(ds)
+    @property
+    def identifiers(self):
 
-    if not splitFile:
-        print(f"Serializing to {outfile}")
-        ds.serialize("trig/rpp.trig", format="trig")
-    else:
-        # ontology
-        g = rdfSubject.db = ds.graph(identifier=rpp)
-        g.serialize("trig/rpp.trig", format="trig")
+        return self.index.identifiers[self.start : self.stop]
 
-        # thesaurus
-        g = rdfSubject.db = ds.graph(identifier=thes)
-        g.serialize("trig/thesaurus.trig", format="trig")
 
+def getComponentUri(c, ancestors, uris):
+    """
+    URI of an EAD component, given its ancestors (see eadParser.iterEAD).
 
-def convertEAD(xmlfile, g):
+    Collections in the middle of the tree get a skolem IRI, since their ids
+    are not unique. The URI of every open component is kept in uris, because
+    its children need it before it is converted itself.
+    """
 
-    eadDocument = parseEAD(xmlfile)
+    if id(c) not in uris:
+        uri = URIRef(f"https://archief.amsterdam/inventarissen/file/{c.id}")
 
-    c = eadDocument.collection[0]
+        if ancestors and c.level != "file":
+            parentUri = getComponentUri(ancestors[-1], ancestors[:-1], uris)
 
-    uri = URIRef(f"https://archief.amsterdam/inventarissen/file/{c.id}")
-    physicalUri = ead.term(c.id)
+            if parentUri != URIRef(
+                "https://archief.amsterdam/inventarissen/file/d5b98b7afa50a3af4fba8053b06fb961"
+            ):  # these ids in the middle are not unique
+                uri = skolemIRI()
 
-    # top collection, create a physical collection
-    getCollection(c, uri, physicalUri=physicalUri)
+        uris[id(c)] = uri
 
+    return uris[id(c)]
 
-def cToRdf(c, parent=None, collectionNumber=None, scanNamespace=None):
 
-    uri = URIRef(f"https://archief.amsterdam/inventarissen/file/{c.id}")
+def cToRdf(
+    c,
+    uri,
+    children=(),
+    descendants=None,
+    collectionNumber=None,
+    scanNamespace=None,
+):
 
     if c.level == "file":
         # Then this is a book --> InventoryBook
@@ -546,8 +1267,8 @@ def cToRdf(c, parent=None, collectionNumber=None, scanNamespace=None):
 
         physicalBook = InventoryBook(
             ead.term(c.id),
-            createdBy=uri2notary.get(uri, []),
-            createdAt=TimeInterval(None, start=None, end=None),
+            createdBy=getUri2notary().get(uri, []),
+            createdAt=TimeInterval(skolemIRI(), start=None, end=None),
         )
 
         bookIndex.indexOf = physicalBook
@@ -565,10 +1286,10 @@ def cToRdf(c, parent=None, collectionNumber=None, scanNamespace=None):
             hasLatestEndTimeStamp=c.date.get("hasLatestEndTimeStamp"),
         )
 
-        if notaryUris := uri2notary.get(uri, []):
+        if notaryUris := getUri2notary().get(uri, []):
             for notaryUri in notaryUris:
                 notaryRole = NotaryRole(
-                    None, carriedIn=creationEvent, carriedBy=[notaryUri]
+                    skolemIRI(), carriedIn=creationEvent, carriedBy=[notaryUri]
                 )
 
                 Agent(notaryUri).participatesIn = [creationEvent]
@@ -583,17 +1304,25 @@ def cToRdf(c, parent=None, collectionNumber=None, scanNamespace=None):
 
     else:
         # Not yet reached the end of the tree
-        if parent and parent.resUri != URIRef(
-            "https://archief.amsterdam/inventarissen/file/d5b98b7afa50a3af4fba8053b06fb961"
-        ):  # these ids in the middle are not unique
-            uri = None
-
-        collection = getCollection(c, uri)
+        collection = getCollection(c, uri, children=children, descendants=descendants)
 
         return collection, None, "collection"
 
 
-def getCollection(c, uri, physicalUri=None):
+def getCollection(c, uri, physicalUri=None, children=(), descendants=None):
+    """
+    Convert a collection of an EAD file.
+
+    Args:
+        c (Collection or C): The collection.
+        uri (URIRef): URI of the collection, see getComponentUri.
+        physicalUri (URIRef, optional): URI of the physical collection, only
+            for the top collection. Defaults to None.
+        children (list, optional): The converted children, as (index, type,
+            start) tuples, see convertEAD. Defaults to ().
+        descendants (DescendantRange, optional): The 'file' components below
+            the collection, see DescendantIndex.since. Defaults to None.
+    """
 
     collection = IndexCollection(
         uri,
@@ -622,7 +1351,7 @@ def getCollection(c, uri, physicalUri=None):
         for i in repository:
             if "corpname" in c.repository:
                 name = c.repository["corpname"]
-                repository = Agent(unique(name), label=[name])
+                repository = Agent(unique(name, skolem=True), label=[name])
                 authority = name
             else:
                 repository = c.repository
@@ -643,7 +1372,7 @@ def getCollection(c, uri, physicalUri=None):
         for i in origination:
             if "corpname" in i:
                 name = i["corpname"]
-                org = Agent(unique(name), label=[name])
+                org = Agent(unique(name, skolem=True), label=[name])
                 creator = name
             else:
                 org = i
@@ -651,8 +1380,8 @@ def getCollection(c, uri, physicalUri=None):
             creators.append(creator)
             originations.append(org)
 
-    if uri2notary.get(uri):  # specifically for collection 5075
-        for n in uri2notary[uri]:
+    if getUri2notary().get(uri):  # specifically for collection 5075
+        for n in getUri2notary()[uri]:
             originations.append(Agent(n))
 
     collection.creator = creators
@@ -667,8 +1396,7 @@ def getCollection(c, uri, physicalUri=None):
 
     subcollections = []
     parts = []
-    for ch in c.children:
-        chIndex, chPhysical, chtype = cToRdf(ch, parent=collection)
+    for chIndex, chtype, _ in children:
 
         if chtype == "collection":
             subcollections.append(chIndex)
@@ -682,28 +1410,24 @@ def getCollection(c, uri, physicalUri=None):
 
     # Creation event
 
-    allUris, allIdentifiers = getAllChildren(c, ns=file)
-    allUrisPhysical, allIdentifiersPhysical = getAllChildren(c, ns=ead)
-    collectionIdentifier = getParentIdentifier(c)
-
-    for u, i in zip(allUris, allIdentifiers):
-        identifier2book[collectionIdentifier][i] = u
+    allUris = descendants.uris if descendants else []
 
-    for u, i in zip(allUrisPhysical, allIdentifiersPhysical):
-        identifier2physicalBook[collectionIdentifier][i] = u
-
-    creationEvent = CollectionCreation(None, hasInput=allUris, hasOutput=[collection])
+    creationEvent = CollectionCreation(
+        skolemIRI(), hasInput=allUris, hasOutput=[collection]
+    )
 
     archiverRole = ArchiverAndCreatorRole(
-        None, carriedIn=creationEvent, carriedBy=repositories
+        skolemIRI(), carriedIn=creationEvent, carriedBy=repositories
     )
 
     archivalDocumentRole = ArchivalDocumentRole(
-        None, carriedIn=creationEvent, carriedBy=[collection]
+        skolemIRI(), carriedIn=creationEvent, carriedBy=[collection]
     )
 
     if physicalUri:
-        physicalCollection = InventoryCollection(physicalUri, hasMember=allUrisPhysical)
+        physicalCollection = InventoryCollection(
+            physicalUri, hasMember=descendants.physicalUris if descendants else []
+        )
         collection.indexOf = physicalCollection
 
         return collection, physicalCollection
@@ -711,31 +1435,6 @@ def getCollection(c, uri, physicalUri=None):
         return collection
 
 
-def getAllChildren(c, ns):
-
-    uris = []
-    identifiers = []
-    for child in c.children:
-        if child.level == "file":
-            uris.append(ns.term(child.id))
-            identifiers.append(child.identifier)
-        else:
-            urisNew, identifiersNew = getAllChildren(child, ns=ns)
-            uris += urisNew
-            identifiers += identifiersNew
-
-    return uris, identifiers
-
-
-def getParentIdentifier(c):
-
-    if hasattr(c, "parent"):
-        identifier = getParentIdentifier(c.parent)
-    else:
-        identifier = c.identifier
-    return identifier
-
-
 def getGroupingCriteria(
     sourceType=[], sourceDate=dict(), sourceAuthor=[], sourceLanguage=None
 ):
@@ -744,7 +1443,7 @@ def getGroupingCriteria(
 
     if sourceType:
         criterion = GroupingCriterion(
-            None, hasFilter=rpp.sourceType, hasFilterValue=sourceType
+            skolemIRI(), hasFilter=rpp.sourceType, hasFilterValue=sourceType
         )
         criteria.append(criterion)
 
@@ -754,19 +1453,19 @@ def getGroupingCriteria(
         end = sourceDate.get("hasLatestEndTimeStamp")
 
         criterion = GroupingCriterion(
-            None, hasFilter=rpp.createdAt, hasFilterStart=start, hasFilterEnd=end
+            skolemIRI(), hasFilter=rpp.createdAt, hasFilterStart=start, hasFilterEnd=end
         )
         criteria.append(criterion)
 
     if sourceAuthor:
         criterion = GroupingCriterion(
-            None, hasFilter=rpp.createdBy, hasFilterValue=sourceAuthor
+            skolemIRI(), hasFilter=rpp.createdBy, hasFilterValue=sourceAuthor
         )
         criteria.append(criterion)
 
     if sourceLanguage:  # iso code?
         criterion = GroupingCriterion(
-            None, hasFilter=rpp.language, hasFilterValue=sourceLanguage
+            skolemIRI(), hasFilter=rpp.language, hasFilterValue=sourceLanguage
         )
         criteria.append(criterion)
 
@@ -774,771 +1473,969 @@ def getGroupingCriteria(
 
 
 def convertA2A(
-    filenames, path, indexCollectionURI, indexCollectionName, temporal=False, gz=True
+    filenames,
+    path,
+    indexCollectionURI,
+    indexCollectionName,
+    temporal=False,
+    gz=True,
+    concordance="data/cache/concordance.sqlite",
+    skip=(),
+    recordCache=None,
+    cacheVersion="",
+    recordCacheSize=2 * 1024**3,
+    sharedNames=False,
+    sharedShard=False,
 ):
+    """
+    Convert a chunk of A2A files to one or more (gzipped) TriG files.
 
-    ontologyGraph = Graph(identifier=rpp)
-    thesaurusGraph = Graph(identifier=thes)
-    graph = Graph(identifier=a2a)
+    Every file is parsed only once. If temporal windows are given, each record
+    is routed to the file of every window that contains its registration
+    year. The triples of a record are written as soon as it is converted (see
+    writer.py), so no graph of the full chunk is kept in memory.
 
-    if temporal:
-        beginRestriction, endRestriction = temporal
+    Args:
+        filenames (list): Paths to the A2A (OAI-PMH) XML files in this chunk.
+        path (str): Path of the TriG file to write.
+        indexCollectionURI (URIRef): URI of the index collection.
+        indexCollectionName (str): Label of the index collection.
+        temporal (list, optional): List of (begin, end) windows, see
+            `getTemporalWindows`. Defaults to False.
+        gz (bool, optional): Whether the TriG files should be gzipped. Defaults to True.
+        concordance (str, optional): Path to the concordance database that
+            was written after the EAD conversion, see concordance.py.
+        skip (tuple, optional): Identifiers of the records that should not be
+            converted, e.g. because a newer version is in another chunk (see
+            incremental.py). Defaults to ().
+        recordCache (str, optional): Path to the record cache, see
+            recordcache.py. Unchanged records are copied from it instead of
+            converted. Defaults to None (no cache).
+        cacheVersion (str, optional): Version stamp of the record cache.
+        recordCacheSize (int, optional): Maximum size of the record cache in
+            bytes. Defaults to 2 GiB.
+        sharedNames (bool, optional): Write every PersonName once per TriG
+            file, instead of with every record that uses it. Defaults to
+            False.
+        sharedShard (bool, optional): Write the PersonNames, churches,
+            religions and collections to a spill file for the shared shard
+            (see sharedshard.py), instead of to the TriG files. Defaults to
+            False.
 
-        path = path.replace(".trig", f"_{beginRestriction}-{endRestriction}.trig")
+    Returns:
+        tuple: The sets of ontology and thesaurus triples, the cache
+            statistics of this chunk and the number of converted records.
+    """
 
-    else:
-        beginRestriction, endRestriction = None, None
-    #     path = os.path.abspath(os.path.join(dirpath, f))
-    #     convertA2A(path, ds)
+    # Every chunk returns all the terms it uses, since the manifest keeps them
+    # per chunk and a resumed run only reuses some of the chunks
+    termRegistry.clear()
 
-    #     if splitFile and (n % splitSize == 0 or n == len(filenames)):
-    #         nSplit += 1
+    # Triples are emitted directly, without rdfalchemy (see emitter.py)
+    ontology = TripleEmitter(genid=skolemIRI)
+    thesaurusTriples = TripleEmitter(genid=skolemIRI)
 
-    #         foldername = dirpath.rsplit('/')[-1]
-    #         path = f"trig/{foldername}_{str(nSplit).zfill(4)}.trig"
-    #         print("Serializing to", path)
+    windows = dict()
 
-    #         g = bindNS(g)
-    #         g.serialize(path, format='trig')
-    #         ds.remove_graph(g)
-    #         g = rdfSubject.db = ds.graph(identifier=ga.term('saa/a2a/'))
+    try:
+        for w, windowPath in getWindowPaths(path, temporal).items():
+            windows[w] = GraphWriter(windowPath, a2a, gz=gz, authority=ga)
 
-    allIndexDocuments = []
-    for xmlfile in filenames:
+        concordance = Concordance(concordance)
 
-        c = A2ADocumentCollection(xmlfile)
+        # Members of the index and scan collections, written once per window
+        windowMembers = defaultdict(Memberships)
+        nRecords = 0
 
-        for d in c:
+        # Churches and religions are emitted once per window, see getChurchIndex
+        windowShared = defaultdict(set)
 
-            cancelled = None
+        # Idem for the PersonNames if sharedNames, see parsePersonName
+        windowNames = defaultdict(dict)
 
-            if hasattr(d.source, "SourceDate"):
-                registrationDate = d.source.SourceDate.date
-            else:
-                registrationDate = None
+        # Index and inventory collections if sharedShard
+        collectionTriples = set()
 
-            # TEMPORAL RESTRICTION
-            if beginRestriction and endRestriction:
-                if registrationDate is None or type(registrationDate) == str:
-                    continue
-                elif (
-                    registrationDate.year < beginRestriction
-                    or registrationDate.year >= endRestriction
-                ):
-                    continue
-            # TEMPORAL RESTRICTION
+        skip = set(skip)
 
-            collection = d.source.SourceReference.Archive
-            inventory = d.source.SourceReference.RegistryNumber
-            if hasattr(d.source.SourceReference, "Folio"):
-                folio = d.source.SourceReference.Folio
-            else:
-                folio = None
-            partOfUri = identifier2physicalBook[collection].get(
-                inventory, URIRef("https://data.goldenagents.org/NOTHINGFOUNDHERE")
+        if recordCache:
+            # Everything the triples of a record depend on besides its XML
+            cache = RecordCache(
+                recordCache,
+                f"{cacheVersion} {indexCollectionURI} {indexCollectionName} {temporal} "
+                f"{sharedNames} {sharedShard}",
+                maxBytes=recordCacheSize,
             )
-            partOfIndexUri = identifier2book[collection].get(
-                inventory, URIRef("https://data.goldenagents.org/NOTHINGFOUNDHERE")
-            )
-            # partOfUri = identifier2physicalBook[collection][inventory]
-            # partOfIndexUri = identifier2book[collection][inventory]
-            physicalCollectionUri = collection2physicalCollection[collection]
-
-            createdByUris = []
-            if creators := uri2notary.get(
-                partOfIndexUri
-            ):  # specifically for collection 5075
-                for n in creators:
-                    createdByUris.append(Agent(n))
-
-            if hasattr(d.source, "SourcePlace"):
-                name = d.source.SourcePlace.Place
-                registrationPlace, registrationPlaceName = thesaurus(
-                    name, Place, graph, thesaurusGraph
-                )
-            else:
-                registrationPlace = None
+        else:
+            cache = None
 
-            # source remarks
-            comments = []
-            try:
-                if comment := d.source.Remarks["Opmerking"]["Opmerking"]:
+        cacheInfo = getCacheInfo()
 
-                    comments.append(Literal(comment, lang="nl"))  # otr
+        for xmlfile in filenames:
 
-                    if "Ondertrouwregister" in d.source.SourceType:
-                        if "doorgehaald" in comment:
-                            cancelled = True
-                        else:
-                            cancelled = False
-            except:
-                pass
+            for identifier, record in iterRecords(xmlfile):
 
-            try:
-                if comment := d.source.Remarks["Opmerking"]["Onderwerpsomschrijving"]:
+                if identifier in skip:
+                    continue
 
-                    comments.append(Literal(comment, lang="nl"))  # Notarieel
-            except:
-                pass
+                if cache:
+                    key = cache.key(etree.tostring(record))
+
+                    if entry := cache.get(key):
+                        cacheStats["record cache hits"] += 1
+
+                        (
+                            rows,
+                            recordWindows,
+                            members,
+                            shared,
+                            names,
+                            collections,
+                            terms,
+                        ) = entry
+
+                        # The terms are emitted once per chunk. In convertA2A only
+                        # ontology terms have a superclass.
+                        for name, ClassType, subClassOf in terms:
+                            thesaurusTerm(
+                                name,
+                                ClassType,
+                                subClassOf=subClassOf,
+                                emit=ontology if subClassOf else thesaurusTriples,
+                                registry=termRegistry,
+                            )
 
-            inLanguage = None
-            try:
-                if language := d.source.Remarks["Opmerking"]["Taal"]:
-                    isoLang = language2iso.get(language)
-                    inLanguage = Literal(isoLang)  # Notarieel
-            except:
-                pass
+                        for w in recordWindows:
+                            windows[w].writeNTriples(rows)
+                            windowMembers[w].update(members)
+                            windowShared[w].update(shared)
+                            windowNames[w].update(names)
 
-            # source
+                        collectionTriples.update(collections)
 
-            sourceTypeName = (
-                d.source.SourceType.lower().replace("other:", "").title().strip()
-            )
+                        nRecords += 1
+                        continue
 
-            # Switch to ontology graph
-            g = rdfSubject.db = ontologyGraph
+                    cacheStats["record cache misses"] += 1
+                    start = time.perf_counter()
+                    usedTerms.clear()
 
-            sType, sTypeName = thesaurus(
-                d.source.SourceType,
-                DocumentType,
-                graph,
-                ontologyGraph,
-                subClassOf=rpp.Document,
-            )
+                d = parseRecord(record)
 
-            SourceClass = type(
-                d.source.SourceType, (Document,), {"rdf_type": sType.resUri}
-            )
-            # sType = DocumentType(rpp.term(sourceTypeName),
-            #                      subClassOf=rpp.Document,
-            #                      label=[sourceTypeName])
-
-            # Switch to A2A graph
-            g = rdfSubject.db = graph
-
-            # Part of which index?
-            physicalCollection = InventoryCollection(physicalCollectionUri)
-            indexCollection = IndexCollection(
-                indexCollectionURI,
-                label=[indexCollectionName],
-                indexOf=physicalCollection,
-            )
+                cancelled = None
 
-            # Physical deed
-            physicalUri = partOfUri + "#" + d.source.guid
-            physicalDocument = SourceClass(
-                physicalUri,
-                label=[Literal(f"Akte: {sourceTypeName}", lang="nl")],
-                partOf=partOfUri,
-                createdBy=createdByUris,
-                createdAt=registrationDate,
-                createdIn=registrationPlace,
-            )
+                if d.source.SourceDate:
+                    registrationDate = d.source.SourceDate.date
+                else:
+                    registrationDate = None
 
-            # Index document
-            indexUri = deed.term(d.source.guid)
-            sourceIndex = IndexDocument(
-                indexUri,
-                label=[Literal(f"Index: {sourceTypeName}", lang="nl")],
-                description=comments,
-                inLanguage=inLanguage,
-                cancelled=cancelled,
-                indexOf=physicalDocument,
-                memberOf=indexCollection,
-            )
+                # TEMPORAL RESTRICTION
+                if temporal:
+                    if registrationDate is None or type(registrationDate) == str:
+                        continue
+
+                    recordWindows = [
+                        (beginRestriction, endRestriction)
+                        for beginRestriction, endRestriction in windows
+                        if beginRestriction <= registrationDate.year < endRestriction
+                    ]
 
-            allIndexDocuments.append(sourceIndex)
+                    if not recordWindows:
+                        continue
+                else:
+                    recordWindows = [None]
+                # TEMPORAL RESTRICTION
+
+                # Every record is emitted on its own, so that it can be added
+                # to all windows it belongs to.
+                emit = TripleEmitter(genid=skolemIRI)
+                shared = set()
+                names = dict() if sharedNames or sharedShard else None
+
+                # The collections go to the shared shard if sharedShard
+                collectionEmit = TripleEmitter() if sharedShard else emit
+
+                collection = d.source.SourceReference.Archive
+                inventory = d.source.SourceReference.RegistryNumber
+                folio = d.source.SourceReference.Folio
+                partOfUri = concordance.getPhysicalBook(
+                    collection,
+                    inventory,
+                    URIRef("https://data.goldenagents.org/NOTHINGFOUNDHERE"),
+                )
+                partOfIndexUri = concordance.getBook(
+                    collection,
+                    inventory,
+                    URIRef("https://data.goldenagents.org/NOTHINGFOUNDHERE"),
+                )
+                # partOfUri = identifier2physicalBook[collection][inventory]
+                # partOfIndexUri = identifier2book[collection][inventory]
+                physicalCollectionUri = concordance.getPhysicalCollection(collection)
+
+                createdByUris = []
+                if creators := getUri2notary().get(
+                    partOfIndexUri
+                ):  # specifically for collection 5075
+                    for n in creators:
+                        createdByUris.append(emit(Agent, n))
+
+                if d.source.SourcePlace:
+                    name = d.source.SourcePlace.Place
+                    registrationPlace, registrationPlaceName = thesaurusTerm(
+                        name, Place, emit=thesaurusTriples, registry=termRegistry
+                    )
+                else:
+                    registrationPlace = None
+
+                # source remarks
+                sourceRemarks = d.source.Remarks["Opmerking"]
+                if not isinstance(sourceRemarks, Remarks):  # only a link
+                    sourceRemarks = Remarks()
+
+                comments = []
+                try:
+                    if comment := sourceRemarks["Opmerking"]:
+
+                        comments.append(Literal(comment, lang="nl"))  # otr
+
+                        if "Ondertrouwregister" in d.source.SourceType:
+                            if "doorgehaald" in comment:
+                                cancelled = True
+                            else:
+                                cancelled = False
+                except:
+                    pass
+
+                try:
+                    if comment := sourceRemarks["Onderwerpsomschrijving"]:
+
+                        comments.append(Literal(comment, lang="nl"))  # Notarieel
+                except:
+                    pass
+
+                inLanguage = None
+                try:
+                    if language := sourceRemarks["Taal"]:
+                        isoLang = language2iso.get(language)
+                        inLanguage = Literal(isoLang)  # Notarieel
+                except:
+                    pass
+
+                # source
+
+                sourceTypeName = (
+                    d.source.SourceType.lower().replace("other:", "").title().strip()
+                )
 
-            ## scans
-            scans = []
-            scanCollectionURI = partOfUri + "/scans/"
-            scanCollection = ScanCollection(scanCollectionURI)
-            g.add((partOfUri, rpp.hasDigitalRepresentation, scanCollectionURI))
+                sType, sTypeName = thesaurusTerm(
+                    d.source.SourceType,
+                    DocumentType,
+                    subClassOf=rpp.Document,
+                    emit=ontology,
+                    registry=termRegistry,
+                )
 
-            scanNames = d.source.Remarks["filename"]
+                SourceClass = getTermClass(d.source.SourceType, Document, sType.resUri)
+                # sType = DocumentType(rpp.term(sourceTypeName),
+                #                      subClassOf=rpp.Document,
+                #                      label=[sourceTypeName])
 
-            for scanName, scan in zip(scanNames, d.source.scans):
+                # Part of which index?
+                physicalCollection = collectionEmit(
+                    InventoryCollection, physicalCollectionUri
+                )
+                indexCollection = collectionEmit(
+                    IndexCollection,
+                    indexCollectionURI,
+                    label=[indexCollectionName],
+                    indexOf=physicalCollection,
+                )
 
-                identifier = scan.Uri.rsplit("/")[-1].replace(".jpg", "")
-                scanUri = partOfUri + "/scans/" + scanName
+                # Physical deed
+                physicalUri = partOfUri + "#" + d.source.guid
+                physicalDocument = emit(
+                    SourceClass,
+                    physicalUri,
+                    label=[Literal(f"Akte: {sourceTypeName}", lang="nl")],
+                    partOf=partOfUri,
+                    createdBy=createdByUris,
+                    createdAt=registrationDate,
+                    createdIn=registrationPlace,
+                )
 
-                s = Scan(
-                    scanUri,
-                    identifier=identifier,
-                    label=[scanName],
-                    memberOf=scanCollection,
-                    depiction=[URIRef(scan.Uri)],
+                # Index document
+                indexUri = deed.term(d.source.guid)
+                sourceIndex = emit(
+                    IndexDocument,
+                    indexUri,
+                    label=[Literal(f"Index: {sourceTypeName}", lang="nl")],
+                    description=comments,
+                    inLanguage=inLanguage,
+                    cancelled=cancelled,
+                    indexOf=physicalDocument,
+                    memberOf=indexCollection,
                 )
-                scans.append(s)
 
-            scanCollection.hasMember = scans
-            physicalDocument.hasScan = scans
+                members = membership(indexCollection, "hasMember", [sourceIndex])
 
-            sourceIndex.onScan = scans
-            sourceIndex.onPage = folio
+                ## scans
+                scans = []
+                scanCollectionURI = partOfUri + "/scans/"
+                scanCollection = emit(ScanCollection, scanCollectionURI)
+                emit.add((partOfUri, rpp.hasDigitalRepresentation, scanCollectionURI))
 
-            # events
-            events = []
-            for e in d.events:
+                scanNames = d.source.Remarks["filename"] or []
 
-                if "Confessieboeken" in sourceTypeName:
-                    eventTypeName = "Confessie"
-                else:
-                    eventTypeName = (
-                        e.EventType.lower()
-                        .replace("other:", "")
-                        .title()
-                        .replace(" ", "")
+                for scanName, scan in zip(scanNames, d.source.scans):
+
+                    identifier = scan.Uri.rsplit("/")[-1].replace(".jpg", "")
+                    scanUri = partOfUri + "/scans/" + scanName
+
+                    s = emit(
+                        Scan,
+                        scanUri,
+                        identifier=identifier,
+                        label=[scanName],
+                        memberOf=scanCollection,
+                        depiction=[URIRef(scan.Uri)],
                     )
+                    scans.append(s)
 
-                # Switch to ontology graph
-                g = rdfSubject.db = ontologyGraph
+                members += membership(scanCollection, "hasMember", scans)
+                physicalDocument.hasScan = scans
 
-                eType, eTypeName = thesaurus(
-                    e.EventType,
-                    EventType,
-                    graph,
-                    ontologyGraph,
-                    subClassOf=rpp.RegistrationEvent,
-                )
+                sourceIndex.onScan = scans
+                sourceIndex.onPage = folio
 
-                RegistrationEventClass = type(
-                    e.EventType, (RegistrationEvent,), {"rdf_type": eType.resUri}
-                )
+                # events
+                events = []
+                for e in d.events:
 
-                # if eTypeName in ['Begraven', 'Doop', 'Overlijden']
+                    if "Confessieboeken" in sourceTypeName:
+                        eventTypeName = "Confessie"
+                    else:
+                        eventTypeName = (
+                            e.EventType.lower()
+                            .replace("other:", "")
+                            .title()
+                            .replace(" ", "")
+                        )
 
-                # EventClass = type(e.EventType, (Event, ),
-                #                   {"rdf_type": eType.resUri})
+                    eType, eTypeName = thesaurusTerm(
+                        e.EventType,
+                        EventType,
+                        subClassOf=rpp.RegistrationEvent,
+                        emit=ontology,
+                        registry=termRegistry,
+                    )
 
-                # eType = EventType(rpp.term(eventTypeName),
-                #                   subClassOf=rpp.Event,
-                #                   label=[eventTypeName])
+                    RegistrationEventClass = getTermClass(
+                        e.EventType, RegistrationEvent, eType.resUri
+                    )
 
-                # Switch to A2A graph
-                g = rdfSubject.db = graph
+                    # if eTypeName in ['Begraven', 'Doop', 'Overlijden']
 
-                # if d.source.EventDate and d.source.EventDate.date:
-                #     sourceDate = d.source.EventDate.date
-                # else:
-                #     sourceDate = None  ## given in registrationDate
+                    # EventClass = type(e.EventType, (Event, ),
+                    #                   {"rdf_type": eType.resUri})
 
-                if e.EventDate and e.EventDate.date:
-                    eventDate = e.EventDate.date
-                else:
-                    eventDate = None
+                    # eType = EventType(rpp.term(eventTypeName),
+                    #                   subClassOf=rpp.Event,
+                    #                   label=[eventTypeName])
 
-                # eventPlace for begraaf + doop
-                if eventTypeName == "Begraven":
-                    if type(d.source.Remarks["Opmerking"]) != str:
-                        eventPlaceName = d.source.Remarks["Opmerking"].get(
-                            "Begraafplaats"
-                        )
-                        eventPlaces = getEventPlace(eventPlaceName)
-                    else:
-                        eventPlaces = []
+                    # if d.source.EventDate and d.source.EventDate.date:
+                    #     sourceDate = d.source.EventDate.date
+                    # else:
+                    #     sourceDate = None  ## given in registrationDate
 
-                elif eventTypeName == "Doop":
-                    if type(d.source.Remarks["Opmerking"]) != str:
-                        eventPlaceName = d.source.Remarks["Opmerking"].get("Kerk")
-                        eventPlaces = getEventPlace(eventPlaceName)
+                    if e.EventDate and e.EventDate.date:
+                        eventDate = e.EventDate.date
                     else:
-                        eventPlaces = []
+                        eventDate = None
+
+                    # eventPlace for begraaf + doop
+                    if eventTypeName == "Begraven":
+                        eventPlaceName = sourceRemarks["Begraafplaats"]
+                        eventPlaces = getEventPlace(eventPlaceName, shared=shared)
+
+                    elif eventTypeName == "Doop":
+                        eventPlaceName = sourceRemarks["Kerk"]
+                        eventPlaces = getEventPlace(eventPlaceName, shared=shared)
 
-                else:
-                    eventPlaces = []
-
-                # religion
-                eventReligions = []
-                if hasattr(e, "EventReligion"):
-                    eventReligion = getReligion(religionName=e.EventReligion)
-                    if eventReligion:
-                        eventReligions.append(eventReligion)
                     else:
-                        eventReligions = []
+                        eventPlaces = []
 
-                # date
-                if type(registrationDate) == str and len(registrationDate) == 4:
-                    registrationDateLiteral = Literal(
-                        registrationDate, datatype=XSD.gYear
-                    )
-                elif type(registrationDate) == str and len(registrationDate) == 7:
-                    registrationDateLiteral = Literal(
-                        registrationDate, datatype=XSD.gYearMonth
+                    # religion
+                    eventReligions = []
+                    if e.EventReligion:
+                        eventReligion = getReligion(
+                            religionName=e.EventReligion, shared=shared
+                        )
+                        if eventReligion:
+                            eventReligions.append(eventReligion)
+                        else:
+                            eventReligions = []
+
+                    # date
+                    registrationDateLiteral = dateLiteral(registrationDate)
+
+                    registrationEvent = emit(
+                        RegistrationEventClass,
+                        deed.term(d.source.guid + "?event=" + e.id),
+                        hasPlace=[registrationPlace],
+                        hasTimeStamp=registrationDateLiteral,
+                        hasOutput=[physicalDocument],
+                        label=[
+                            Literal(
+                                f"Registratie: {eventTypeName} ({registrationDate if registrationDate else '?'})",
+                                lang="nl",
+                            )
+                        ],
                     )
-                elif registrationDate:
-                    registrationDateLiteral = Literal(
-                        registrationDate, datatype=XSD.date
+                    events.append(registrationEvent)
+
+                    eventDateLiteral = dateLiteral(eventDate)
+
+                    # TODO
+                    # Which registrationEvents registers another event?
+                    # - Doop
+                    # - Begraafregisters
+                    # - ?
+
+                    # For now, do it for every event
+                    # if "Dopen" in d.source.SourceType or "Begraven" in d.source.SourceType:
+                    eventUri = a2a.term(
+                        d.source.guid + "#" + "event"
+                    )  # Use our own NS for event that is registered?
+                    event = emit(
+                        Event,
+                        eventUri,
+                        hasTimeStamp=eventDateLiteral,
+                        hasPlace=eventPlaces,
+                        hasReligion=eventReligions,
+                        label=[
+                            Literal(
+                                f"{eventTypeName} ({eventDate if eventDate else '?'})",
+                                lang="nl",
+                            )
+                        ],
                     )
-                else:
-                    registrationDateLiteral = None
-
-                registrationEvent = RegistrationEventClass(
-                    deed.term(d.source.guid + "?event=" + e.id),
-                    hasPlace=[registrationPlace],
-                    hasTimeStamp=registrationDateLiteral,
-                    hasOutput=[physicalDocument],
-                    label=[
-                        Literal(
-                            f"Registratie: {eventTypeName} ({registrationDate if registrationDate else '?'})",
-                            lang="nl",
-                        )
-                    ],
-                )
-                events.append(registrationEvent)
-
-                if type(eventDate) == str and len(eventDate) == 4:
-                    eventDateLiteral = Literal(eventDate, datatype=XSD.gYear)
-                elif type(eventDate) == str and len(eventDate) == 7:
-                    eventDateLiteral = Literal(eventDate, datatype=XSD.gYearMonth)
-                elif eventDate:
-                    eventDateLiteral = Literal(eventDate, datatype=XSD.date)
-                else:
-                    eventDateLiteral = None
-
-                # TODO
-                # Which registrationEvents registers another event?
-                # - Doop
-                # - Begraafregisters
-                # - ?
-
-                # For now, do it for every event
-                # if "Dopen" in d.source.SourceType or "Begraven" in d.source.SourceType:
-                eventUri = a2a.term(
-                    d.source.guid + "#" + "event"
-                )  # Use our own NS for event that is registered?
-                event = Event(
-                    eventUri,
-                    hasTimeStamp=eventDateLiteral,
-                    hasPlace=eventPlaces,
-                    hasReligion=eventReligions,
-                    label=[
-                        Literal(
-                            f"{eventTypeName} ({eventDate if eventDate else '?'})",
-                            lang="nl",
-                        )
-                    ],
-                )
 
-                registrationEvent.registers = event
+                    registrationEvent.registers = event
 
-            # persons and roles
-            persons = []
-            roles = []
-            guid_roles = defaultdict(list)
-            for n, p in enumerate(d.persons, 1):
+                # persons and roles
+                persons = []
+                roles = []
+                guid_roles = defaultdict(list)
+                for n, p in enumerate(d.persons, 1):
 
-                pEvents = [registrationEvent]
+                    pEvents = [registrationEvent]
 
-                personnames, pLabels = parsePersonName(
-                    givenName=p.PersonName.PersonNameFirstName,
-                    surnamePrefix=p.PersonName.PersonNamePrefixLastName,
-                    baseSurname=p.PersonName.PersonNameLastName,
-                )
+                    personnames, pLabels = parsePersonName(
+                        givenName=p.PersonName.PersonNameFirstName,
+                        surnamePrefix=p.PersonName.PersonNamePrefixLastName,
+                        baseSurname=p.PersonName.PersonNameLastName,
+                        emit=emit,
+                        names=names,
+                    )
 
-                ## Annotation PersonName on scan (Notarial)
+                    ## Annotation PersonName on scan (Notarial)
 
-                if hasattr(p, "Remarks"):
-                    if scanData := p.Remarks.get("diversen"):
+                    if p.Remarks:
+                        if scanData := p.Remarks["diversen"]:
 
-                        if "Positie op scan" in scanData:
+                            if "Positie op scan" in scanData:
 
-                            scanName = scanData["Positie op scan"]["scan"].upper()
-                            scanPosition = scanData["Positie op scan"]["positie"]
-                            coordinates = scanPosition.replace(" ", "")
+                                scanName = scanData["Positie op scan"]["scan"].upper()
+                                scanPosition = scanData["Positie op scan"]["positie"]
+                                coordinates = scanPosition.replace(" ", "")
 
-                            # scanIdentifier = collection2scansname[collection][
-                            #     scanName]
-                            scanUri = partOfUri + "/scans/" + scanName
+                                # scanIdentifier = collection2scansname[collection][
+                                #     scanName]
+                                scanUri = partOfUri + "/scans/" + scanName
 
-                            an = Annotation(
-                                None,
-                                hasBody=personnames[0],
-                                hasTarget=SpecificResource(
+                                an = emit(
+                                    Annotation,
                                     None,
-                                    hasSource=scanUri,
-                                    hasSelector=FragmentSelector(
+                                    hasBody=personnames[0],
+                                    hasTarget=emit(
+                                        SpecificResource,
                                         None,
-                                        conformsTo=URIRef(
-                                            "http://www.w3.org/TR/media-frags/"
+                                        hasSource=scanUri,
+                                        hasSelector=emit(
+                                            FragmentSelector,
+                                            None,
+                                            conformsTo=URIRef(
+                                                "http://www.w3.org/TR/media-frags/"
+                                            ),
+                                            value=coordinates,
                                         ),
-                                        value=coordinates,
                                     ),
-                                ),
-                                # depiction=depiction,
-                                label=pLabels,
-                            )
-
-                        if "Beroep" in scanData:
-
-                            occupation, occupationName = thesaurus(
-                                scanData["Beroep"],
-                                OccupationObservation,
-                                graph,
-                                thesaurusGraph,
-                            )
+                                    # depiction=depiction,
+                                    label=pLabels,
+                                )
 
-                            occupationRole = OccupationRole(
-                                None,
-                                carriedIn=registrationEvent,
-                                carriedBy=[occupation],
-                                label=[
-                                    Literal(
-                                        f"{occupationName} in de rol van beroepsomschrijving",
-                                        lang="nl",
-                                    )
-                                ],
-                            )
+                            if "Beroep" in scanData:
 
-                            roles.append(occupationRole)
+                                occupation, occupationName = thesaurusTerm(
+                                    scanData["Beroep"],
+                                    OccupationObservation,
+                                    emit=thesaurusTriples,
+                                    registry=termRegistry,
+                                )
 
-                        if "Plaats in bron" in scanData:
+                                occupationRole = emit(
+                                    OccupationRole,
+                                    None,
+                                    carriedIn=registrationEvent,
+                                    carriedBy=[occupation],
+                                    label=[
+                                        Literal(
+                                            f"{occupationName} in de rol van beroepsomschrijving",
+                                            lang="nl",
+                                        )
+                                    ],
+                                )
 
-                            origin, originName = thesaurus(
-                                scanData["Plaats in bron"], Place, graph, thesaurusGraph
-                            )
+                                roles.append(occupationRole)
 
-                            originRole = OriginRole(
-                                None,
-                                carriedIn=registrationEvent,
-                                carriedBy=[origin],
-                                label=[
-                                    Literal(
-                                        f"{originName} in de rol van herkomstomschrijving",
-                                        lang="nl",
-                                    )
-                                ],
-                            )
+                            if "Plaats in bron" in scanData:
 
-                            roles.append(originRole)
+                                origin, originName = thesaurusTerm(
+                                    scanData["Plaats in bron"],
+                                    Place,
+                                    emit=thesaurusTriples,
+                                    registry=termRegistry,
+                                )
 
-                        if "Eerdere man" in scanData:
+                                originRole = emit(
+                                    OriginRole,
+                                    None,
+                                    carriedIn=registrationEvent,
+                                    carriedBy=[origin],
+                                    label=[
+                                        Literal(
+                                            f"{originName} in de rol van herkomstomschrijving",
+                                            lang="nl",
+                                        )
+                                    ],
+                                )
 
-                            earlierHusbandName = scanData["Eerdere man"]
+                                roles.append(originRole)
 
-                            pnsEarlierHusband, labelsEarlierHusband = parsePersonName(
-                                earlierHusbandName
-                            )
+                            if "Eerdere man" in scanData:
 
-                            earlierHusband = Person(
-                                deed.term(d.source.guid + "?person=" + "EerdereMan"),
-                                participatesIn=[registrationEvent],
-                                hasName=pnsEarlierHusband,
-                                label=[labelsEarlierHusband[0]],
-                            )
+                                earlierHusbandName = scanData["Eerdere man"]
 
-                            role = EarlierHusband(
-                                None,
-                                carriedIn=registrationEvent,
-                                carriedBy=[earlierHusband],
-                                label=[
-                                    Literal(
-                                        f"{labelsEarlierHusband[0]} in de rol van eerdere man",
-                                        lang="nl",
+                                pnsEarlierHusband, labelsEarlierHusband = (
+                                    parsePersonName(
+                                        earlierHusbandName, emit=emit, names=names
                                     )
-                                ],
-                            )
-
-                            persons.append(earlierHusband)
-                            roles.append(role)
-
-                        if "Eerdere vrouw" in scanData:
+                                )
 
-                            earlierWifeName = scanData["Eerdere vrouw"]
+                                earlierHusband = emit(
+                                    Person,
+                                    deed.term(
+                                        d.source.guid + "?person=" + "EerdereMan"
+                                    ),
+                                    participatesIn=[registrationEvent],
+                                    hasName=pnsEarlierHusband,
+                                    label=[labelsEarlierHusband[0]],
+                                )
 
-                            pnsEarlierWife, labelsEarlierWife = parsePersonName(
-                                earlierWifeName
-                            )
+                                role = emit(
+                                    EarlierHusband,
+                                    None,
+                                    carriedIn=registrationEvent,
+                                    carriedBy=[earlierHusband],
+                                    label=[
+                                        Literal(
+                                            f"{labelsEarlierHusband[0]} in de rol van eerdere man",
+                                            lang="nl",
+                                        )
+                                    ],
+                                )
 
-                            earlierWife = Person(
-                                deed.term(d.source.guid + "?person=" + "EerdereVrouw"),
-                                participatesIn=[registrationEvent],
-                                hasName=pnsEarlierWife,
-                                label=[labelsEarlierWife[0]],
-                            )
+                                persons.append(earlierHusband)
+                                roles.append(role)
 
-                            role = EarlierWife(
-                                None,
-                                carriedIn=registrationEvent,
-                                carriedBy=[earlierWife],
-                                label=[
-                                    Literal(
-                                        f"{labelsEarlierWife[0]} in de rol van eerdere vrouw",
-                                        lang="nl",
-                                    )
-                                ],
-                            )
+                            if "Eerdere vrouw" in scanData:
 
-                            persons.append(earlierWife)
-                            roles.append(role)
+                                earlierWifeName = scanData["Eerdere vrouw"]
 
-                        if "Naamsvariant" in scanData:
+                                pnsEarlierWife, labelsEarlierWife = parsePersonName(
+                                    earlierWifeName, emit=emit, names=names
+                                )
 
-                            nameVariant = scanData["Naamsvariant"]
+                                earlierWife = emit(
+                                    Person,
+                                    deed.term(
+                                        d.source.guid + "?person=" + "EerdereVrouw"
+                                    ),
+                                    participatesIn=[registrationEvent],
+                                    hasName=pnsEarlierWife,
+                                    label=[labelsEarlierWife[0]],
+                                )
 
-                            pnVariants, _ = parsePersonName(nameVariant)
-                            personnames += pnVariants
+                                role = emit(
+                                    EarlierWife,
+                                    None,
+                                    carriedIn=registrationEvent,
+                                    carriedBy=[earlierWife],
+                                    label=[
+                                        Literal(
+                                            f"{labelsEarlierWife[0]} in de rol van eerdere vrouw",
+                                            lang="nl",
+                                        )
+                                    ],
+                                )
 
-                        if "Overige namen" in scanData:
+                                persons.append(earlierWife)
+                                roles.append(role)
 
-                            for otherName in scanData["Overige namen"]:
-                                pass  # TODO
+                            if "Naamsvariant" in scanData:
 
-                ##
-                pid = p.id.replace("Person:", "")
-                person = Person(
-                    deed.term(d.source.guid + "?person=" + pid),
-                    hasName=personnames,
-                    label=pLabels,
-                )
+                                nameVariant = scanData["Naamsvariant"]
 
-                # birth in A2A defined
-                if bd := getattr(p, "BirthDate"):
+                                pnVariants, _ = parsePersonName(
+                                    nameVariant, emit=emit, names=names
+                                )
+                                personnames += pnVariants
 
-                    birthDate = bd.date
-                    birthLabel = [
-                        Literal(
-                            f"Geboorte van {pLabels[0]} ({birthDate.isoformat() if birthDate else '?'})"
-                        )
-                    ]
+                            if "Overige namen" in scanData:
 
-                    birthEvent = Geboorte(
-                        deed.term(d.source.guid + "?event=birth"),
-                        hasTimeStamp=birthDate,
-                        label=birthLabel,
-                    )
+                                for otherName in scanData["Overige namen"]:
+                                    pass  # TODO
 
-                    role = ChildRole(
-                        None,
-                        carriedIn=birthEvent,
-                        carriedBy=[person],
-                        label=[Literal(f"{pLabels[0]} in de rol van Kind", lang="nl")],
+                    ##
+                    pid = p.id.replace("Person:", "")
+                    person = emit(
+                        Person,
+                        deed.term(d.source.guid + "?person=" + pid),
+                        hasName=personnames,
+                        label=pLabels,
                     )
 
-                    pEvents.append(birthEvent)
-                    roles.append(role)
-
-                for r in p.relations:
-                    if e := getattr(r, "event"):
+                    # birth in A2A defined
+                    if bd := getattr(p, "BirthDate"):
 
-                        # relationTypeName = r.RelationType.lower().replace(
-                        #     'other:', '').title().replace(' ', '')
-
-                        # Switch to ontology graph
-                        # g = rdfSubject.db = ontologyGraph
-
-                        # Catch for Confessieboeken that only have 'Verdachte' as role
-                        if "Confessieboeken" in sourceTypeName:
-                            relationType = "Verdachte"
-                        else:
-                            relationType = r.RelationType
-
-                        rType, rTypeName = thesaurus(
-                            relationType,
-                            RoleType,
-                            graph,
-                            ontologyGraph,
-                            subClassOf=rpp.Role,
-                        )
+                        birthDate = bd.date
+                        birthLabel = [
+                            Literal(
+                                f"Geboorte van {pLabels[0]} ({birthDate.isoformat() if birthDate else '?'})"
+                            )
+                        ]
 
-                        RoleClass = type(
-                            relationType, (Role,), {"rdf_type": rType.resUri}
+                        birthEvent = emit(
+                            Geboorte,
+                            deed.term(d.source.guid + "?event=birth"),
+                            hasTimeStamp=birthDate,
+                            label=birthLabel,
                         )
 
-                        # rType = RoleType(rpp.term(relationTypeName),
-                        #                  subClassOf=rpp.Role,
-                        #                  label=[relationTypeName])
-
-                        # Switch to A2A graph
-                        # g = rdfSubject.db = graph
-                        eUri = deed.term(d.source.guid + "?event=" + e.id)
-                        role = RoleClass(
+                        role = emit(
+                            ChildRole,
                             None,
-                            carriedIn=eUri,
+                            carriedIn=birthEvent,
                             carriedBy=[person],
                             label=[
-                                Literal(
-                                    f"{pLabels[0]} in de rol van {rTypeName}", lang="nl"
-                                )
+                                Literal(f"{pLabels[0]} in de rol van Kind", lang="nl")
                             ],
                         )
-                        guid_roles[pid].append(role)
+
+                        pEvents.append(birthEvent)
                         roles.append(role)
 
-                person.participatesIn = pEvents
-                persons.append(person)
+                    for r in p.relations:
+                        if e := getattr(r, "event"):
 
-            # locations and roles
-            locations = []
-            if d.source.Remarks["Opmerking"]:
-                if locationremarks := d.source.Remarks["Opmerking"][
-                    "Locatieomschrijving"
-                ]:
+                            # relationTypeName = r.RelationType.lower().replace(
+                            #     'other:', '').title().replace(' ', '')
 
-                    if type(locationremarks) == str:
-                        locationremarks = [locationremarks]
+                            # Switch to ontology graph
+                            # g = rdfSubject.db = ontologyGraph
 
-                    for n, locName in enumerate(locationremarks, 1):
-                        uri = deed.term(
-                            d.source.guid + "?location=" + "Location" + str(n)
-                        )
-                        location = LocationObservation(
-                            uri, label=[locName]
-                        )  # notarieel
+                            # Catch for Confessieboeken that only have 'Verdachte' as role
+                            if "Confessieboeken" in sourceTypeName:
+                                relationType = "Verdachte"
+                            else:
+                                relationType = r.RelationType
+
+                            rType, rTypeName = thesaurusTerm(
+                                relationType,
+                                RoleType,
+                                subClassOf=rpp.Role,
+                                emit=ontology,
+                                registry=termRegistry,
+                            )
+
+                            RoleClass = getTermClass(relationType, Role, rType.resUri)
 
-                        locationRole = LocationRole(
+                            # rType = RoleType(rpp.term(relationTypeName),
+                            #                  subClassOf=rpp.Role,
+                            #                  label=[relationTypeName])
+
+                            # Switch to A2A graph
+                            # g = rdfSubject.db = graph
+                            eUri = deed.term(d.source.guid + "?event=" + e.id)
+                            role = emit(
+                                RoleClass,
+                                None,
+                                carriedIn=eUri,
+                                carriedBy=[person],
+                                label=[
+                                    Literal(
+                                        f"{pLabels[0]} in de rol van {rTypeName}",
+                                        lang="nl",
+                                    )
+                                ],
+                            )
+                            guid_roles[pid].append(role)
+                            roles.append(role)
+
+                    person.participatesIn = pEvents
+                    persons.append(person)
+
+                # locations and roles
+                locations = []
+                if sourceRemarks:
+                    if locationremarks := sourceRemarks["Locatieomschrijving"]:
+
+                        if type(locationremarks) == str:
+                            locationremarks = [locationremarks]
+
+                        for n, locName in enumerate(locationremarks, 1):
+                            uri = deed.term(
+                                d.source.guid + "?location=" + "Location" + str(n)
+                            )
+                            location = emit(
+                                LocationObservation, uri, label=[locName]
+                            )  # notarieel
+
+                            locationRole = emit(
+                                LocationRole,
+                                None,
+                                carriedIn=registrationEvent,
+                                carriedBy=[location],
+                                label=[
+                                    Literal(
+                                        f"{locName} in de rol van locatieomschrijving",
+                                        lang="nl",
+                                    )
+                                ],
+                            )
+
+                            locations.append(location)
+                            roles.append(locationRole)
+
+                # relations and roles
+                relations = []
+                if sourceRemarks:
+                    if relatieinformatie := sourceRemarks["Relatie informatie"]:
+
+                        r1, r2 = None, None
+
+                        uri = deed.term(d.source.guid + "?relation=" + "Relation1")
+                        relation = emit(Relation, uri, label=[relatieinformatie])
+
+                        for pid, pRoles in guid_roles.items():
+                            if len(pRoles) == 1:
+                                role = pRoles[0]
+                            else:
+                                print("More than 1 or no role for this person!")
+                                continue
+
+                            if getBgGuid2index().get(pid) == 1:
+                                r1 = role
+                                role.position = 1
+                            elif getBgGuid2index().get(pid) == 2:
+                                r2 = role
+                                role.position = 2
+                            else:
+                                # If there is only one person, but still a relation info
+                                r2 = role
+                                role.position = 1
+
+                        # Relation in SAA is from p1 to p2 (p1 is husband of p2)
+                        # We do it the other way round: p2 has husband p1
+                        # Relations are bound to the person role
+
+                        if r1:
+                            pLabel = r1.carriedBy[0].hasName[0].literalName
+                        else:
+                            pLabel = "Onbekend"
+
+                        relationRole = emit(
+                            RelationRole,
                             None,
                             carriedIn=registrationEvent,
-                            carriedBy=[location],
+                            carriedBy=[relation],
+                            relatedTo=r1,
                             label=[
-                                Literal(
-                                    f"{locName} in de rol van locatieomschrijving",
-                                    lang="nl",
-                                )
+                                Literal(f"{relatieinformatie} ({pLabel})", lang="nl")
                             ],
                         )
 
-                        locations.append(location)
-                        roles.append(locationRole)
+                        if r2:
+                            r2.hasRelation = [relationRole]
 
-            # relations and roles
-            relations = []
-            if d.source.Remarks["Opmerking"]:
-                if relatieinformatie := d.source.Remarks["Opmerking"][
-                    "Relatie informatie"
-                ]:
+                        relations.append(relation)
 
-                    r1, r2 = None, None
+                # Confessieboeken 'Overige namen'
+                if sourceRemarks:
+                    if otherNames := sourceRemarks["Overige namen"]:
 
-                    uri = deed.term(d.source.guid + "?relation=" + "Relation1")
-                    relation = Relation(uri, label=[relatieinformatie])
+                        # If there is only one
+                        if type(otherNames) == str:
+                            otherNames = [otherNames]
 
-                    for pid, pRoles in guid_roles.items():
-                        if len(pRoles) == 1:
-                            role = pRoles[0]
-                        else:
-                            print("More than 1 or no role for this person!")
-                            continue
-
-                        if bg_guid2index.get(pid) == 1:
-                            r1 = role
-                            role.position = 1
-                        elif bg_guid2index.get(pid) == 2:
-                            r2 = role
-                            role.position = 2
-                        else:
-                            # If there is only one person, but still a relation info
-                            r2 = role
-                            role.position = 1
+                        for n, otherPersonName in enumerate(otherNames, 1):
+                            uri = deed.term(
+                                d.source.guid + "?otherName=" + "Location" + str(n)
+                            )
 
-                    # Relation in SAA is from p1 to p2 (p1 is husband of p2)
-                    # We do it the other way round: p2 has husband p1
-                    # Relations are bound to the person role
+                            pnsOtherPerson, labelsOtherPerson = parsePersonName(
+                                otherPersonName, emit=emit, names=names
+                            )
 
-                    if r1:
-                        pLabel = r1.carriedBy[0].hasName[0].literalName
-                    else:
-                        pLabel = "Onbekend"
-
-                    relationRole = RelationRole(
-                        None,
-                        carriedIn=registrationEvent,
-                        carriedBy=[relation],
-                        relatedTo=r1,
-                        label=[Literal(f"{relatieinformatie} ({pLabel})", lang="nl")],
-                    )
+                            otherPerson = emit(
+                                Person,
+                                deed.term(
+                                    d.source.guid + "?person=" + "Other" + str(n)
+                                ),
+                                participatesIn=[registrationEvent],
+                                hasName=pnsOtherPerson,
+                                label=[labelsOtherPerson[0]],
+                            )
 
-                    if r2:
-                        r2.hasRelation = [relationRole]
+                            relationType = "Geregistreerde"
+                            rType, rTypeName = thesaurusTerm(
+                                relationType,
+                                RoleType,
+                                subClassOf=rpp.Role,
+                                emit=ontology,
+                                registry=termRegistry,
+                            )
 
-                    relations.append(relation)
+                            RoleClass = getTermClass(relationType, Role, rType.resUri)
 
-            # Confessieboeken 'Overige namen'
-            if d.source.Remarks["Opmerking"]:
-                if otherNames := d.source.Remarks["Opmerking"]["Overige namen"]:
+                            role = emit(
+                                RoleClass,
+                                None,
+                                carriedIn=registrationEvent,
+                                carriedBy=[otherPerson],
+                                label=[
+                                    Literal(
+                                        f"{labelsOtherPerson[0]} in de rol van {rTypeName}]",
+                                        lang="nl",
+                                    )
+                                ],
+                            )
 
-                    # If there is only one
-                    if type(otherNames) == str:
-                        otherNames = [otherNames]
+                            persons.append(otherPerson)
+                            roles.append(role)
 
-                    for n, otherPersonName in enumerate(otherNames, 1):
-                        uri = deed.term(
-                            d.source.guid + "?otherName=" + "Location" + str(n)
-                        )
+                sourceIndex.mentionsEvent = events
+                sourceIndex.mentionsPerson = persons
+                sourceIndex.mentionsLocation = locations
+                sourceIndex.mentionsRelation = relations
+                sourceIndex.mentionsRole = roles
+
+                # # Remarks
+                # for remark in p.Remarks['diversen']:
+                #     if remark == 'Adres':
+                #         adres = p.Remarks['diversen']['Adres']
+                #         locObs = LocationObservation(safeBnode(adres),
+                #                                      label=[adres])
+
+                #         person.hasLocation = [
+                #             StructuredValue(None,
+                #                             value=locObs,
+                #                             role="resident",
+                #                             hasLatestBeginTimeStamp=eventDate,
+                #                             hasEarliestEndTimeStamp=eventDate)
+                #         ]
+
+                # Serialized once for all windows
+                rows = windows[recordWindows[0]].serialize(emit.triples)
+
+                for w in recordWindows:
+                    windows[w].writeNTriples(rows)
+                    windowShared[w].update(shared)
+                    windowNames[w].update(names or {})
+                    windowMembers[w].update(members)
+
+                collections = collectionEmit.triples if sharedShard else []
+                collectionTriples.update(collections)
+
+                if cache:
+                    cache.put(
+                        key,
+                        (
+                            rows,
+                            recordWindows,
+                            members,
+                            shared,
+                            names or {},
+                            collections,
+                            list(usedTerms),
+                        ),
+                    )
+                    cacheStats["record cache seconds"] += time.perf_counter() - start
+
+                nRecords += 1
+
+        if sharedShard:
+            # One spill for all windows
+            shared = set().union(*windowShared.values())
+            names = {
+                uri: key for w in windowNames for uri, key in windowNames[w].items()
+            }
+
+            writer = next(iter(windows.values()))
+            writeSpill(
+                spillPath(path),
+                writer.serialize(
+                    chain(
+                        getSharedTriples(shared),
+                        getNameTriples(names),
+                        collectionTriples,
+                    )
+                ),
+            )
 
-                        pnsOtherPerson, labelsOtherPerson = parsePersonName(
-                            otherPersonName
-                        )
+        for w, writer in windows.items():
 
-                        otherPerson = Person(
-                            deed.term(d.source.guid + "?person=" + "Other" + str(n)),
-                            participatesIn=[registrationEvent],
-                            hasName=pnsOtherPerson,
-                            label=[labelsOtherPerson[0]],
-                        )
+            emit = TripleEmitter()
+            emit(IndexCollection, indexCollectionURI)
+            writer.write(chain(emit.triples, windowMembers[w].triples()))
 
-                        relationType = "Geregistreerde"
-                        rType, rTypeName = thesaurus(
-                            relationType,
-                            RoleType,
-                            graph,
-                            ontologyGraph,
-                            subClassOf=rpp.Role,
-                        )
+            if not sharedShard:
+                writer.write(getSharedTriples(windowShared[w]))
+                writer.write(getNameTriples(windowNames[w]))
 
-                        RoleClass = type(
-                            relationType, (Role,), {"rdf_type": rType.resUri}
-                        )
+            writer.close()
+    except BaseException:
+        # No half-written TriG files are left behind, see GraphWriter.abort
+        for writer in windows.values():
+            writer.abort()
 
-                        role = RoleClass(
-                            None,
-                            carriedIn=registrationEvent,
-                            carriedBy=[otherPerson],
-                            label=[
-                                Literal(
-                                    f"{labelsOtherPerson[0]} in de rol van {rTypeName}]",
-                                    lang="nl",
-                                )
-                            ],
-                        )
+        raise
 
-                        persons.append(otherPerson)
-                        roles.append(role)
+    concordance.close()
 
-            sourceIndex.mentionsEvent = events
-            sourceIndex.mentionsPerson = persons
-            sourceIndex.mentionsLocation = locations
-            sourceIndex.mentionsRelation = relations
-            sourceIndex.mentionsRole = roles
-
-            # # Remarks
-            # for remark in p.Remarks['diversen']:
-            #     if remark == 'Adres':
-            #         adres = p.Remarks['diversen']['Adres']
-            #         locObs = LocationObservation(safeBnode(adres),
-            #                                      label=[adres])
-
-            #         person.hasLocation = [
-            #             StructuredValue(None,
-            #                             value=locObs,
-            #                             role="resident",
-            #                             hasLatestBeginTimeStamp=eventDate,
-            #                             hasEarliestEndTimeStamp=eventDate)
-            #         ]
-
-    indexCollection.hasMember = allIndexDocuments
-
-    graph = skolemize(graph)
-    graph = bindNS(graph)
-
-    # gzip
-    if gz:
-        with gzip.open(path + ".gz", "wb") as outfile:
-            outfile.write(graph.serialize(format="trig").encode())
-    else:
-        graph.serialize(path, format="trig")
+    if cache:
+        cache.close()
+
+    for memo, info in getCacheInfo().items():
+        cacheStats[f"{memo} hits"] += info.hits - cacheInfo[memo].hits
+        cacheStats[f"{memo} misses"] += info.misses - cacheInfo[memo].misses
+
+    # Report the statistics of this chunk only
+    stats = cacheStats.copy()
+    cacheStats.clear()
 
-    return ontologyGraph, thesaurusGraph
+    # Every term of this chunk once, see thesaurusTerm. The parent merges them.
+    return set(ontology.triples), set(thesaurusTriples.triples), stats, nRecords
 
 
 if __name__ == "__main__":
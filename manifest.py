@@ -0,0 +1,182 @@
+"""
+Run manifest for resumable conversions.
+
+For every step (the EAD conversion, every A2A chunk) the manifest records
+the input files, a fingerprint of their content and of the conversion
+parameters, the output files and the status. When a run is restarted, steps
+that are done, whose fingerprint is unchanged and whose outputs all exist
+are skipped.
+
+Every finished step is appended to a log next to the manifest (JSON lines),
+so that recording a step does not rewrite the whole manifest. At the end of
+a run the log is compacted into the manifest, which is written to a
+temporary file that is then renamed. The log of an interrupted run is read
+back when the manifest is loaded, so a crash never loses a finished step.
+"""
+
+import os
+import json
+import hashlib
+
+from rdflib import Graph
+
+from pagestore import openPage
+
+
+def fingerprint(filenames, params=()):
+    """
+    Hash of the content of the input files and the conversion parameters.
+
+    Args:
+        filenames (list): Paths to the input files, or pages in an archive
+            (see pagestore.py).
+        params (tuple, optional): Parameters that influence the output. Their
+            repr is hashed. Defaults to ().
+
+    Returns:
+        str: Hex digest.
+    """
+
+    h = hashlib.sha1(repr(params).encode())
+
+    for filename in filenames:
+        h.update(filename.encode())
+
+        with openPage(filename) as infile:
+            for block in iter(lambda: infile.read(1 << 20), b""):
+                h.update(block)
+
+    return h.hexdigest()
+
+
+def toNTriples(triples):
+    """
+    Serialize a set of triples (e.g. ontology terms) for in the manifest.
+    """
+
+    g = Graph()
+    g += triples
+
+    return g.serialize(format="nt")
+
+
+def fromNTriples(data):
+    """
+    Parse the triples that were stored with toNTriples.
+    """
+
+    g = Graph()
+    g.parse(data=data, format="nt")
+
+    return set(g)
+
+
+class RunManifest:
+    """
+    Status of the steps of a conversion run, stored as JSON.
+
+    Usage:
+        manifest = RunManifest("trig/manifest.json")
+
+        if not manifest.isDone(key, fp):
+            ...  # convert
+            manifest.markDone(key, fp, inputs, outputs)
+
+        manifest.save()
+    """
+
+    def __init__(self, path):
+
+        self.path = path
+        self.logPath = path + ".log"
+        self.log = None
+
+        if os.path.exists(path):
+            with open(path) as infile:
+                self.steps = json.load(infile)
+        else:
+            self.steps = dict()
+
+        # Steps that were finished after the last save, e.g. by a run that
+        # was interrupted
+        if os.path.exists(self.logPath):
+            with open(self.logPath) as infile:
+                for line in infile:
+                    try:
+                        key, step = json.loads(line)
+                    except ValueError:  # the last line was not finished
+                        break
+
+                    self.steps[key] = step
+
+            # Start the log of this run afresh
+            self.save()
+
+    def get(self, key):
+
+        return self.steps.get(key, {})
+
+    def isDone(self, key, fingerprint):
+        """
+        Whether a step is done with the same inputs and its outputs exist.
+        """
+
+        step = self.steps.get(key)
+
+        if not step or step["status"] != "done":
+            return False
+
+        if step["fingerprint"] != fingerprint:
+            return False
+
+        return all(os.path.exists(path) for path in step["outputs"])
+
+    def markDone(self, key, fingerprint, inputs, outputs, **data):
+        """
+        Record a finished step and append it to the log.
+
+        Args:
+            key (str): Name of the step, e.g. the output path of a chunk.
+            fingerprint (str): See fingerprint().
+            inputs (list): Paths to the input files.
+            outputs (list): Paths to the output files.
+            **data: Extra data to store with the step, e.g. the number of
+                records.
+        """
+
+        step = {
+            "status": "done",
+            "fingerprint": fingerprint,
+            "inputs": list(inputs),
+            "outputs": list(outputs),
+            **data,
+        }
+        self.steps[key] = step
+
+        if self.log is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.log = open(self.logPath, "a")
+
+        self.log.write(json.dumps([key, step]) + "\n")
+        self.log.flush()
+
+    def save(self):
+        """
+        Write all steps to the manifest and remove the log.
+        """
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        tmpPath = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmpPath, "w") as outfile:
+            json.dump(self.steps, outfile, indent=1)
+
+        os.replace(tmpPath, self.path)
+
+        # Replaying the log again after a crash here is harmless
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+
+        if os.path.exists(self.logPath):
+            os.remove(self.logPath)
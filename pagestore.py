@@ -0,0 +1,176 @@
+"""
+Consolidated storage for harvested A2A pages.
+
+The harvester (data/a2a/a2a.py) writes every OAI-PMH response to its own
+XML file. packFolder appends these pages to one gzip file per set
+(pages.xml.gz), in which every page is a separate gzip member, and records
+the offset and length of every member in an index (pages.idx.json). A page
+can then be read without decompressing the pages before it.
+
+Pages in an archive are referred to as '<archive>::<name>', so they can be
+passed around like file paths. listPages returns the pages of a set folder,
+packed or not, and openPage opens either kind.
+
+    python pagestore.py data/a2a/SAA-ID-002_SAA_Index_op_doopregisters --remove
+"""
+
+import os
+import io
+import sys
+import json
+import gzip
+
+from functools import lru_cache
+
+ARCHIVE = "pages.xml.gz"
+INDEX = "pages.idx.json"
+SEP = "::"
+
+
+@lru_cache(maxsize=None)
+def loadIndex(indexPath, stamp=None):
+    """
+    Page name -> (offset, length, size) of the members of an archive. The
+    stamp (modification time) invalidates the cache when pages are added.
+    """
+
+    with open(indexPath) as infile:
+        return {name: tuple(entry) for name, entry in json.load(infile).items()}
+
+
+def getIndex(folder):
+
+    indexPath = os.path.join(folder, INDEX)
+
+    if not os.path.exists(indexPath):
+        return {}
+
+    return loadIndex(indexPath, os.stat(indexPath).st_mtime_ns)
+
+
+def listPages(folder):
+    """
+    References to all pages of a set, in harvest order.
+
+    Args:
+        folder (str): Folder of the set.
+
+    Returns:
+        list: Absolute paths of the loose XML files and '<archive>::<name>'
+            references for the packed pages. A page that is both packed and
+            loose is read from the archive.
+    """
+
+    folder = os.path.abspath(folder)
+    archivePath = os.path.join(folder, ARCHIVE)
+
+    pages = {
+        f: os.path.join(folder, f) for f in os.listdir(folder) if f.endswith(".xml")
+    }
+    pages.update({name: archivePath + SEP + name for name in getIndex(folder)})
+
+    return [pages[name] for name in sorted(pages)]
+
+
+def splitPage(page):
+
+    archivePath, name = page.split(SEP, 1)
+
+    return archivePath, name
+
+
+def openPage(page):
+    """
+    Open a page (see listPages) or any other file for reading, in binary mode.
+    """
+
+    if SEP not in page:
+        return open(page, "rb")
+
+    archivePath, name = splitPage(page)
+    offset, length, size = getIndex(os.path.dirname(archivePath))[name]
+
+    with open(archivePath, "rb") as infile:
+        infile.seek(offset)
+        data = infile.read(length)
+
+    return io.BytesIO(gzip.decompress(data))
+
+
+def pageSize(page):
+    """
+    Uncompressed size of a page in bytes.
+    """
+
+    if SEP not in page:
+        return os.path.getsize(page)
+
+    archivePath, name = splitPage(page)
+
+    return getIndex(os.path.dirname(archivePath))[name][2]
+
+
+def packFolder(folder, remove=False, compresslevel=6):
+    """
+    Append the loose pages of a set to its archive.
+
+    The index is written after the pages, to a temporary file that is then
+    renamed. Anything after the last indexed member (e.g. from an
+    interrupted run) is cut off first.
+
+    Args:
+        folder (str): Folder of the set.
+        remove (bool, optional): Remove the loose pages once they are in the
+            archive. Defaults to False.
+        compresslevel (int, optional): gzip level. Defaults to 6.
+
+    Returns:
+        int: Number of pages added.
+    """
+
+    archivePath = os.path.join(folder, ARCHIVE)
+    indexPath = os.path.join(folder, INDEX)
+
+    index = dict(getIndex(folder))
+    end = max((offset + length for offset, length, size in index.values()), default=0)
+
+    loose = sorted(f for f in os.listdir(folder) if f.endswith(".xml"))
+    new = [f for f in loose if f not in index]
+
+    if new:
+        with open(archivePath, "ab") as outfile:
+            outfile.truncate(end)
+
+            for name in new:
+                with open(os.path.join(folder, name), "rb") as infile:
+                    data = infile.read()
+
+                member = gzip.compress(data, compresslevel=compresslevel, mtime=0)
+                outfile.write(member)
+
+                index[name] = (end, len(member), len(data))
+                end += len(member)
+
+            outfile.flush()
+            os.fsync(outfile.fileno())
+
+        tmpPath = f"{indexPath}.{os.getpid()}.tmp"
+        with open(tmpPath, "w") as outfile:
+            json.dump(index, outfile)
+        os.replace(tmpPath, indexPath)
+
+    if remove:
+        for name in loose:
+            os.remove(os.path.join(folder, name))
+
+    return len(new)
+
+
+if __name__ == "__main__":
+
+    remove = "--remove" in sys.argv
+    for folder in sys.argv[1:]:
+        if folder == "--remove":
+            continue
+
+        print(f"{folder}: {packFolder(folder, remove=remove)} pages packed")
@@ -0,0 +1,181 @@
+"""
+Content-addressed cache of converted A2A records, stored in SQLite.
+
+The key of a record is a hash of its raw XML and of a version stamp that
+covers everything else the conversion depends on (the code, the lookup
+tables, the EAD concordance, the index collection and the temporal windows).
+The value is everything convertA2A needs to write the record again without
+converting it: its N-Triples block and the bookkeeping for the chunk. A
+changed record gets a new key, so entries never have to be invalidated.
+
+The database is shared by all workers. New entries and the keys of used
+entries are buffered and written in one transaction per batch. When the
+cache grows beyond its maximum size, the least recently used entries are
+evicted. The total size is kept up to date by triggers and the entries are
+indexed by their last use, so eviction does not scan the whole cache.
+"""
+
+import os
+import time
+import zlib
+import pickle
+import sqlite3
+import hashlib
+
+
+class RecordCache:
+    """
+    Usage:
+        cache = RecordCache("data/cache/recordcache.sqlite", version)
+
+        key = cache.key(raw)
+        entry = cache.get(key)
+        if entry is None:
+            ...  # convert
+            cache.put(key, entry)
+
+        cache.close()
+
+    Args:
+        path (str): Path of the database.
+        version (str): Version stamp, part of every key.
+        maxBytes (int, optional): Maximum size of the stored entries.
+            Defaults to 2 GiB.
+        batchSize (int, optional): Number of new entries written per
+            transaction. Defaults to 1000.
+    """
+
+    def __init__(self, path, version, maxBytes=2 * 1024**3, batchSize=1000):
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self.connection = sqlite3.connect(path, timeout=300)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS record (key BLOB PRIMARY KEY, "
+                "value BLOB, size INTEGER, used REAL) WITHOUT ROWID"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS record_used ON record (used)"
+            )
+
+            # Running total of the sizes, see evict
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS total "
+                "(id INTEGER PRIMARY KEY CHECK (id = 0), size INTEGER)"
+            )
+            self.connection.execute(
+                "INSERT OR IGNORE INTO total "
+                "SELECT 0, COALESCE(SUM(size), 0) FROM record"
+            )
+            self.connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS record_insert AFTER INSERT ON record "
+                "BEGIN UPDATE total SET size = size + new.size; END"
+            )
+            self.connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS record_update AFTER UPDATE OF size "
+                "ON record BEGIN UPDATE total SET size = size - old.size + new.size; "
+                "END"
+            )
+            self.connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS record_delete AFTER DELETE ON record "
+                "BEGIN UPDATE total SET size = size - old.size; END"
+            )
+
+        self.version = version.encode()
+        self.maxBytes = maxBytes
+        self.batchSize = batchSize
+
+        self.new = []
+        self.used = []
+
+    def key(self, raw):
+        """
+        Key for the raw XML (bytes) of a record.
+        """
+
+        return hashlib.sha1(self.version + raw).digest()
+
+    def get(self, key):
+        """
+        The cached entry, or None.
+        """
+
+        row = self.connection.execute(
+            "SELECT value FROM record WHERE key = ?", (key,)
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        self.used.append((time.time(), key))
+
+        return pickle.loads(zlib.decompress(row[0]))
+
+    def put(self, key, entry):
+
+        value = zlib.compress(pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL))
+        self.new.append((key, value, len(value), time.time()))
+
+        if len(self.new) >= self.batchSize:
+            self.flush()
+
+    def flush(self):
+
+        # An upsert instead of INSERT OR REPLACE, whose deletes do not fire
+        # the delete trigger
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO record VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE "
+                "SET value = excluded.value, size = excluded.size, "
+                "used = excluded.used",
+                self.new,
+            )
+            self.connection.executemany(
+                "UPDATE record SET used = ? WHERE key = ?", self.used
+            )
+
+        self.new = []
+        self.used = []
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache is at most
+        90% of its maximum size.
+
+        Returns:
+            int: The number of removed entries.
+        """
+
+        (total,) = self.connection.execute(
+            "SELECT size FROM total WHERE id = 0"
+        ).fetchone()
+
+        if total <= self.maxBytes:
+            return 0
+
+        excess = total - int(0.9 * self.maxBytes)
+
+        keys = []
+        for key, size in self.connection.execute(
+            "SELECT key, size FROM record ORDER BY used"
+        ):
+            if excess <= 0:
+                break
+
+            keys.append((key,))
+            excess -= size
+
+        with self.connection:
+            self.connection.executemany("DELETE FROM record WHERE key = ?", keys)
+
+        return len(keys)
+
+    def close(self):
+
+        self.flush()
+        self.evict()
+        self.connection.close()
@@ -0,0 +1,326 @@
+"""
+Planning and scheduling of the conversion.
+
+The A2A files of a collection are divided into chunks (see planChunks), and
+each chunk is converted to its own shard(s) by convertA2A in main.py. The
+EAD files and the chunks run in one process pool (see runTasks), in which a
+chunk waits for the EAD files of the archives its records refer to.
+
+A Chunk holds the arguments of convertA2A. Its fingerprint (see
+chunkFingerprint) decides whether the chunk can be skipped on a resumed run,
+see manifest.py.
+"""
+
+import re
+import math
+import heapq
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from manifest import fingerprint
+from pagestore import openPage, pageSize
+from sharedshard import spillPath
+
+# The arguments of convertA2A, in order
+Chunk = namedtuple(
+    "Chunk",
+    [
+        "filenames",
+        "path",
+        "indexCollectionURI",
+        "indexCollectionName",
+        "temporal",
+        "gz",
+        "concordance",
+        "skip",
+        "recordCache",
+        "cacheVersion",
+        "recordCacheSize",
+        "sharedNames",
+        "sharedShard",
+    ],
+)
+
+
+def getTemporalWindows(temporal, window=10, shift=5):
+    """
+    Split a period into (overlapping) windows of `window` years that start
+    every `shift` years.
+
+    Args:
+        temporal (tuple): Begin and end year of the full period.
+        window (int, optional): Length of a window in years. Defaults to 10.
+        shift (int, optional): Years between the start of two windows. Defaults to 5.
+
+    Returns:
+        list: List of (begin, end) tuples. The end year is exclusive.
+    """
+
+    windows = []
+
+    years = range(temporal[0], temporal[1] + 1, shift)
+    for year in years:
+        beginRestriction = year
+
+        end = year + window
+
+        if end <= temporal[1]:
+            endRestriction = end
+        elif temporal[1] - end > shift:
+            endRestriction = temporal[1]
+        else:
+            continue
+
+        windows.append((beginRestriction, endRestriction))
+
+    return windows
+
+
+def getWindowPaths(path, temporal=False):
+    """
+    Paths of the TriG files of a chunk, one per temporal window.
+
+    Args:
+        path (str): Path of the chunk's TriG file.
+        temporal (list, optional): List of (begin, end) windows, see
+            `getTemporalWindows`. Defaults to False.
+
+    Returns:
+        dict: (begin, end) window, or None if not temporal -> path.
+    """
+
+    if temporal:
+        return {
+            (beginRestriction, endRestriction): path.replace(
+                ".trig", f"_{beginRestriction}-{endRestriction}.trig"
+            )
+            for beginRestriction, endRestriction in temporal
+        }
+    else:
+        return {None: path}
+
+
+def countRecords(xmlfile):
+    """
+    Quick count of the OAI records in a file, without parsing it.
+    """
+
+    with openPage(xmlfile) as infile:
+        data = infile.read()
+
+    return data.count(b"<record>") + data.count(b"<record ")
+
+
+def getArchives(filenames):
+    """
+    Quick scan for the archives (EAD collections, e.g. '5001') that the
+    records in a chunk refer to, without parsing the files.
+    """
+
+    archives = set()
+
+    for filename in filenames:
+        with openPage(filename) as infile:
+            archives.update(
+                archive.decode().strip()
+                for archive in re.findall(rb"<(?:\w+:)?Archive>([^<]*)<", infile.read())
+            )
+
+    return archives
+
+
+def planChunks(filenames, splitSize=100, chunkBy="bytes", recordsPerFile=None):
+    """
+    Divide the files of a collection into chunks of about equal weight.
+
+    Files keep their order, so that consecutive chunks still cover
+    consecutive pages. The weight of a file is its size in bytes, its number
+    of records or simply 1 (chunkBy='files', every `splitSize` files). By
+    default the target weight of a chunk is chosen so that the number of
+    chunks stays the same as with `splitSize` files per chunk.
+
+    Args:
+        filenames (list): Paths to the A2A files.
+        splitSize (int, optional): Average number of files per chunk. Defaults to 100.
+        chunkBy (str, optional): 'bytes', 'records' or 'files'. Defaults to 'bytes'.
+        recordsPerFile (int, optional): Target number of records per chunk
+            (and thus per output file). Implies chunkBy='records'. Defaults to None.
+
+    Returns:
+        list: List of (filenames, weight) tuples.
+    """
+
+    if recordsPerFile:
+        chunkBy = "records"
+
+    if chunkBy == "bytes":
+        weights = [pageSize(f) for f in filenames]
+    elif chunkBy == "records":
+        weights = [countRecords(f) for f in filenames]
+    elif chunkBy == "files":
+        weights = [1 for f in filenames]
+    else:
+        raise ValueError(f"Unknown chunkBy: {chunkBy}")
+
+    if recordsPerFile:
+        target = recordsPerFile
+    elif chunkBy == "files":
+        target = splitSize
+    else:
+        target = sum(weights) / max(math.ceil(len(filenames) / splitSize), 1)
+
+    chunks = []
+
+    fns = []
+    weight = 0
+    for f, w in zip(filenames, weights):
+        fns.append(f)
+        weight += w
+
+        if weight >= target:
+            chunks.append((fns, weight))
+            fns = []
+            weight = 0
+
+    if fns:
+        chunks.append((fns, weight))
+
+    return chunks
+
+
+def chunkFingerprint(chunk, eadFingerprint):
+    """
+    Fingerprint of a chunk: its input files and every parameter that
+    influences its shards. The record cache settings are left out, as they
+    only change how fast the same output is made.
+
+    Args:
+        chunk (Chunk): The chunk.
+        eadFingerprint (str): Fingerprint of the EAD files, whose
+            concordance the chunk uses, and of the code (see main.main).
+
+    Returns:
+        str: Hex digest.
+    """
+
+    return fingerprint(
+        chunk.filenames,
+        (
+            eadFingerprint,
+            chunk.indexCollectionURI,
+            chunk.indexCollectionName,
+            chunk.temporal,
+            chunk.gz,
+            chunk.skip,
+            chunk.sharedNames,
+            chunk.sharedShard,
+        ),
+    )
+
+
+def chunkOutputs(chunk):
+    """
+    Paths of the files that a chunk writes, see convertA2A.
+    """
+
+    outputs = [
+        windowPath + ".gz" if chunk.gz else windowPath
+        for windowPath in getWindowPaths(chunk.path, chunk.temporal).values()
+    ]
+
+    if chunk.sharedShard:
+        outputs.append(spillPath(chunk.path))
+
+    return outputs
+
+
+def getRequires(chunk, eadCollections):
+    """
+    Keys of the EAD tasks (see runTasks) that a chunk has to wait for.
+
+    Args:
+        chunk (Chunk): The chunk.
+        eadCollections (dict): Archive (e.g. '5001') -> list of EAD files
+            that describe it, for the EAD files that are converted in this
+            run.
+
+    Returns:
+        list: ('ead', path) keys.
+    """
+
+    if not eadCollections:
+        return []
+
+    return [
+        ("ead", xmlfile)
+        for archive in getArchives(chunk.filenames)
+        for xmlfile in eadCollections.get(archive, ())
+    ]
+
+
+def runTasks(tasks, processes=1, maxInFlight=None):
+    """
+    Run tasks, e.g. EAD files and A2A chunks, in one long-lived process pool.
+
+    Tasks are submitted in the order of the list, except that a task waits
+    until the tasks it requires are finished and their results have been
+    handled by the caller. At most `maxInFlight` tasks are submitted at a
+    time, so that finished results do not pile up. Results are yielded as
+    soon as they arrive, in the order they finish.
+
+    Args:
+        tasks (list): (key, function, args, requires) tuples, in which
+            requires are the keys of other tasks.
+        processes (int, optional): Number of worker processes. Defaults to 1.
+        maxInFlight (int, optional): Maximum number of submitted tasks.
+            Defaults to twice the number of processes.
+
+    Yields:
+        tuple: The key and the result of every task.
+    """
+
+    if maxInFlight is None:
+        maxInFlight = 2 * processes
+
+    # Indices of the tasks that can be submitted, in order of the list
+    ready = []
+
+    # Key -> indices of the tasks that wait for it
+    blocked = defaultdict(list)
+    nRequires = dict()
+
+    for index, (key, function, args, requires) in enumerate(tasks):
+        requires = set(requires)
+
+        if requires:
+            nRequires[index] = len(requires)
+            for required in requires:
+                blocked[required].append(index)
+        else:
+            heapq.heappush(ready, index)
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+
+        pending = dict()
+
+        while ready or pending:
+
+            while ready and len(pending) < maxInFlight:
+                key, function, args, requires = tasks[heapq.heappop(ready)]
+                pending[executor.submit(function, *args)] = key
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                key = pending.pop(future)
+
+                yield key, future.result()
+
+                for index in blocked.pop(key, []):
+                    nRequires[index] -= 1
+
+                    if nRequires[index] == 0:
+                        heapq.heappush(ready, index)
+
+    if blocked:
+        raise RuntimeError(f"Tasks wait for unknown tasks: {list(blocked)}")
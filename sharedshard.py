@@ -0,0 +1,93 @@
+"""
+One deduplicated shard for the nodes that many records share.
+
+PersonNames, churches, religions, index and inventory collections and the
+reconstructions in jiw.py have deterministic URIs and the same triples in
+every chunk that mentions them. Instead of repeating these triples in every
+TriG file, each chunk spills them (deduplicated within the chunk) to a
+gzipped N-Triples file next to its shard, see spillPath.
+
+mergeShared combines the spills of all chunks into one TriG file with a
+hash-partition merge: the rows are first distributed over temporary
+partitions by the hash of their subject, and then every partition is
+deduplicated in memory on its own. Memory use depends on the size of the
+largest partition, not on the number of shared nodes.
+"""
+
+import os
+import gzip
+import zlib
+import shutil
+import tempfile
+
+from writer import GraphWriter
+
+
+def spillPath(path):
+    """
+    Path of the spill file of a shard.
+    """
+
+    return f"{path}.shared.nt.gz"
+
+
+def writeSpill(path, block):
+    """
+    Write a block of N-Triples rows (see GraphWriter.serialize) to a spill
+    file, under a temporary name that is renamed when done.
+    """
+
+    tmpPath = f"{path}.{os.getpid()}.tmp"
+
+    with gzip.open(tmpPath, "wt", encoding="utf-8") as outfile:
+        outfile.write(block)
+
+    os.replace(tmpPath, path)
+
+
+def mergeShared(spills, path, identifier, partitions=64, gz=True):
+    """
+    Merge spill files into one shard in which every row occurs once.
+
+    Args:
+        spills (list): Paths of the spill files.
+        path (str): Path of the TriG file to write. '.gz' is appended if gz
+            is True.
+        identifier (URIRef): Name of the graph.
+        partitions (int, optional): Number of partitions. Defaults to 64.
+        gz (bool, optional): Whether the TriG file should be gzipped.
+            Defaults to True.
+
+    Returns:
+        int: The number of rows written.
+    """
+
+    folder = tempfile.mkdtemp(prefix="shared.", dir=os.path.dirname(path) or ".")
+
+    try:
+        parts = [
+            open(os.path.join(folder, f"{i}.nt"), "w", encoding="utf-8")
+            for i in range(partitions)
+        ]
+
+        for spill in spills:
+            with gzip.open(spill, "rt", encoding="utf-8") as infile:
+                for row in infile:
+                    # All rows of a subject end up in the same partition
+                    subject = row.split(" ", 1)[0]
+                    parts[zlib.crc32(subject.encode()) % partitions].write(row)
+
+        for part in parts:
+            part.close()
+
+        with GraphWriter(path, identifier, gz=gz) as writer:
+            for part in parts:
+                with open(part.name, encoding="utf-8") as infile:
+                    rows = set(infile)
+
+                writer.writeNTriples("".join(sorted(rows)))
+
+    finally:
+        shutil.rmtree(folder)
+
+    return writer.count
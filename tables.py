@@ -0,0 +1,127 @@
+"""
+Lookup tables from the data folder, loaded lazily on first use.
+
+Every table is parsed from its JSON file once and then kept in a pickle
+cache (in data/cache/). The pickle is rebuilt when the modification time or
+size of the JSON file changes. Loading a table before forking the workers
+(see main.main) lets all workers share one copy.
+"""
+
+import os
+import json
+import pickle
+
+from functools import lru_cache
+
+from rdflib import URIRef
+
+CACHEFOLDER = "data/cache"
+
+
+def loadTable(path, convert=None):
+    """
+    Load a JSON table through the pickle cache.
+
+    Args:
+        path (str): Path to the JSON file.
+        convert (callable, optional): Function that is applied to the parsed
+            JSON before it is cached. Defaults to None.
+
+    Returns:
+        The (converted) table.
+    """
+
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+
+    name = path.replace("/", "_")
+    if convert:
+        name += "." + convert.__name__
+    cachePath = os.path.join(CACHEFOLDER, name + ".pickle")
+
+    try:
+        with open(cachePath, "rb") as infile:
+            cachedStamp, table = pickle.load(infile)
+
+        if cachedStamp == stamp:
+            return table
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+        pass
+
+    with open(path) as infile:
+        table = json.load(infile)
+
+    if convert:
+        table = convert(table)
+
+    # Write to a temporary file first, so that concurrent processes never
+    # read a half-written cache.
+    os.makedirs(CACHEFOLDER, exist_ok=True)
+    tmpPath = f"{cachePath}.{os.getpid()}.tmp"
+    with open(tmpPath, "wb") as outfile:
+        pickle.dump((stamp, table), outfile, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmpPath, cachePath)
+
+    return table
+
+
+def toURIRefs(table):
+    return {URIRef(k): [URIRef(i) for i in v] for k, v in table.items()}
+
+
+def byId(table):
+    return {i["@id"]: i for i in table["@graph"]}
+
+
+@lru_cache(maxsize=None)
+def getUri2notary():
+    """
+    Inventory (book) URI -> URIs of the notaries that created it.
+    """
+
+    return loadTable("data/uri2notary.json", convert=toURIRefs)
+
+
+@lru_cache(maxsize=None)
+def getBgGuid2index():
+    """
+    Person guid -> position in the burial registry record.
+    """
+
+    return loadTable("data/concordance/bg_mapping_index_guid.json")
+
+
+@lru_cache(maxsize=None)
+def getLabelChurch2location():
+    """
+    Name of a church or graveyard in the source -> location URIs.
+    """
+
+    return loadTable("data/churches/label2location.json")
+
+
+@lru_cache(maxsize=None)
+def getLabelReligion2religion():
+    """
+    Name of a religion in the source -> religion URI.
+    """
+
+    return loadTable("data/churches/label2religion.json")
+
+
+@lru_cache(maxsize=None)
+def getChurches():
+    """
+    Location URI -> church data.
+    """
+
+    return loadTable("data/churches/churches.json", convert=byId)
+
+
+@lru_cache(maxsize=None)
+def getReligions():
+    """
+    Religion URI -> religion data.
+    """
+
+    return loadTable("data/churches/religions.json", convert=byId)
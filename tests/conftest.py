@@ -0,0 +1,82 @@
+import os
+import sys
+import gzip
+
+import pytest
+from rdflib import BNode, Dataset, Graph, Namespace, URIRef
+from rdflib.term import skolem_genid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The modules live in the repository root and read their data relative to it
+sys.path.insert(0, ROOT)
+
+# Fixture data: the first records of two index sets and the EADs of their
+# archives, see linkData
+DATA = os.path.join(ROOT, "tests", "data")
+
+# The skolem IRIs of the conversion, see main.skolemIRI
+GENID = str(
+    URIRef(skolem_genid, base=Namespace("https://data.goldenagents.org/datasets/"))
+)
+
+
+def linkData(folder):
+    """
+    Make the data folder of a run in `folder`, with the fixture data. The
+    churches come from the data of the repository. The lookup tables are
+    cached in its data/cache, not in tests/data.
+    """
+
+    os.makedirs(os.path.join(folder, "data"))
+
+    for name in os.listdir(DATA):
+        os.symlink(os.path.join(DATA, name), os.path.join(folder, "data", name))
+
+    os.symlink(
+        os.path.join(ROOT, "data", "churches"),
+        os.path.join(folder, "data", "churches"),
+    )
+
+
+@pytest.fixture
+def root(monkeypatch):
+    """
+    Run a test from the repository root, like the conversion itself.
+    """
+
+    monkeypatch.chdir(ROOT)
+
+    return ROOT
+
+
+def deskolemize(triples):
+    """
+    The triples in one Graph, with the skolem IRIs turned back into blank
+    nodes, so that two runs can be compared with rdflib.compare.isomorphic.
+    """
+
+    def term(node):
+        if isinstance(node, URIRef) and node.startswith(GENID):
+            return BNode(node[len(GENID) :])
+        return node
+
+    g = Graph()
+    for s, p, o in triples:
+        g.add((term(s), p, term(o)))
+
+    return g
+
+
+def readTriples(paths):
+    """
+    The triples of (gzipped) TriG files, see deskolemize.
+    """
+
+    ds = Dataset()
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as infile:
+            ds.parse(data=infile.read(), format="trig")
+
+    return deskolemize((s, p, o) for s, p, o, _ in ds.quads())
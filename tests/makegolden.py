@@ -0,0 +1,96 @@
+"""
+Write the golden files in tests/golden for test_emitter.py, with the
+converter as it was before emitter.py (BASELINE).
+
+The baseline is exported with `git archive` into a temporary folder and
+converts the fixture data (see conftest.linkData) there: first the EADs,
+which fill its concordance dictionaries, then the first page of every index
+set. For every set, the records are written to <set>.trig and the ontology
+and thesaurus terms to <set>.terms.nt. Needs rdfalchemy.
+
+Usage:
+    python tests/makegolden.py [<commit>]
+"""
+
+import os
+import sys
+import shutil
+import tarfile
+import tempfile
+import subprocess
+
+from conftest import ROOT, DATA, linkData
+
+# The parent of the commit that added emitter.py
+BASELINE = "ea89700cbf115e3c98c731e83a08b1903040352d"
+
+GOLDEN = os.path.join(ROOT, "tests", "golden")
+
+SCRIPT = """
+import os
+import sys
+import glob
+
+from rdflib import Dataset, Graph
+
+import main
+
+golden = sys.argv[1]
+
+g = main.rdfSubject.db = Dataset().graph(identifier=main.ga.term("saa/ead/"))
+for xmlfile in sorted(glob.glob("data/ead/*.xml")):
+    main.convertEAD(xmlfile, g)
+
+for name in sorted(os.listdir("data/a2a")):
+    ontology, thesaurus = main.convertA2A(
+        [f"data/a2a/{name}/000000001.xml"],
+        os.path.join(golden, name + ".trig"),
+        main.a2a.term(main.name2index[name]),
+        "Index collection: " + main.index2nicename[main.name2index[name]],
+        gz=False,
+    )
+
+    terms = Graph()
+    terms += ontology
+    terms += thesaurus
+    terms.serialize(os.path.join(golden, name + ".terms.nt"), format="nt")
+"""
+
+
+def main(commit=BASELINE):
+
+    folder = tempfile.mkdtemp()
+
+    try:
+        archive = os.path.join(folder, "baseline.tar")
+        with open(archive, "wb") as outfile:
+            subprocess.run(
+                ["git", "archive", "--format=tar", commit],
+                cwd=ROOT,
+                stdout=outfile,
+                check=True,
+            )
+
+        baseline = os.path.join(folder, "baseline")
+        with tarfile.open(archive) as tar:
+            tar.extractall(baseline)
+
+        # The fixture data instead of the data of the baseline
+        shutil.rmtree(os.path.join(baseline, "data"))
+        linkData(baseline)
+
+        os.makedirs(GOLDEN, exist_ok=True)
+
+        subprocess.run(
+            [sys.executable, "-c", SCRIPT, GOLDEN],
+            cwd=baseline,
+            check=True,
+        )
+    finally:
+        shutil.rmtree(folder)
+
+    print("Golden files for", sorted(os.listdir(os.path.join(DATA, "a2a"))))
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
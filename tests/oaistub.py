@@ -0,0 +1,157 @@
+"""
+Stub OAI-PMH server for the harvester tests, see data/a2a/a2a.py.
+
+It serves ListRecords for a list of (identifier, datestamp) records, a few
+records per page, with resumption tokens and the 'from' argument. A request
+can be made to fail with an HTTP error to interrupt a harvest.
+
+Usage:
+    with OAIStub([("record-1", "2022-01-01T00:00:00Z")]) as server:
+        harvestSet(server.url, "set", folder)
+"""
+
+import threading
+
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+RESPONSE = """<?xml version="1.0" encoding="UTF-8"?>
+<OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/">
+  <responseDate>{responseDate}</responseDate>
+  <request verb="ListRecords">{url}</request>
+{body}
+</OAI-PMH>
+"""
+
+RECORD = """    <record>
+      <header>
+        <identifier>{identifier}</identifier>
+        <datestamp>{datestamp}</datestamp>
+        <setSpec>{setSpec}</setSpec>
+      </header>
+      <metadata>
+        <a2a:A2A xmlns:a2a="http://Mindbus.nl/A2A" Version="1.7">
+          <a2a:Source>
+            <a2a:RecordGUID>{{{identifier}}}</a2a:RecordGUID>
+          </a2a:Source>
+        </a2a:A2A>
+      </metadata>
+    </record>"""
+
+
+class OAIStub:
+    """
+    Stub OAI-PMH server on a free local port.
+
+    Args:
+        records (list): (identifier, datestamp) tuples, in the order in which
+            they are served.
+        pageSize (int, optional): Records per page. Defaults to 2.
+        responseDate (str, optional): responseDate of every response.
+            Defaults to '2024-01-01T00:00:00Z'.
+
+    Attributes:
+        url (str): Endpoint of the server.
+        requests (list): The arguments of every request, as a dict.
+        failures (set): Numbers (counting from 1) of the requests that get an
+            HTTP 500 response.
+    """
+
+    def __init__(self, records, pageSize=2, responseDate="2024-01-01T00:00:00Z"):
+
+        self.records = list(records)
+        self.pageSize = pageSize
+        self.responseDate = responseDate
+
+        self.requests = []
+        self.failures = set()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = {
+                    key: values[0]
+                    for key, values in parse_qs(urlparse(self.path).query).items()
+                }
+                stub.requests.append(params)
+
+                if len(stub.requests) in stub.failures:
+                    self.send_error(500)
+                    return
+
+                data = stub.respond(params).encode("utf-8")
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/xml; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/oai"
+
+    def respond(self, params):
+        """
+        The XML response to a ListRecords request.
+        """
+
+        if "resumptionToken" in params:
+            setSpec, from_, offset = params["resumptionToken"].split("|")
+            offset = int(offset)
+        else:
+            setSpec = params.get("set", "")
+            from_ = params.get("from", "")
+            offset = 0
+
+        # Datestamps are all in the same format, so they compare as strings
+        records = [
+            (identifier, datestamp)
+            for identifier, datestamp in self.records
+            if datestamp >= from_
+        ]
+
+        if not records:
+            body = '  <error code="noRecordsMatch">No records match</error>'
+        else:
+            page = records[offset : offset + self.pageSize]
+            end = offset + len(page)
+
+            token = f"{setSpec}|{from_}|{end}" if end < len(records) else ""
+
+            body = "\n".join(
+                ["  <ListRecords>"]
+                + [
+                    RECORD.format(
+                        identifier=identifier, datestamp=datestamp, setSpec=setSpec
+                    )
+                    for identifier, datestamp in page
+                ]
+                + [
+                    f'    <resumptionToken completeListSize="{len(records)}" '
+                    f'cursor="{offset}">{token}</resumptionToken>',
+                    "  </ListRecords>",
+                ]
+            )
+
+        return RESPONSE.format(responseDate=self.responseDate, url=self.url, body=body)
+
+    def __enter__(self):
+
+        self.thread = threading.Thread(
+            target=self.server.serve_forever,
+            kwargs={"poll_interval": 0.01},
+            daemon=True,
+        )
+        self.thread.start()
+
+        return self
+
+    def __exit__(self, *args):
+
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
@@ -0,0 +1,202 @@
+import io
+import glob
+import datetime
+
+import pytest
+
+from a2aParser import Remarks, iterA2A, iterRecords, parseRecord, parseRemarkText
+
+NOTARIAL = "data/a2a/SAA-ID-001_SAA_Index_op_notarieel_archief/000000001.xml"
+MARRIAGES = "data/a2a/SAA-ID-003_SAA_Index_op_ondertrouwregisters/000000001.xml"
+
+DELETED = b"""<?xml version="1.0" encoding="UTF-8"?>
+<OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/">
+  <ListRecords>
+    <record>
+      <header status="deleted">
+        <identifier>deleted-record</identifier>
+        <datestamp>2022-01-01T00:00:00Z</datestamp>
+      </header>
+    </record>
+    <record>
+      <header>
+        <identifier>record</identifier>
+        <datestamp>2022-01-02T00:00:00Z</datestamp>
+      </header>
+      <metadata>
+        <a2a:A2A xmlns:a2a="http://Mindbus.nl/A2A" Version="1.7">
+          <a2a:Source>
+            <a2a:SourceDate><a2a:Year>1650</a2a:Year><a2a:Month>2</a2a:Month></a2a:SourceDate>
+            <a2a:RecordGUID>{guid}</a2a:RecordGUID>
+          </a2a:Source>
+        </a2a:A2A>
+      </metadata>
+    </record>
+  </ListRecords>
+</OAI-PMH>
+"""
+
+
+def iterRemarks(remarks):
+    """
+    (key, value) of the remarks and the remarks nested in them.
+    """
+
+    for key, value in remarks.items():
+        yield key, value
+
+        if isinstance(value, Remarks):
+            yield from iterRemarks(value)
+
+
+def test_iterA2A_notarial(root):
+    documents = list(iterA2A(NOTARIAL))
+
+    assert len(documents) == 50
+
+    d = documents[0]
+    assert d.identifier == "9d6d21df-f717-666d-e053-b784100a1840"
+    assert d.datestamp == "2021-08-11T23:13:17Z"
+    assert not d.deleted
+
+    source = d.source
+    assert source.guid == "9d6d21df-f717-666d-e053-b784100a1840"
+    assert source.SourceType == "other: Notariële archieven"
+    assert source.SourcePlace.Place == "Amsterdam"
+    assert source.SourceDate.date == datetime.date(1740, 10, 22)
+    assert source.SourceReference.Archive == "5075"
+    assert source.SourceReference.Collection == "Deel: 11079, Periode: 1740"
+    assert source.SourceReference.RegistryNumber == "11079"
+    assert source.SourceReference.Folio is None
+    assert [scan.OrderSequenceNumber for scan in source.scans] == ["1", "2", "3"]
+
+    assert source.Remarks["filename"] == [
+        "NOTD00964000143",
+        "NOTD00964000144",
+        "NOTD00964000145",
+    ]
+    assert source.Remarks["AkteSoort"] == ["Boedelscheiding"]
+    assert source.Remarks["Opmerking"] == {
+        "Notaris": "Mr.johannes Beukelaar",
+        "Locatieomschrijving": "Leuwen",
+        "Taal": "nederlands",
+    }
+    assert source.Remarks["Opmerking"]["Kerk"] is None
+    assert source.Remarks["Opmerking"].text.startswith("Notaris: ")
+
+    person = d.persons[0]
+    assert person.id == "Person:ead2060c-54d8-49b8-1ab6-261dad856ee8"
+    assert person.PersonName.PersonNameFirstName == "Maria"
+    assert person.PersonName.PersonNamePrefixLastName == "den"
+    assert person.PersonName.PersonNameLastName == "Hartoog"
+    assert person.Gender == "Onbekend"
+    assert person.Remarks["diversen"]["Positie op scan"] == {
+        "scan": "NOTD00964000145",
+        "positie": "1178, 1924, 139, 35",
+    }
+
+    assert [e.EventType for e in d.events] == ["other: Boedelscheiding"]
+    assert d.events[0].EventDate.date == datetime.date(1740, 10, 22)
+
+    assert len(d.persons) == len(d.relations) == 14
+    for person, relation in zip(d.persons, d.relations):
+        assert relation.RelationType == "Geregistreerde"
+        assert relation.person is person
+        assert relation.event is d.events[0]
+        assert person.relations == [relation]
+
+
+def test_iterA2A_marriages(root):
+    remarks = {
+        d.identifier: p.Remarks["diversen"]
+        for d in iterA2A(MARRIAGES)
+        for p in d.persons
+        if p.Remarks["diversen"]
+    }
+
+    assert remarks["8d653f92-20d6-42ed-ab00-a59d70fb7e7e"] == {
+        "Eerdere vrouw": "Santen, Hendrickje [van]",
+        "Naamsvariant": "Meijert, Gerrit",
+    }
+
+
+def test_iterA2A_remarks(root):
+    """
+    Only the values that pya2a split are nested, all others are text or a
+    list of texts.
+    """
+
+    for xmlfile in sorted(glob.glob("data/a2a/*/*.xml")):
+        for d in iterA2A(xmlfile):
+            for remarks in [d.source.Remarks] + [p.Remarks for p in d.persons]:
+                for key, value in iterRemarks(remarks):
+                    if key == "Positie op scan":
+                        assert set(value) == {"scan", "positie"}
+                    elif isinstance(value, list):
+                        assert all(isinstance(v, str) for v in value)
+                    else:
+                        assert isinstance(value, (str, Remarks)), (key, value)
+
+                        if isinstance(value, Remarks):
+                            assert key in ("Opmerking", "diversen")
+
+
+def test_iterA2A_deleted():
+    documents = list(iterA2A(io.BytesIO(DELETED)))
+
+    assert [d.identifier for d in documents] == ["record"]
+    assert documents[0].source.guid == "guid"
+    assert documents[0].source.SourceDate.date == "1650-02"
+    assert documents[0].source.Remarks["filename"] is None
+
+    documents = list(iterA2A(io.BytesIO(DELETED), deleted=True))
+
+    assert [(d.identifier, d.deleted) for d in documents] == [
+        ("deleted-record", True),
+        ("record", False),
+    ]
+    assert documents[0].source is None
+
+
+def test_parseRecord(root):
+    """
+    parseRecord gives the same documents as iterA2A.
+    """
+
+    documents = [
+        repr(parseRecord(element)) for identifier, element in iterRecords(NOTARIAL)
+    ]
+
+    # Persons and relations refer to each other, which only repr handles
+    assert documents == [repr(d) for d in iterA2A(NOTARIAL)]
+
+
+@pytest.mark.parametrize(
+    "text,expected",
+    [
+        (
+            "Positie op scan: scan: NOTD00964000145; positie: 1178, 1924, 139, 35",
+            {
+                "Positie op scan": {
+                    "scan": "NOTD00964000145",
+                    "positie": "1178, 1924, 139, 35",
+                }
+            },
+        ),
+        (
+            "Relatie informatie: Zoon van: Jan; Moeder: Grietje",
+            {"Relatie informatie": "Zoon van: Jan; Moeder: Grietje"},
+        ),
+        (
+            "Overige namen: Cuijpers, Abigael\nOverige namen: Pieters, Jan",
+            {"Overige namen": ["Cuijpers, Abigael", "Pieters, Jan"]},
+        ),
+        ("Positie op scan: NOTD00964000145", {"Positie op scan": "NOTD00964000145"}),
+        ("https://archief.amsterdam/archief/5075/11079", {}),
+    ],
+)
+def test_parseRemarkText(text, expected):
+    remarks = parseRemarkText(text)
+
+    assert remarks == expected
+    assert remarks.text == text
@@ -0,0 +1,93 @@
+import sqlite3
+import itertools
+
+from rdflib import URIRef
+
+from concordance import Concordance, writeConcordance, addConcordance
+
+# The slices of three EAD files (see main.convertEADFile), in the order of
+# the list of EAD files. The second and third file disagree with the first.
+SLICES = [
+    (
+        {
+            "5001": {
+                "1": "https://example.org/book/a1",
+                "2": "https://example.org/book/a2",
+            }
+        },
+        {"5001": {"1": "https://example.org/physical/a1"}},
+        {"5001": "https://example.org/collection/a"},
+    ),
+    (
+        {"5001": {"2": "https://example.org/book/b2"}},
+        {"5001": {"1": "https://example.org/physical/b1"}},
+        {"5001": None},
+    ),
+    (
+        {
+            "5001": {"2": "https://example.org/book/c2"},
+            "5002": {"1": "https://example.org/book/c1"},
+        },
+        {},
+        {"5002": "https://example.org/collection/c"},
+    ),
+]
+
+
+def dump(path):
+    connection = sqlite3.connect(path)
+    rows = {
+        table: sorted(connection.execute(f"SELECT * FROM {table}"))
+        for table in ("book", "physicalBook", "physicalCollection")
+    }
+    connection.close()
+
+    return rows
+
+
+def test_addConcordance_order(tmp_path):
+    """
+    The EAD files finish in any order, the database is the same.
+    """
+
+    dumps = []
+    for n, order in enumerate(itertools.permutations(range(len(SLICES)))):
+        path = str(tmp_path / f"concordance_{n}.sqlite")
+
+        writeConcordance(path, {}, {}, {})
+        for rank in order:
+            addConcordance(path, *SLICES[rank], rank=rank)
+
+        dumps.append(dump(path))
+
+    assert all(rows == dumps[0] for rows in dumps)
+
+
+def test_addConcordance_last_wins(tmp_path):
+    """
+    As if the EAD files had been converted one by one.
+    """
+
+    path = str(tmp_path / "concordance.sqlite")
+
+    writeConcordance(path, {}, {}, {})
+    for rank in reversed(range(len(SLICES))):
+        addConcordance(path, *SLICES[rank], rank=rank)
+
+    concordance = Concordance(path)
+
+    assert concordance.getBook("5001", "1") == URIRef("https://example.org/book/a1")
+    assert concordance.getBook("5001", "2") == URIRef("https://example.org/book/c2")
+    assert concordance.getBook("5002", "1") == URIRef("https://example.org/book/c1")
+    assert concordance.getBook("5002", "2", "default") == "default"
+
+    assert concordance.getPhysicalBook("5001", "1") == URIRef(
+        "https://example.org/physical/b1"
+    )
+
+    assert concordance.getPhysicalCollection("5001") is None
+    assert concordance.getPhysicalCollection("5002") == URIRef(
+        "https://example.org/collection/c"
+    )
+
+    concordance.close()
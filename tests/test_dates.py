@@ -0,0 +1,249 @@
+import glob
+from datetime import date, datetime, timedelta
+
+import pytest
+from dateutil import parser
+from lxml import etree
+from rdflib import Literal, XSD
+
+from dates import parseISODate, dateLiteral
+from eadParser import parseDate
+
+DEFAULTS = [datetime(2100, 1, 1), datetime(2100, 12, 31), datetime(2100, 6, 30)]
+
+EDGECASES = [
+    "1650",
+    "1650-02",
+    "1652-02",  # leap year
+    "1700-02",  # no leap year
+    "1600-02",  # leap year
+    "1650-2",
+    "1650-2-3",
+    "1650-02-13",
+    "1650-12-31",
+    "1650-04",  # 30 days
+    "1650-04-31",  # does not exist
+    "1650-13",
+    "1650-00",
+    "0950",
+    "1650-02-13T12:00",
+    "13 februari 1650",
+]
+
+
+def getNormals():
+    """
+    All distinct unitdate/@normal values in the EADs in data/ead.
+    """
+
+    normals = set()
+
+    for xmlfile in glob.glob("data/ead/*.xml"):
+        for _, element in etree.iterparse(xmlfile, tag="{*}unitdate"):
+            if normal := element.get("normal"):
+                normals.add(normal)
+
+            element.clear()
+
+    return sorted(normals)
+
+
+def parseDateutil(
+    date,
+    circa=None,
+    default=None,
+    defaultBegin=datetime(2100, 1, 1),
+    defaultEnd=datetime(2100, 12, 31),
+):
+    """
+    eadParser.parseDate as it was, with dateutil and plain dates.
+    """
+
+    if date is None or date == "s.d.":
+        return {}
+
+    date = date.strip()
+
+    if "/" in date:
+        begin, end = date.split("/")
+
+        begin = parseDateutil(begin, default=defaultBegin)
+        end = parseDateutil(end, default=defaultEnd)
+    elif date.count("-") == 1:
+        begin, end = date.split("-")
+
+        begin = parseDateutil(begin, default=defaultBegin)
+        end = parseDateutil(end, default=defaultEnd)
+    elif "ca." in date:
+        date, _ = date.split("ca.")
+
+        begin = parseDateutil(date, default=defaultBegin, circa=365)
+        end = parseDateutil(date, default=defaultEnd, circa=365)
+
+    else:  # exact date ?
+
+        if circa:
+            begin = parser.parse(date, default=defaultBegin) - timedelta(circa)
+            end = parser.parse(date, default=defaultEnd) + timedelta(circa)
+        elif len(date) == 4:  # year only
+            begin = (datetime(int(date), 1, 1), None)
+            end = (None, datetime(int(date), 12, 31))
+        else:
+            begin = parser.parse(date, default=defaultBegin)
+            end = parser.parse(date, default=defaultEnd)
+
+    if begin == end:
+        timeStamp = begin
+    else:
+        timeStamp = None
+
+    if type(begin) == tuple:
+        earliestBeginTimeStamp = begin[0].date() if begin[0] else None
+        latestBeginTimeStamp = begin[1].date() if begin[1] else None
+        beginTimeStamp = None
+        timeStamp = None
+    else:
+        earliestBeginTimeStamp = begin.date()
+        latestBeginTimeStamp = begin.date()
+        beginTimeStamp = begin.date()
+
+    if type(end) == tuple:
+        earliestEndTimeStamp = end[0].date() if end[0] else None
+        latestEndTimeStamp = end[1].date() if end[1] else None
+        endTimeStamp = None
+    else:
+        earliestEndTimeStamp = end.date()
+        latestEndTimeStamp = end.date()
+        endTimeStamp = end.date()
+
+    if default:
+        if type(begin) == tuple:
+            begin = min([i for i in begin if i])
+        if type(end) == tuple:
+            end = max([i for i in end if i])
+        return begin, end
+
+    temporal = f"{earliestBeginTimeStamp or '..'}/{latestEndTimeStamp or '..'}"
+
+    return {
+        "temporal": temporal,
+        "hasTimeStamp": timeStamp,
+        "hasBeginTimeStamp": beginTimeStamp,
+        "hasEarliestBeginTimeStamp": earliestBeginTimeStamp,
+        "hasLatestBeginTimeStamp": latestBeginTimeStamp,
+        "hasEndTimeStamp": endTimeStamp,
+        "hasEarliestEndTimeStamp": earliestEndTimeStamp,
+        "hasLatestEndTimeStamp": latestEndTimeStamp,
+    }
+
+
+def asLiterals(dt):
+    """
+    The timestamps as the model classes turn them into literals.
+    """
+
+    return {
+        key: value if key == "temporal" or value is None else Literal(value)
+        for key, value in dt.items()
+    }
+
+
+def test_parseDate_ead(root):
+    normals = getNormals()
+
+    assert len(normals) > 1000
+
+    for normal in normals:
+        assert parseDate(normal) == asLiterals(parseDateutil(normal)), normal
+
+
+@pytest.mark.parametrize(
+    "normal",
+    EDGECASES[:10]
+    + ["1650/1660", "1650-02/1651", "1650-1660", "1650ca.", " 1650 ", "s.d.", None],
+)
+def test_parseDate_edgecases(normal):
+    assert parseDate(normal) == asLiterals(parseDateutil(normal))
+
+
+@pytest.mark.parametrize("date", EDGECASES)
+@pytest.mark.parametrize("default", DEFAULTS)
+def test_parseISODate(date, default):
+    try:
+        expected = parser.parse(date, default=default)
+    except ValueError as e:
+        with pytest.raises(type(e)):
+            parseISODate(date, default)
+    else:
+        assert parseISODate(date, default) == expected
+
+
+def test_parseISODate_default_type():
+    """
+    The result has the type of the default, whichever came first.
+    """
+
+    parseISODate.cache_clear()
+
+    assert type(parseISODate("1650", datetime(2100, 1, 1))) == datetime
+    assert type(parseISODate("1650", date(2100, 1, 1))) == date
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("1650", Literal("1650", datatype=XSD.gYear)),
+        ("1650-02", Literal("1650-02", datatype=XSD.gYearMonth)),
+        ("1650-02-13", Literal("1650-02-13", datatype=XSD.date)),
+        (date(1650, 2, 13), Literal("1650-02-13", datatype=XSD.date)),
+        (datetime(1650, 2, 13), Literal("1650-02-13T00:00:00", datatype=XSD.dateTime)),
+        (None, None),
+        ("", None),
+    ],
+)
+def test_dateLiteral(value, expected):
+    assert dateLiteral(value) == expected
+
+
+@pytest.mark.parametrize(
+    "first,second",
+    [
+        (date(1650, 1, 1), datetime(1650, 1, 1)),
+        (datetime(1650, 1, 1), date(1650, 1, 1)),
+    ],
+)
+def test_dateLiteral_cache(first, second):
+    """
+    A date and a datetime on the same day get their own literal, in either
+    order.
+    """
+
+    dateLiteral.cache_clear()
+
+    for value in (first, second, first, second):
+        literal = dateLiteral(value)
+
+        if type(value) == datetime:
+            assert literal.datatype == XSD.dateTime
+        else:
+            assert literal.datatype == XSD.date
+
+    assert dateLiteral.cache_info().hits == 2
+
+
+def test_parseDate_readonly():
+    """
+    The cached result is shared by every caller, so it cannot be changed.
+    """
+
+    dt = parseDate("1650-02-13")
+    expected = dict(dt)
+
+    with pytest.raises(TypeError):
+        dt["hasTimeStamp"] = None
+
+    assert parseDate("1650-02-13") == expected
+    assert expected["hasTimeStamp"] is not None
+
+    with pytest.raises(TypeError):
+        parseDate(None)["temporal"] = "../.."
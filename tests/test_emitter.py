@@ -0,0 +1,68 @@
+import os
+import glob
+
+import pytest
+
+pytest.importorskip("rdfalchemy")
+
+from rdflib import Graph
+from rdflib.compare import isomorphic
+
+import main
+from conftest import ROOT, DATA, deskolemize, linkData, readTriples
+from concordance import writeConcordance, addConcordance
+
+# Written by tests/makegolden.py, with the converter before emitter.py
+GOLDEN = os.path.join(ROOT, "tests", "golden")
+
+SETS = sorted(os.listdir(os.path.join(DATA, "a2a")))
+
+
+@pytest.fixture
+def concordance(tmp_path, monkeypatch):
+    """
+    Concordance database of the fixture EADs, in a run folder with the
+    fixture data.
+    """
+
+    linkData(tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    path = str(tmp_path / "concordance.sqlite")
+    writeConcordance(path, {}, {}, {})
+
+    for rank, xmlfile in enumerate(sorted(glob.glob("data/ead/*.xml"))):
+        *_, slices = main.convertEADFile(xmlfile, splitFile=False)
+        addConcordance(path, *slices, rank=rank)
+
+    return path
+
+
+@pytest.mark.parametrize("name", SETS)
+def test_convertA2A_golden(name, concordance, tmp_path):
+    """
+    The records and terms of a page are the same as those of the converter
+    before emitter.py.
+    """
+
+    golden = os.path.join(GOLDEN, name)
+    if not os.path.exists(golden + ".trig"):
+        pytest.skip("No golden files, run tests/makegolden.py")
+
+    path = str(tmp_path / f"{name}.trig")
+    ontology, thesaurus, stats, nRecords = main.convertA2A(
+        [f"data/a2a/{name}/000000001.xml"],
+        path,
+        main.a2a.term(main.name2index[name]),
+        "Index collection: " + main.index2nicename[main.name2index[name]],
+        gz=False,
+        concordance=concordance,
+    )
+
+    assert nRecords == 10
+    assert isomorphic(readTriples([path]), readTriples([golden + ".trig"]))
+
+    terms = Graph()
+    terms.parse(golden + ".terms.nt", format="nt")
+
+    assert isomorphic(deskolemize(ontology | thesaurus), deskolemize(terms))
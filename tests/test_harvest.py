@@ -0,0 +1,155 @@
+import os
+import sys
+import json
+import importlib.util
+
+import pytest
+import requests
+
+from conftest import ROOT
+from oaistub import OAIStub
+from a2aParser import iterHeaders
+
+# The harvester is a script in the data folder, not a module
+spec = importlib.util.spec_from_file_location(
+    "harvester", os.path.join(ROOT, "data", "a2a", "a2a.py")
+)
+harvester = importlib.util.module_from_spec(spec)
+
+# Keep the data folder clean: no __pycache__ next to the harvested sets
+dont_write_bytecode = sys.dont_write_bytecode
+sys.dont_write_bytecode = True
+try:
+    spec.loader.exec_module(harvester)
+finally:
+    sys.dont_write_bytecode = dont_write_bytecode
+
+RECORDS = [
+    ("record-1", "2022-01-01T00:00:00Z"),
+    ("record-2", "2022-01-02T00:00:00Z"),
+    ("record-3", "2022-01-03T00:00:00Z"),
+    ("record-4", "2022-01-04T00:00:00Z"),
+    ("record-5", "2022-01-05T00:00:00Z"),
+]
+
+
+def getPages(folder):
+    return sorted(f for f in os.listdir(folder) if f.endswith(".xml"))
+
+
+def getRecords(folder):
+    return [
+        (identifier, datestamp)
+        for page in getPages(folder)
+        for identifier, datestamp, deleted in iterHeaders(os.path.join(folder, page))
+    ]
+
+
+def getState(folder):
+    with open(os.path.join(folder, harvester.STATEFILE)) as infile:
+        return json.load(infile)
+
+
+def test_harvestSet(tmp_path):
+    folder = str(tmp_path / "set")
+
+    with OAIStub(RECORDS) as server:
+        assert harvester.harvestSet(server.url, "set", folder) == 3
+
+        # Nothing to do the second time
+        assert harvester.harvestSet(server.url, "set", folder) == 0
+        assert len(server.requests) == 3
+
+    assert getPages(folder) == ["000000001.xml", "000000002.xml", "000000003.xml"]
+    assert getRecords(folder) == RECORDS
+
+    state = getState(folder)
+    assert state["complete"]
+    assert state["page"] == 3
+    assert state["resumptionToken"] is None
+    assert state["responseDate"] == "2024-01-01T00:00:00Z"
+
+
+def test_harvestSet_resume(tmp_path):
+    """
+    A harvest that is interrupted after the first page continues with the
+    second page, without repeating the first one.
+    """
+
+    folder = str(tmp_path / "set")
+
+    with OAIStub(RECORDS) as server:
+        server.failures.add(2)
+
+        with pytest.raises(requests.HTTPError):
+            harvester.harvestSet(server.url, "set", folder)
+
+        assert getPages(folder) == ["000000001.xml"]
+
+        state = getState(folder)
+        assert not state["complete"]
+        assert state["page"] == 1
+        assert state["resumptionToken"] == "set||2"
+
+        assert harvester.harvestSet(server.url, "set", folder) == 2
+
+        assert server.requests[2] == {
+            "verb": "ListRecords",
+            "resumptionToken": "set||2",
+        }
+
+    assert getRecords(folder) == RECORDS
+
+    state = getState(folder)
+    assert state["complete"]
+    assert state["page"] == 3
+    assert state["responseDate"] == "2024-01-01T00:00:00Z"
+
+
+def test_harvestSet_incremental(tmp_path):
+    folder = str(tmp_path / "set")
+
+    with OAIStub(RECORDS) as server:
+        harvester.harvestSet(server.url, "set", folder)
+
+    # Nothing changed since the first harvest
+    with OAIStub(RECORDS, responseDate="2024-02-01T00:00:00Z") as server:
+        assert harvester.harvestSet(server.url, "set", folder, incremental=True) == 0
+
+        assert server.requests == [
+            {
+                "verb": "ListRecords",
+                "metadataPrefix": "oai_a2a",
+                "set": "set",
+                "from": "2024-01-01T00:00:00Z",
+            }
+        ]
+
+    state = getState(folder)
+    assert state["complete"]
+    assert state["page"] == 3
+    assert state["responseDate"] == "2024-01-01T00:00:00Z"
+
+    # One record changed, its new version is appended as a new page
+    changed = RECORDS + [("record-2", "2024-02-15T00:00:00Z")]
+    with OAIStub(changed, responseDate="2024-03-01T00:00:00Z") as server:
+        assert harvester.harvestSet(server.url, "set", folder, incremental=True) == 1
+
+    assert getPages(folder)[-1] == "000000004.xml"
+    assert getRecords(folder) == changed
+
+    state = getState(folder)
+    assert state["page"] == 4
+    assert state["from"] == "2024-01-01T00:00:00Z"
+    assert state["responseDate"] == "2024-03-01T00:00:00Z"
+
+
+def test_main(tmp_path):
+    sets = [("set-1", "SET-1"), ("set-2", "SET-2")]
+
+    with OAIStub(RECORDS, pageSize=5) as server:
+        harvester.main(server.url, sets=sets, folder=str(tmp_path), threads=2)
+
+    for setSpec, name in sets:
+        assert getPages(str(tmp_path / name)) == ["000000001.xml"]
+        assert getState(str(tmp_path / name))["setSpec"] == setSpec
@@ -0,0 +1,195 @@
+import os
+import gzip
+
+import pytest
+
+pytest.importorskip("rdfalchemy")
+
+from rdflib import Dataset, Literal, Namespace, RDF, URIRef, XSD
+
+from incremental import (
+    RecordState,
+    scanRecords,
+    getSkips,
+    compareRecords,
+    getTombstoneTriples,
+    writeTombstones,
+)
+from model import AS, deed
+from scheduling import Chunk, planChunks, chunkFingerprint
+
+a2a = Namespace("https://data.goldenagents.org/datasets/saa/a2a/")
+
+PAGE = """<?xml version="1.0" encoding="UTF-8"?>
+<OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/">
+  <ListRecords>
+{}
+  </ListRecords>
+</OAI-PMH>
+"""
+
+RECORD = """    <record>
+      <header>
+        <identifier>{0}</identifier>
+        <datestamp>{1}</datestamp>
+      </header>
+      <metadata>
+        <a2a:A2A xmlns:a2a="http://Mindbus.nl/A2A">
+          <a2a:Source><a2a:RecordGUID>{{{0}}}</a2a:RecordGUID></a2a:Source>
+        </a2a:A2A>
+      </metadata>
+    </record>"""
+
+DELETED = """    <record>
+      <header status="deleted">
+        <identifier>{0}</identifier>
+        <datestamp>{1}</datestamp>
+      </header>
+    </record>"""
+
+D1 = "2022-01-01T00:00:00Z"
+D2 = "2023-01-01T00:00:00Z"
+
+# The pages of the first harvest
+HARVEST1 = [
+    [RECORD.format("r0", D1), RECORD.format("r1", D1)],
+    [RECORD.format("r2", D1), RECORD.format("r3", D1)],
+    [RECORD.format("r4", D1)],
+]
+
+# The second harvest appends a page: r2 changed, r4 deleted and r5 is new
+HARVEST2 = HARVEST1 + [
+    [RECORD.format("r2", D2), DELETED.format("r4", D2), RECORD.format("r5", D2)]
+]
+
+
+def writePages(folder, pages):
+    """
+    Write the pages of a harvest, like data/a2a/a2a.py does.
+    """
+
+    folder.mkdir(exist_ok=True)
+
+    filenames = []
+    for n, records in enumerate(pages, 1):
+        filename = folder / f"{str(n).zfill(9)}.xml"
+        filename.write_text(PAGE.format("\n".join(records)))
+        filenames.append(str(filename))
+
+    return filenames
+
+
+def plan(filenames):
+    """
+    The shards of an incremental run as main.main plans them: one page per
+    shard, with the records to skip.
+    """
+
+    chunks = [fns for fns, weight in planChunks(filenames, 1, chunkBy="files")]
+    latest = scanRecords(filenames)
+    skips = getSkips(chunks, latest)
+
+    shards = [
+        Chunk(
+            fns,
+            f"trig/index_{str(n).zfill(4)}.trig",
+            a2a,
+            "index",
+            False,
+            True,
+            "concordance.sqlite",
+            skip,
+            None,
+            None,
+            0,
+            False,
+            False,
+        )
+        for n, (fns, skip) in enumerate(zip(chunks, skips), 1)
+    ]
+
+    current = {
+        identifier: (datestamp, shards[filenames.index(filename)].path, deleted)
+        for identifier, (datestamp, filename, deleted) in latest.items()
+    }
+
+    return shards, current
+
+
+def test_incremental(tmp_path):
+    folder = tmp_path / "index"
+
+    # First run
+    shards1, current1 = plan(writePages(folder, HARVEST1))
+
+    assert [shard.skip for shard in shards1] == [(), (), ()]
+
+    state = RecordState(str(tmp_path / "records.sqlite"))
+    assert compareRecords(state.get("index"), current1) == {"new": 5}
+    state.update("index", current1)
+
+    # Second run, after the new page was harvested
+    filenames = writePages(folder, HARVEST2)
+    shards2, current2 = plan(filenames)
+
+    latest = scanRecords(filenames)
+    assert latest["r2"] == (D2, filenames[3], False)
+    assert latest["r4"] == (D2, filenames[3], True)
+    assert latest["r0"] == (D1, filenames[0], False)
+
+    # The old version of r2 and every version of r4 are skipped
+    assert [shard.skip for shard in shards2] == [(), ("r2",), ("r4",), ("r4",)]
+
+    assert compareRecords(state.get("index"), current2) == {
+        "new": 1,
+        "changed": 1,
+        "deleted": 1,
+        "unchanged": 3,
+    }
+
+    # Only the shards with a superseded or deleted record are converted again,
+    # and the new page gets a new shard
+    before = {shard.path: chunkFingerprint(shard, "ead") for shard in shards1}
+    after = {shard.path: chunkFingerprint(shard, "ead") for shard in shards2}
+
+    assert [path for path in after if after[path] != before.get(path)] == [
+        "trig/index_0002.trig",
+        "trig/index_0003.trig",
+        "trig/index_0004.trig",
+    ]
+
+    state.update("index", current2)
+    assert state.get("index") == current2
+    state.close()
+
+    # Tombstones for the deleted records
+    deleted = {
+        identifier: datestamp
+        for identifier, (datestamp, filename, isDeleted) in latest.items()
+        if isDeleted
+    }
+    assert deleted == {"r4": D2}
+
+    path = writeTombstones(str(tmp_path / "index_tombstones.trig"), deleted, a2a)
+    assert path == str(tmp_path / "index_tombstones.trig.gz")
+
+    ds = Dataset()
+    with gzip.open(path, "rt", encoding="utf-8") as infile:
+        ds.parse(data=infile.read(), format="trig")
+
+    # The parser normalizes the datestamp
+    assert set(ds.graph(URIRef(a2a))) == {
+        (deed.term("r4"), RDF.type, AS.Tombstone),
+        (deed.term("r4"), AS.deleted, Literal(D2, datatype=XSD.dateTime)),
+    }
+
+    # The writer keeps it as it was harvested
+    with gzip.open(path, "rt", encoding="utf-8") as infile:
+        data = infile.read()
+
+    for s, p, o in getTombstoneTriples(deleted):
+        assert f"{s.n3()} {p.n3()} {o.n3()} ." in data
+
+    # Harvested again: the tombstones of the earlier run are removed
+    assert writeTombstones(str(tmp_path / "index_tombstones.trig"), {}, a2a) is None
+    assert not os.path.exists(path)
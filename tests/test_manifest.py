@@ -0,0 +1,60 @@
+import os
+import json
+
+from manifest import RunManifest
+
+
+def test_RunManifest(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    output = tmp_path / "a.trig.gz"
+    output.write_text("")
+
+    manifest = RunManifest(path)
+    manifest.markDone("a", "fp", ["a.xml"], [str(output)], records=3)
+    manifest.markDone("b", "fp", ["b.xml"], [str(tmp_path / "b.trig.gz")])
+
+    # Only logged
+    assert not os.path.exists(path)
+    with open(path + ".log") as infile:
+        assert len(infile.readlines()) == 2
+
+    assert manifest.isDone("a", "fp")
+    assert not manifest.isDone("a", "other fp")
+    assert not manifest.isDone("b", "fp")  # no output
+    assert manifest.get("a")["records"] == 3
+
+    manifest.save()
+
+    assert not os.path.exists(path + ".log")
+    with open(path) as infile:
+        assert set(json.load(infile)) == {"a", "b"}
+
+    assert RunManifest(path).steps == manifest.steps
+
+
+def test_RunManifest_interrupted(tmp_path):
+    """
+    The steps of an interrupted run are read back from the log, up to a last
+    line that was not finished.
+    """
+
+    path = str(tmp_path / "manifest.json")
+
+    manifest = RunManifest(path)
+    manifest.markDone("a", "fp", [], [])
+    manifest.save()
+
+    manifest.markDone("b", "fp", [], [])
+    manifest.log.write('["c", {"status": "do')
+    manifest.log.close()
+
+    resumed = RunManifest(path)
+
+    assert set(resumed.steps) == {"a", "b"}
+    assert resumed.isDone("b", "fp")
+
+    # Compacted, so that the next steps are not appended to a broken line
+    assert not os.path.exists(path + ".log")
+
+    resumed.markDone("c", "fp", [], [])
+    assert set(RunManifest(path).steps) == {"a", "b", "c"}
@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+from pagestore import ARCHIVE, INDEX, SEP, listPages, openPage, pageSize, packFolder
+
+PAGES = {
+    f"{str(n).zfill(9)}.xml": f"<page>{n}</page>\n".encode() * n for n in (1, 2, 3)
+}
+
+
+def writePages(folder, pages):
+    folder.mkdir(exist_ok=True)
+
+    for name, data in pages.items():
+        (folder / name).write_bytes(data)
+
+
+def read(page):
+    with openPage(page) as infile:
+        return infile.read()
+
+
+def test_packFolder(tmp_path):
+    folder = tmp_path / "set"
+    writePages(folder, PAGES)
+
+    assert packFolder(str(folder), remove=True) == 3
+    assert sorted(os.listdir(folder)) == sorted([ARCHIVE, INDEX])
+
+    archive = os.path.join(folder, ARCHIVE)
+    pages = listPages(str(folder))
+
+    assert pages == [archive + SEP + name for name in sorted(PAGES)]
+
+    for page, name in zip(pages, sorted(PAGES)):
+        assert read(page) == PAGES[name]
+        assert pageSize(page) == len(PAGES[name])
+
+    # Nothing new
+    assert packFolder(str(folder)) == 0
+
+
+def test_packFolder_append(tmp_path):
+    """
+    Pages that were harvested after packing are appended. Until then, they
+    are listed as loose files.
+    """
+
+    folder = tmp_path / "set"
+    writePages(folder, PAGES)
+    packFolder(str(folder), remove=True)
+
+    writePages(folder, {"000000004.xml": b"<page>4</page>\n"})
+
+    pages = listPages(str(folder))
+    assert pages[-1] == os.path.join(folder, "000000004.xml")
+    assert read(pages[-1]) == b"<page>4</page>\n"
+
+    assert packFolder(str(folder)) == 1
+
+    # Packed and loose: read from the archive
+    pages = listPages(str(folder))
+    assert len(pages) == 4
+    assert all(SEP in page for page in pages)
+    assert read(pages[-1]) == b"<page>4</page>\n"
+    assert [read(page) for page in pages[:3]] == [PAGES[n] for n in sorted(PAGES)]
+
+
+def test_packFolder_interrupted(tmp_path):
+    """
+    Anything after the last indexed member, e.g. from an interrupted run, is
+    cut off before new pages are appended.
+    """
+
+    folder = tmp_path / "set"
+    writePages(folder, PAGES)
+    packFolder(str(folder), remove=True)
+
+    with open(folder / ARCHIVE, "ab") as outfile:
+        outfile.write(b"half a member")
+
+    writePages(folder, {"000000004.xml": b"<page>4</page>\n"})
+    packFolder(str(folder), remove=True)
+
+    assert [read(page) for page in listPages(str(folder))] == [
+        PAGES[n] for n in sorted(PAGES)
+    ] + [b"<page>4</page>\n"]
+
+
+def test_openPage_missing(tmp_path):
+    folder = tmp_path / "set"
+    writePages(folder, PAGES)
+    packFolder(str(folder))
+
+    with pytest.raises(KeyError):
+        openPage(os.path.join(folder, ARCHIVE) + SEP + "000000009.xml")
+
+    with pytest.raises(FileNotFoundError):
+        openPage(os.path.join(folder, "000000009.xml"))
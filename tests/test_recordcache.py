@@ -0,0 +1,106 @@
+import itertools
+
+import pytest
+
+import recordcache
+from recordcache import RecordCache
+
+RAW = [f"<record>{i}</record>".encode() for i in range(3)]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    A clock that ticks once per call, so that the order of use is exact.
+    """
+
+    ticks = itertools.count(1)
+    monkeypatch.setattr(recordcache.time, "time", lambda: float(next(ticks)))
+
+
+def entry(i):
+    return ([f"row {i}"], [None], [], set(), {}, [], [])
+
+
+def getTotal(cache):
+    (total,) = cache.connection.execute("SELECT size FROM total").fetchone()
+    (size,) = cache.connection.execute(
+        "SELECT COALESCE(SUM(size), 0) FROM record"
+    ).fetchone()
+
+    assert total == size
+
+    return total
+
+
+def test_RecordCache(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+
+    cache = RecordCache(path, "v1")
+    key = cache.key(RAW[0])
+
+    assert cache.get(key) is None
+    cache.put(key, entry(0))
+    cache.close()
+
+    cache = RecordCache(path, "v1")
+    assert cache.get(cache.key(RAW[0])) == entry(0)
+
+    # A changed record is a miss
+    assert cache.get(cache.key(RAW[0] + b" ")) is None
+    cache.close()
+
+    # So is every record after a change to what the conversion depends on
+    cache = RecordCache(path, "v2")
+    assert cache.get(cache.key(RAW[0])) is None
+    cache.close()
+
+
+def test_RecordCache_batches(tmp_path):
+    cache = RecordCache(str(tmp_path / "cache.sqlite"), "v1", batchSize=2)
+
+    cache.put(cache.key(RAW[0]), entry(0))
+    assert getTotal(cache) == 0
+
+    cache.put(cache.key(RAW[1]), entry(1))
+    assert getTotal(cache) > 0
+
+    # Replacing an entry keeps the total right
+    cache.put(cache.key(RAW[1]), entry(10))
+    cache.flush()
+    getTotal(cache)
+
+    cache.close()
+
+
+def test_RecordCache_evict(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite")
+
+    cache = RecordCache(path, "v1")
+    for i, raw in enumerate(RAW):
+        cache.put(cache.key(raw), entry(i))
+    cache.close()
+
+    cache = RecordCache(path, "v1")
+    sizes = dict(cache.connection.execute("SELECT key, size FROM record"))
+    total = getTotal(cache)
+    cache.close()
+
+    # Room for two entries, after eviction
+    maxBytes = int((total - min(sizes.values()) // 2) / 0.9)
+
+    cache = RecordCache(path, "v1", maxBytes=maxBytes)
+
+    # The first record is used again, so the second is the least recent
+    assert cache.get(cache.key(RAW[0])) == entry(0)
+    cache.close()
+
+    cache = RecordCache(path, "v1", maxBytes=maxBytes)
+    assert cache.get(cache.key(RAW[0])) == entry(0)
+    assert cache.get(cache.key(RAW[1])) is None
+    assert cache.get(cache.key(RAW[2])) == entry(2)
+    assert getTotal(cache) <= 0.9 * maxBytes
+
+    # Nothing to evict
+    assert cache.evict() == 0
+    cache.close()
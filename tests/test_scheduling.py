@@ -0,0 +1,133 @@
+import pytest
+
+from scheduling import (
+    Chunk,
+    planChunks,
+    getArchives,
+    chunkFingerprint,
+    chunkOutputs,
+    getRequires,
+    runTasks,
+)
+
+PAGE = """<OAI-PMH><ListRecords>{}</ListRecords></OAI-PMH>"""
+RECORD = """<record><metadata><a2a:A2A xmlns:a2a="http://Mindbus.nl/A2A">
+<a2a:Source><a2a:SourceReference><a2a:Archive>{}</a2a:Archive>
+</a2a:SourceReference></a2a:Source></a2a:A2A></metadata></record>"""
+
+
+@pytest.fixture
+def pages(tmp_path):
+    """
+    Five pages with 1, 2, 3, 4 and 5 records of archive 5001 (and 5002 on
+    the last page).
+    """
+
+    filenames = []
+    for n in range(1, 6):
+        records = [RECORD.format("5001")] * n
+        if n == 5:
+            records[-1] = RECORD.format("5002")
+
+        filename = tmp_path / f"page_{n}.xml"
+        filename.write_text(PAGE.format("".join(records)))
+        filenames.append(str(filename))
+
+    return filenames
+
+
+def makeChunk(filenames, path="trig/test_0001.trig", temporal=False, spill=False):
+    return Chunk(
+        filenames,
+        path,
+        "https://example.org/index",
+        "Index collection: test",
+        temporal,
+        True,
+        "concordance.sqlite",
+        (),
+        None,
+        None,
+        0,
+        False,
+        spill,
+    )
+
+
+def test_planChunks_files(pages):
+    chunks = planChunks(pages, splitSize=2, chunkBy="files")
+
+    assert [fns for fns, weight in chunks] == [pages[:2], pages[2:4], pages[4:]]
+    assert [weight for fns, weight in chunks] == [2, 2, 1]
+
+
+def test_planChunks_records(pages):
+    chunks = planChunks(pages, recordsPerFile=6)
+
+    assert [fns for fns, weight in chunks] == [pages[:3], pages[3:]]
+    assert [weight for fns, weight in chunks] == [6, 9]
+
+
+def test_planChunks_unknown(pages):
+    with pytest.raises(ValueError):
+        planChunks(pages, chunkBy="pages")
+
+
+def test_getArchives(pages):
+    assert getArchives(pages[:2]) == {"5001"}
+    assert getArchives(pages) == {"5001", "5002"}
+
+
+def test_getRequires(pages):
+    chunk = makeChunk(pages)
+
+    assert getRequires(chunk, {}) == []
+    assert getRequires(
+        chunk, {"5002": ["5002.xml", "5002b.xml"], "1234": ["1234.xml"]}
+    ) == [("ead", "5002.xml"), ("ead", "5002b.xml")]
+
+
+def test_chunkFingerprint(pages):
+    chunk = makeChunk(pages)
+
+    assert chunkFingerprint(chunk, "ead") == chunkFingerprint(makeChunk(pages), "ead")
+    assert chunkFingerprint(chunk, "ead") != chunkFingerprint(chunk, "other ead")
+    assert chunkFingerprint(chunk, "ead") != chunkFingerprint(
+        chunk._replace(skip=("record",)), "ead"
+    )
+
+    # Only changes how fast the same shards are made
+    assert chunkFingerprint(chunk, "ead") == chunkFingerprint(
+        chunk._replace(recordCacheSize=1024), "ead"
+    )
+
+
+def test_chunkOutputs(pages):
+    assert chunkOutputs(makeChunk(pages)) == ["trig/test_0001.trig.gz"]
+    assert chunkOutputs(makeChunk(pages, temporal=[(1600, 1610)], spill=True)) == [
+        "trig/test_0001_1600-1610.trig.gz",
+        "trig/test_0001.trig.shared.nt.gz",
+    ]
+
+
+def square(n):
+    return n * n
+
+
+def test_runTasks():
+    tasks = [
+        ("c", square, (3,), ["a", "b"]),
+        ("a", square, (1,), []),
+        ("b", square, (2,), ["a"]),
+    ]
+
+    results = list(runTasks(tasks, processes=2, maxInFlight=1))
+
+    assert results == [("a", 1), ("b", 4), ("c", 9)]
+
+
+def test_runTasks_unknown():
+    tasks = [("a", square, (1,), []), ("b", square, (2,), ["unknown"])]
+
+    with pytest.raises(RuntimeError):
+        list(runTasks(tasks, processes=1))
@@ -0,0 +1,159 @@
+import os
+import glob
+import gzip
+import json
+
+import pytest
+from rdflib import Dataset, Namespace, URIRef
+from rdflib.compare import isomorphic
+
+from conftest import ROOT, DATA, linkData, readTriples
+from a2aParser import iterA2A
+from eadParser import getEADIdentifier
+from sharedshard import spillPath, writeSpill, mergeShared
+from writer import GraphWriter
+
+a2a = Namespace("https://data.goldenagents.org/datasets/saa/a2a/")
+ex = Namespace("https://example.org/")
+
+
+def test_mergeShared(tmp_path):
+    triples = [(ex.term(f"s{i}"), ex.p, ex.term(f"o{i}")) for i in range(100)]
+
+    # The chunks overlap, as the shared nodes of records do
+    spills = []
+    with GraphWriter(str(tmp_path / "serialize.trig"), a2a, gz=False) as writer:
+        for n, chunk in enumerate([triples[:60], triples[40:], triples[::2]]):
+            path = spillPath(str(tmp_path / f"chunk_{n}.trig"))
+            writeSpill(path, writer.serialize(chunk))
+            spills.append(path)
+
+    # The graph name is a Namespace, like a2a in main.py
+    path = str(tmp_path / "shared.trig")
+    assert mergeShared(spills, path, a2a, partitions=4) == 100
+
+    ds = Dataset()
+    with gzip.open(path + ".gz", "rt", encoding="utf-8") as infile:
+        ds.parse(data=infile.read(), format="trig")
+
+    assert set(ds.graph(URIRef(a2a))) == set(triples)
+    assert len(ds) == 100
+
+    # No partitions are left behind
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        [os.path.basename(spill) for spill in spills]
+        + ["serialize.trig", "shared.trig.gz"]
+    )
+
+
+def runMain(folder, monkeypatch, **kwargs):
+    """
+    Run main.main in its own folder, with the fixture data (see linkData).
+    """
+
+    import main
+
+    os.makedirs(folder / "trig")
+    linkData(folder)
+    monkeypatch.chdir(folder)
+
+    main.main(
+        concordance=str(folder / "concordance.sqlite"),
+        manifest=str(folder / "manifest.json"),
+        state=str(folder / "records.sqlite"),
+        recordCache=None,
+        processes=2,
+        **kwargs,
+    )
+
+    return sorted(
+        os.path.join(folder, "trig", f)
+        for f in os.listdir(folder / "trig")
+        if f.startswith("SAA-ID-") and f.endswith(".trig.gz")
+    )
+
+
+def test_fixture():
+    """
+    Every archive of the A2A pages in tests/data has its EAD there, so that
+    its physical collection is in the concordance.
+    """
+
+    archives = {
+        d.source.SourceReference.Archive
+        for page in glob.glob(os.path.join(DATA, "a2a", "*", "*.xml"))
+        for d in iterA2A(page)
+    }
+    eads = {
+        getEADIdentifier(xmlfile)
+        for xmlfile in glob.glob(os.path.join(DATA, "ead", "*.xml"))
+    }
+
+    assert archives == eads == {"5014", "5062"}
+
+    for path in ["uri2notary.json", "concordance/bg_mapping_index_guid.json"]:
+        assert os.path.exists(os.path.join(DATA, path))
+
+
+def test_main_sharedShard(tmp_path, monkeypatch):
+    """
+    The record shards and the shared shard together hold the same triples
+    as the record shards of a run without the shared shard.
+    """
+
+    pytest.importorskip("rdfalchemy")
+
+    plain = runMain(tmp_path / "plain", monkeypatch)
+    shards = runMain(tmp_path / "shared", monkeypatch, sharedShard="trig/shared.trig")
+
+    assert [os.path.basename(p) for p in plain] == [os.path.basename(p) for p in shards]
+
+    merged = str(tmp_path / "shared" / "trig" / "shared.trig.gz")
+    assert os.path.exists(merged)
+
+    withShared = readTriples(shards + [merged])
+    withoutShared = readTriples(plain)
+
+    assert len(readTriples(shards)) < len(withoutShared)
+    assert isomorphic(withShared, withoutShared)
+
+
+def test_jiw_shared(tmp_path, monkeypatch):
+    """
+    As test_main_sharedShard, for the Ja, ik wil records.
+    """
+
+    pytest.importorskip("rdfalchemy")
+
+    monkeypatch.chdir(ROOT)
+
+    try:
+        with open("data/jiw/jiw_ga.json") as infile:
+            data = json.load(infile)[:200]
+    except (OSError, ValueError):  # not fetched from git lfs
+        pytest.skip("No Ja, ik wil data")
+
+    if not os.path.exists("data/jiw/id2ecartico_places_groom.json"):
+        pytest.skip("No Ja, ik wil data")
+
+    import jiw
+
+    datafile = str(tmp_path / "jiw.json")
+    with open(datafile, "w") as outfile:
+        json.dump(data, outfile)
+
+    plain = str(tmp_path / "plain.trig")
+    shared = str(tmp_path / "shared.trig")
+
+    jiw.main(datafile, plain, splitSize=50, gz=False)
+    jiw.main(datafile, shared, splitSize=50, gz=False, shared=True)
+
+    chunks = [f"_{str(n).zfill(3)}.trig" for n in range(4)]
+
+    withShared = readTriples(
+        [shared.replace(".trig", chunk) for chunk in chunks]
+        + [str(tmp_path / "shared_shared.trig")]
+    )
+    withoutShared = readTriples([plain.replace(".trig", chunk) for chunk in chunks])
+
+    assert isomorphic(withShared, withoutShared)
@@ -0,0 +1,70 @@
+import pytest
+
+pytest.importorskip("rdfalchemy")
+
+from rdflib import RDFS
+
+import main
+from emitter import TripleEmitter
+from model import Place, DocumentType, rpp, thes
+
+
+def test_thesaurusTerm_registry():
+    """
+    A registered term is emitted once, and later chunks get a reference that
+    belongs to their own emitter.
+    """
+
+    registry = dict()
+
+    first = TripleEmitter()
+    place, name = main.thesaurusTerm("Amsterdam", Place, emit=first, registry=registry)
+
+    assert name == "Amsterdam"
+    assert place.resUri == thes.term("Amsterdam")
+    assert first.triples
+
+    # Only the URI and the label, not the Resource of the first chunk
+    assert registry == {("Amsterdam", Place, None): (place.resUri, "Amsterdam")}
+
+    second = TripleEmitter()
+    again, againName = main.thesaurusTerm(
+        "Amsterdam", Place, emit=second, registry=registry
+    )
+
+    assert (again.resUri, againName) == (place.resUri, name)
+    assert again.label == ["Amsterdam"]
+    assert again._emitter is second
+    assert second.triples == []
+
+
+def test_thesaurusTerm_registry_subClassOf():
+
+    registry = dict()
+
+    main.thesaurusTerm(
+        "Doop",
+        DocumentType,
+        subClassOf=rpp.Document,
+        emit=TripleEmitter(),
+        registry=registry,
+    )
+
+    emit = TripleEmitter()
+    term, name = main.thesaurusTerm(
+        "Doop", DocumentType, subClassOf=rpp.Document, emit=emit, registry=registry
+    )
+
+    assert term.subClassOf == rpp.Document
+    assert (term.resUri, RDFS.subClassOf, rpp.Document) not in emit.triples
+
+
+def test_thesaurusTerm_registry_empty():
+
+    registry = dict()
+
+    for emit in (TripleEmitter(), TripleEmitter()):
+        assert main.thesaurusTerm("?!", Place, emit=emit, registry=registry) == (
+            None,
+            "",
+        )
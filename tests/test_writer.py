@@ -0,0 +1,102 @@
+import gzip
+
+from rdflib import BNode, Dataset, Literal, Namespace, URIRef, RDF, XSD
+from rdflib.compare import isomorphic
+from rdflib.graph import Graph
+from rdflib.term import skolem_genid
+
+from writer import GraphWriter
+
+ga = Namespace("https://data.goldenagents.org/datasets/")
+a2a = Namespace("https://data.goldenagents.org/datasets/saa/a2a/")
+ex = Namespace("https://example.org/")
+
+TRIPLES = [
+    (ex.deed1, RDF.type, ex.IndexDocument),
+    (ex.deed1, ex.label, Literal('Akte "1"\nmet regel', lang="nl")),
+    (ex.deed1, ex.date, Literal("1650-02-03", datatype=XSD.date)),
+    (ex.deed1, ex.event, BNode("event1")),
+    (BNode("event1"), ex.label, Literal("Doop")),
+]
+
+
+def readGraph(path, format):
+
+    ds = Dataset()
+    with gzip.open(path, "rt", encoding="utf-8") as infile:
+        ds.parse(data=infile.read(), format=format)
+
+    return ds.graph(a2a)
+
+
+def skolemized():
+    """
+    The expected triples, with blank nodes skolemized like the baseline
+    Graph.skolemize(authority=ga, basepath=skolem_genid).
+    """
+
+    g = Graph()
+    for s, p, o in TRIPLES:
+        g.add(
+            tuple(
+                (
+                    t.skolemize(authority=ga, basepath=skolem_genid)
+                    if isinstance(t, BNode)
+                    else t
+                )
+                for t in (s, p, o)
+            )
+        )
+
+    return g
+
+
+def test_trig_roundtrip(tmp_path):
+
+    path = str(tmp_path / "chunk.trig")
+
+    # The graph name is a Namespace, like in the conversion
+    with GraphWriter(path, a2a, authority=ga) as writer:
+        writer.write(TRIPLES[:3])
+        writer.write(TRIPLES[3:] + TRIPLES[3:])  # duplicates within a call
+
+    assert writer.path == path + ".gz"
+    assert writer.count == len(TRIPLES)
+    assert [p.name for p in tmp_path.iterdir()] == ["chunk.trig.gz"]
+
+    assert isomorphic(readGraph(writer.path, "trig"), skolemized())
+
+
+def test_nquads_roundtrip(tmp_path):
+
+    path = str(tmp_path / "chunk.nq")
+
+    with GraphWriter(path, a2a, format="nquads", authority=ga) as writer:
+        writer.writeNTriples(writer.serialize(TRIPLES))
+
+    assert isomorphic(readGraph(writer.path, "nquads"), skolemized())
+
+
+def test_abort_on_error(tmp_path):
+
+    path = str(tmp_path / "chunk.trig")
+
+    try:
+        with GraphWriter(path, a2a) as writer:
+            writer.write(TRIPLES)
+            raise ValueError
+    except ValueError:
+        pass
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_plain_identifier(tmp_path):
+
+    path = str(tmp_path / "chunk.trig")
+
+    with GraphWriter(path, URIRef(a2a), gz=False) as writer:
+        writer.write(TRIPLES[:1])
+
+    with open(writer.path) as infile:
+        assert infile.readline() == f"<{a2a}> {{\n"
@@ -0,0 +1,154 @@
+"""
+Streaming writer for the triples of a single named graph.
+
+Instead of building a complete rdflib Graph, skolemizing it into a copy and
+serializing that to one big string, triples are written to the (gzipped)
+output file as soon as a record has been converted. Blank nodes are
+skolemized on the fly, so that memory use does not depend on the size of a
+chunk.
+
+Every triple is written on its own line in N-Triples syntax. In TriG the
+lines are wrapped in a single graph block, in N-Quads the graph name is added
+to every line.
+
+The file is written under a temporary name and only renamed to its final
+path when the writer is closed, so an interrupted conversion never leaves a
+complete-looking but truncated file behind.
+"""
+
+import os
+import gzip
+
+from rdflib import BNode, Literal, URIRef
+from rdflib.plugins.serializers.nt import _quoteLiteral
+from rdflib.term import skolem_genid
+
+
+class GraphWriter:
+    """
+    Write triples of one named graph to a TriG or N-Quads file.
+
+    Usage:
+        with GraphWriter(path, identifier, authority=ga) as writer:
+            writer.write(triples)
+
+    Args:
+        path (str): Path of the output file. '.gz' is appended if gz is True.
+        identifier (URIRef): Name of the graph.
+        gz (bool, optional): Whether the file should be gzipped. Defaults to True.
+        format (str, optional): 'trig' or 'nquads'. Defaults to 'trig'.
+        authority (str, optional): Authority for the skolem IRIs of blank
+            nodes. If None, blank nodes are written as they are. Defaults to None.
+        basepath (str, optional): Basepath for the skolem IRIs. Defaults to
+            rdflib's skolem_genid.
+    """
+
+    def __init__(
+        self,
+        path,
+        identifier,
+        gz=True,
+        format="trig",
+        authority=None,
+        basepath=skolem_genid,
+    ):
+
+        if format not in ("trig", "nquads"):
+            raise ValueError(f"Unsupported format: {format}")
+
+        if gz:
+            path += ".gz"
+
+        self.path = path
+        self.tmpPath = f"{path}.{os.getpid()}.tmp"
+
+        # The identifier is often a Namespace, whose n3 is a term, not a method
+        self.graph = URIRef(identifier).n3()
+        self.format = format
+        self.authority = authority
+        self.basepath = basepath
+
+        self.count = 0
+
+        if gz:
+            self.file = gzip.open(self.tmpPath, "wt", encoding="utf-8")
+        else:
+            self.file = open(self.tmpPath, "w", encoding="utf-8")
+
+        if self.format == "trig":
+            self.file.write(f"{self.graph} {{\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+
+        if excType is None:
+            self.close()
+        else:
+            self.abort()
+
+    def term(self, term):
+
+        if isinstance(term, BNode) and self.authority:
+            term = term.skolemize(authority=self.authority, basepath=self.basepath)
+
+        if isinstance(term, Literal):
+            return _quoteLiteral(term)
+        else:
+            return term.n3()
+
+    def serialize(self, triples):
+        """
+        N-Triples block for an iterable of (s, p, o) triples, with blank nodes
+        skolemized like in the output. Duplicate triples are written once.
+        """
+
+        return "".join(
+            f"{self.term(s)} {self.term(p)} {self.term(o)} .\n"
+            for s, p, o in dict.fromkeys(triples)
+        )
+
+    def write(self, triples):
+        """
+        Write an iterable of (s, p, o) triples, e.g. a list or a Graph.
+        Duplicate triples within one call are written once.
+        """
+
+        self.writeNTriples(self.serialize(triples))
+
+    def writeNTriples(self, block):
+        """
+        Write a block of N-Triples rows, see serialize. In N-Quads the graph
+        name is added to every row.
+        """
+
+        if self.format == "nquads":
+            # Literals never contain a raw newline, so every row ends in " .\n"
+            block = block.replace(" .\n", f" {self.graph} .\n")
+
+        self.file.write(block)
+        self.count += block.count("\n")
+
+    def close(self):
+
+        if self.file.closed:
+            return
+
+        if self.format == "trig":
+            self.file.write("}\n")
+
+        self.file.close()
+
+        os.replace(self.tmpPath, self.path)
+
+    def abort(self):
+        """
+        Close and remove the temporary file, without writing the output.
+        """
+
+        if not self.file.closed:
+            self.file.close()
+
+        if os.path.exists(self.tmpPath):
+            os.remove(self.tmpPath)